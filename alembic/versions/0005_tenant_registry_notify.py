@@ -0,0 +1,41 @@
+"""
+Revision ID: 0005_tenant_registry_notify
+Revises: 0004_move_logo_url_to_tenants
+Create Date: 2026-10-18
+
+Triggers que emiten NOTIFY 'tenant_registry' ante cualquier cambio en
+tenants, tenant_temas o tenant_conexiones, para que el registro en memoria
+de cada worker se recargue al instante (ver app/core/tenant_registry.py).
+"""
+
+revision = '0005_tenant_registry_notify'
+down_revision = '0004_move_logo_url_to_tenants'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+_TABLAS = ('tenants', 'tenant_temas', 'tenant_conexiones')
+
+
+def upgrade():
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_tenant_registry() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('tenant_registry', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for tabla in _TABLAS:
+        op.execute(f"""
+            CREATE TRIGGER trg_{tabla}_notify_registry
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabla}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_tenant_registry()
+        """)
+
+
+def downgrade():
+    for tabla in _TABLAS:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{tabla}_notify_registry ON {tabla}")
+    op.execute("DROP FUNCTION IF EXISTS notify_tenant_registry()")
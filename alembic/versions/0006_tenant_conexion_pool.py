@@ -0,0 +1,30 @@
+"""
+Revision ID: 0006_tenant_conexion_pool
+Revises: 0005_tenant_registry_notify
+Create Date: 2026-10-18
+
+Agrega a tenant_conexiones la configuración del pool de conexiones MySQL
+por tenant (tamaño, overflow y timeouts).
+"""
+
+revision = '0006_tenant_conexion_pool'
+down_revision = '0005_tenant_registry_notify'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('tenant_conexiones', sa.Column('pool_size', sa.Integer(), nullable=False, server_default='5'))
+    op.add_column('tenant_conexiones', sa.Column('max_overflow', sa.Integer(), nullable=False, server_default='10'))
+    op.add_column('tenant_conexiones', sa.Column('pool_timeout', sa.Integer(), nullable=False, server_default='30'))
+    op.add_column('tenant_conexiones', sa.Column('connect_timeout', sa.Integer(), nullable=False, server_default='10'))
+
+
+def downgrade():
+    op.drop_column('tenant_conexiones', 'connect_timeout')
+    op.drop_column('tenant_conexiones', 'pool_timeout')
+    op.drop_column('tenant_conexiones', 'max_overflow')
+    op.drop_column('tenant_conexiones', 'pool_size')
@@ -0,0 +1,39 @@
+"""
+Revision ID: 0007_documentos_pdf_validadores
+Revises: 0006_tenant_conexion_pool
+Create Date: 2026-10-18
+
+Agrega a documentos_pdf los validadores HTTP del contenido: sha256 (ETag fuerte),
+tamano (Content-Length / rangos sin leer el blob) y fecha_actualizacion
+(Last-Modified). Los registros existentes se completan desde el propio pdf.
+"""
+
+revision = '0007_documentos_pdf_validadores'
+down_revision = '0006_tenant_conexion_pool'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('documentos_pdf', sa.Column('sha256', sa.String(64), nullable=True))
+    op.add_column('documentos_pdf', sa.Column('tamano', sa.BigInteger(), nullable=True))
+    op.add_column('documentos_pdf', sa.Column(
+        'fecha_actualizacion', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()
+    ))
+    op.execute("""
+        UPDATE documentos_pdf
+        SET sha256 = encode(sha256(pdf), 'hex'),
+            tamano = octet_length(pdf),
+            fecha_actualizacion = fecha_creacion
+    """)
+    op.alter_column('documentos_pdf', 'sha256', nullable=False)
+    op.alter_column('documentos_pdf', 'tamano', nullable=False)
+
+
+def downgrade():
+    op.drop_column('documentos_pdf', 'fecha_actualizacion')
+    op.drop_column('documentos_pdf', 'tamano')
+    op.drop_column('documentos_pdf', 'sha256')
@@ -0,0 +1,37 @@
+"""
+Revision ID: 0008_documentos_pdf_unique
+Revises: 0007_documentos_pdf_validadores
+Create Date: 2026-10-18
+
+Índice único (tenant_id, tipo, numero) en documentos_pdf: permite el upsert con
+INSERT ... ON CONFLICT y evita duplicados por requests concurrentes.
+Si ya existen duplicados se conserva el registro más reciente (mayor id).
+"""
+
+revision = '0008_documentos_pdf_unique'
+down_revision = '0007_documentos_pdf_validadores'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade():
+    op.execute("""
+        DELETE FROM documentos_pdf a
+        USING documentos_pdf b
+        WHERE a.tenant_id = b.tenant_id
+          AND a.tipo = b.tipo
+          AND a.numero = b.numero
+          AND a.id < b.id
+    """)
+    op.create_index(
+        'uq_documentos_pdf_tenant_tipo_numero',
+        'documentos_pdf',
+        ['tenant_id', 'tipo', 'numero'],
+        unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_documentos_pdf_tenant_tipo_numero', table_name='documentos_pdf')
@@ -0,0 +1,107 @@
+"""
+Revision ID: 0009_pdf_blobs
+Revises: 0008_documentos_pdf_unique
+Create Date: 2026-10-18
+
+Separa el contenido de documentos_pdf en pdf_blobs, direccionada por sha256:
+- pdf_blobs guarda cada PDF una sola vez (comprimido con zstd cuando conviene)
+  con un refcount de los documentos que lo usan.
+- contenido usa STORAGE EXTERNAL: TOAST sin compresión pglz, así substr lee solo los
+  chunks de la ventana pedida (Range) en vez de descomprimir el valor entero.
+- documentos_pdf.sha256 pasa a ser FK a pdf_blobs y se elimina la columna pdf.
+- El trigger trg_documentos_pdf_refcount mantiene el refcount y borra el blob
+  cuando ningún documento lo referencia.
+
+Los blobs existentes se migran sin comprimir (compresion = 'none'); se leen igual.
+"""
+
+revision = '0009_pdf_blobs'
+down_revision = '0008_documentos_pdf_unique'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'pdf_blobs',
+        sa.Column('sha256', sa.String(64), primary_key=True),
+        sa.Column('compresion', sa.String(10), nullable=False, server_default='none'),
+        sa.Column('tamano', sa.BigInteger(), nullable=False),
+        sa.Column('tamano_almacenado', sa.BigInteger(), nullable=False),
+        sa.Column('refcount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('fecha_creacion', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('contenido', sa.LargeBinary(), nullable=False),
+    )
+    op.execute("ALTER TABLE pdf_blobs ALTER COLUMN contenido SET STORAGE EXTERNAL")
+    op.execute("""
+        INSERT INTO pdf_blobs (sha256, compresion, tamano, tamano_almacenado, refcount, contenido)
+        SELECT DISTINCT ON (sha256) sha256, 'none', tamano, tamano, 0, pdf
+        FROM documentos_pdf
+        ORDER BY sha256, id
+    """)
+    op.execute("""
+        UPDATE pdf_blobs b
+        SET refcount = d.cantidad
+        FROM (SELECT sha256, count(*) AS cantidad FROM documentos_pdf GROUP BY sha256) d
+        WHERE d.sha256 = b.sha256
+    """)
+    op.create_foreign_key('fk_documentos_pdf_sha256', 'documentos_pdf', 'pdf_blobs', ['sha256'], ['sha256'])
+    op.create_index('ix_documentos_pdf_sha256', 'documentos_pdf', ['sha256'])
+    op.drop_column('documentos_pdf', 'pdf')
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION documentos_pdf_refcount() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                IF TG_OP = 'INSERT' OR NEW.sha256 IS DISTINCT FROM OLD.sha256 THEN
+                    UPDATE pdf_blobs SET refcount = refcount + 1 WHERE sha256 = NEW.sha256;
+                END IF;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                IF TG_OP = 'DELETE' OR NEW.sha256 IS DISTINCT FROM OLD.sha256 THEN
+                    UPDATE pdf_blobs SET refcount = refcount - 1 WHERE sha256 = OLD.sha256;
+                    DELETE FROM pdf_blobs WHERE sha256 = OLD.sha256 AND refcount <= 0;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_documentos_pdf_refcount
+        AFTER INSERT OR UPDATE OF sha256 OR DELETE ON documentos_pdf
+        FOR EACH ROW EXECUTE FUNCTION documentos_pdf_refcount()
+    """)
+
+
+def downgrade():
+    import zstandard
+
+    op.execute("DROP TRIGGER IF EXISTS trg_documentos_pdf_refcount ON documentos_pdf")
+    op.execute("DROP FUNCTION IF EXISTS documentos_pdf_refcount()")
+    op.add_column('documentos_pdf', sa.Column('pdf', sa.LargeBinary(), nullable=True))
+    op.execute("""
+        UPDATE documentos_pdf d
+        SET pdf = b.contenido
+        FROM pdf_blobs b
+        WHERE b.sha256 = d.sha256 AND b.compresion = 'none'
+    """)
+    # zstd no se puede descomprimir en SQL: uno por uno desde Python
+    conexion = op.get_bind()
+    descompresor = zstandard.ZstdDecompressor()
+    comprimidos = conexion.execute(sa.text("SELECT sha256 FROM pdf_blobs WHERE compresion = 'zstd'")).scalars().all()
+    for sha256 in comprimidos:
+        contenido = conexion.execute(
+            sa.text("SELECT contenido FROM pdf_blobs WHERE sha256 = :sha256"), {"sha256": sha256}
+        ).scalar()
+        conexion.execute(
+            sa.text("UPDATE documentos_pdf SET pdf = :pdf WHERE sha256 = :sha256"),
+            {"pdf": descompresor.decompress(contenido), "sha256": sha256},
+        )
+    op.alter_column('documentos_pdf', 'pdf', nullable=False)
+    op.drop_index('ix_documentos_pdf_sha256', table_name='documentos_pdf')
+    op.drop_constraint('fk_documentos_pdf_sha256', 'documentos_pdf', type_='foreignkey')
+    op.drop_table('pdf_blobs')
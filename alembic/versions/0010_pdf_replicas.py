@@ -0,0 +1,71 @@
+"""
+Revision ID: 0010_pdf_replicas
+Revises: 0009_pdf_blobs
+Create Date: 2026-10-18
+
+Réplica local (read-through) de los PDFs de REPPDF: pdf_replicas guarda por
+(tenant, tipo, local, número) la fila de pdf001_meta y, una vez copiado, un
+puntero al contenido en pdf_blobs. El refcount de pdf_blobs cuenta también
+estas referencias (trigger trg_pdf_replicas_refcount).
+"""
+
+revision = '0010_pdf_replicas'
+down_revision = '0009_pdf_blobs'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'pdf_replicas',
+        sa.Column('tenant_id', sa.Integer(), sa.ForeignKey('tenants.id'), primary_key=True),
+        sa.Column('tipo', sa.SmallInteger(), primary_key=True),
+        sa.Column('loc_cod', sa.Integer(), primary_key=True),
+        sa.Column('numero', sa.BigInteger(), primary_key=True),
+        sa.Column('tamano', sa.BigInteger(), nullable=False),
+        sa.Column('sha256', sa.String(64), nullable=True),
+        sa.Column('actualizado', sa.TIMESTAMP(timezone=False), nullable=True),
+        sa.Column('blob_sha256', sa.String(64), sa.ForeignKey('pdf_blobs.sha256'), nullable=True),
+        sa.Column('verificado', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_pdf_replicas_blob_sha256', 'pdf_replicas', ['blob_sha256'])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION pdf_replicas_refcount() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                IF TG_OP = 'INSERT' OR NEW.blob_sha256 IS DISTINCT FROM OLD.blob_sha256 THEN
+                    UPDATE pdf_blobs SET refcount = refcount + 1 WHERE sha256 = NEW.blob_sha256;
+                END IF;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                IF TG_OP = 'DELETE' OR NEW.blob_sha256 IS DISTINCT FROM OLD.blob_sha256 THEN
+                    UPDATE pdf_blobs SET refcount = refcount - 1 WHERE sha256 = OLD.blob_sha256;
+                    DELETE FROM pdf_blobs WHERE sha256 = OLD.blob_sha256 AND refcount <= 0;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_pdf_replicas_refcount
+        AFTER INSERT OR UPDATE OF blob_sha256 OR DELETE ON pdf_replicas
+        FOR EACH ROW EXECUTE FUNCTION pdf_replicas_refcount()
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS trg_pdf_replicas_refcount ON pdf_replicas")
+    op.execute("DROP FUNCTION IF EXISTS pdf_replicas_refcount()")
+    op.drop_index('ix_pdf_replicas_blob_sha256', table_name='pdf_replicas')
+    op.drop_table('pdf_replicas')
+    # Sin la réplica el refcount vuelve a contar solo documentos_pdf
+    op.execute("""
+        UPDATE pdf_blobs b
+        SET refcount = (SELECT count(*) FROM documentos_pdf d WHERE d.sha256 = b.sha256)
+    """)
+    op.execute("DELETE FROM pdf_blobs WHERE refcount <= 0")
@@ -0,0 +1,59 @@
+"""
+Revision ID: 0011_pdf_blobs_linealizados
+Revises: 0010_pdf_replicas
+Create Date: 2026-10-18
+
+Versión linealizada ("fast web view") de cada PDF, generada en segundo plano con
+qpdf al ingresar. Se asocia al blob original (por contenido, así la comparten todos
+los documentos con el mismo PDF) y se guarda como otro blob en pdf_blobs; el
+original no se modifica. Al borrarse el original, la fila se borra en cascada y el
+trigger trg_pdf_blobs_linealizados_refcount libera la versión linealizada.
+"""
+
+revision = '0011_pdf_blobs_linealizados'
+down_revision = '0010_pdf_replicas'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'pdf_blobs_linealizados',
+        sa.Column('sha256', sa.String(64), sa.ForeignKey('pdf_blobs.sha256', ondelete='CASCADE'), primary_key=True),
+        sa.Column('estado', sa.String(20), nullable=False),
+        sa.Column('sha256_linealizado', sa.String(64), sa.ForeignKey('pdf_blobs.sha256'), nullable=True),
+        sa.Column('detalle', sa.Text(), nullable=True),
+        sa.Column('fecha_creacion', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_pdf_blobs_linealizados_sha256_linealizado', 'pdf_blobs_linealizados', ['sha256_linealizado'])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION pdf_blobs_linealizados_refcount() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE pdf_blobs SET refcount = refcount + 1 WHERE sha256 = NEW.sha256_linealizado;
+            ELSE
+                UPDATE pdf_blobs SET refcount = refcount - 1 WHERE sha256 = OLD.sha256_linealizado;
+                DELETE FROM pdf_blobs WHERE sha256 = OLD.sha256_linealizado AND refcount <= 0;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_pdf_blobs_linealizados_refcount
+        AFTER INSERT OR DELETE ON pdf_blobs_linealizados
+        FOR EACH ROW EXECUTE FUNCTION pdf_blobs_linealizados_refcount()
+    """)
+
+
+def downgrade():
+    # Borrar las filas dispara el trigger, que libera las versiones linealizadas
+    op.execute("DELETE FROM pdf_blobs_linealizados")
+    op.execute("DROP TRIGGER IF EXISTS trg_pdf_blobs_linealizados_refcount ON pdf_blobs_linealizados")
+    op.execute("DROP FUNCTION IF EXISTS pdf_blobs_linealizados_refcount()")
+    op.drop_index('ix_pdf_blobs_linealizados_sha256_linealizado', table_name='pdf_blobs_linealizados')
+    op.drop_table('pdf_blobs_linealizados')
@@ -2,9 +2,10 @@
 Endpoints REST API para autenticación
 """
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_tenant_db
+from app.core.auth_cache import auth_cache
+from app.core.deps import get_tenant_db_async
 from app.schemas.auth import LoginRequest, LoginResponse
 from app.services.auth_service import AuthService
 
@@ -35,7 +36,7 @@ router = APIRouter()
 async def login(
     credentials: LoginRequest,
     request: Request,
-    db: Session = Depends(get_tenant_db)
+    db: AsyncSession = Depends(get_tenant_db_async)
 ) -> LoginResponse:
     """
     Endpoint de login que autentica usuario y retorna token JWT.
@@ -59,11 +60,13 @@ async def login(
         }
     """
     try:
-        resultado = AuthService.autenticar_usuario(
+        resultado = await AuthService.autenticar_usuario(
             db,
             usuario=credentials.usuario,
             password=credentials.password
         )
+        # Un login fresco descarta la fila y los tokens cacheados del usuario
+        auth_cache.invalidar_usuario(request.state.tenant.id, resultado["usuario"])
         
         return LoginResponse(**resultado)
     
@@ -1,15 +1,33 @@
-import os
+from contextlib import AsyncExitStack
+from functools import partial
+from typing import BinaryIO, List
+import tempfile
+import zipfile
+
+import anyio
+import asyncpg
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, status, Depends, Response
-from fastapi.responses import Response as FastAPIResponse
+from fastapi.responses import Response as FastAPIResponse, FileResponse, StreamingResponse
 from app.core.api_key import verify_api_key
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-from app.db.session_postgres import get_postgres_db
-from app.db.tenant_session import create_tenant_session
-from app.models.documento_pdf import DocumentoPDF
+from app.core.config import get_settings
+from app.core.deps import _tenant_con_conexion
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session_postgres import SessionPostgresAsync, get_postgres_db_async
+from app.schemas.documento_pdf import ResultadoCargaItem, ResultadoCargaMasiva, SolicitudZipPdf
+from app.services.carga_masiva_pdf import ArchivoRecibido, CargaMasivaPdfService, archivos_zip
+from app.services.descarga_zip_pdf import DescargaZipPdfService
+from app.services.documento_pdf_service import DocumentoPdfService, rebobinar, tamano_archivo
+from app.services.linealizacion_pdf import linealizador_pdf
+from app.services.pdf_cache import pdf_cache
+from app.services.pdf_replica import pdf_replica
+from app.services.reppdf_client import reppdf_client, ReppdfNoDisponibleError
+from app.utils.http_cache import Descarga, preparar_descarga
 from sqlalchemy.exc import SQLAlchemyError
 
 router = APIRouter()
+settings = get_settings()
+
+TIPOS_ZIP = ("application/zip", "application/x-zip-compressed")
 
 
 def _get_tenant_id(request: Request) -> int:
@@ -20,19 +38,75 @@ def _get_tenant_id(request: Request) -> int:
     return tenant.id
 
 
+def _usar_nginx(request: Request, descarga: Descarga) -> bool:
+    """
+    True si el PDF se entrega vía X-Accel-Redirect. Solo cuando nginx respondería lo
+    mismo que la API: archivo completo sin Range, o el rango único ya validado (206).
+    """
+    return (
+        bool(settings.PDF_ACCEL_REDIRECT_PREFIX) and pdf_cache.habilitada
+        and (descarga.status_code == 206 or "range" not in request.headers)
+    )
+
+
+def _redirigir_a_nginx(ruta: str, descarga: Descarga) -> FastAPIResponse:
+    """Respuesta sin cuerpo: nginx envía el archivo de la caché (y el rango) con sendfile."""
+    headers = {k: v for k, v in descarga.headers.items() if k not in ("Content-Length", "Content-Range")}
+    headers["X-Accel-Redirect"] = settings.PDF_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + pdf_cache.ruta_relativa(ruta)
+    return FastAPIResponse(headers=headers, media_type="application/pdf")
+
+
 @router.get("/get")
 async def get_documento_pdf(
     tipo: int,
     numero: int,
     request: Request,
-    db: Session = Depends(get_postgres_db),
+    original: bool = False,
+    db: AsyncSession = Depends(get_postgres_db_async),
     _: bool = Depends(verify_api_key)
 ):
+    """
+    Descarga un PDF de documentos_pdf. Soporta GET condicional (ETag / If-None-Match,
+    Last-Modified / If-Modified-Since) y rangos de bytes (206). El contenido se lee de
+    pdf_blobs y se descomprime en flujo si está guardado en zstd (o, con
+    PDF_ACCEL_REDIRECT_PREFIX, se materializa en la caché y lo envía nginx).
+
+    Si ya existe la versión linealizada (PDF_LINEARIZAR) se sirve esa, que permite
+    mostrar la primera página pidiendo solo un rango; original=true fuerza el PDF subido.
+    """
     tenant_id = _get_tenant_id(request)
-    instance = db.query(DocumentoPDF).filter_by(tipo=tipo, numero=numero, tenant_id=tenant_id).first()
-    if not instance or not instance.pdf:
+    # Primero solo los metadatos: un 304 no lee el blob
+    meta = await DocumentoPdfService.metadatos_descarga(db, tenant_id, tipo, numero, original)
+    if not meta or not meta.tamano:
         raise HTTPException(status_code=404, detail="Documento PDF no encontrado")
-    return FastAPIResponse(content=instance.pdf, media_type="application/pdf")
+
+    descarga = preparar_descarga(request.headers, meta.tamano, meta.sha256, meta.fecha_actualizacion)
+    if descarga.sin_cuerpo:
+        return FastAPIResponse(status_code=descarga.status_code, headers=descarga.headers)
+
+    if _usar_nginx(request, descarga) and meta.sha256:
+        # documentos_pdf no tiene local: se indexa en la caché con loc_cod 0
+        clave = (tenant_id, tipo, 0, numero)
+        ruta = await pdf_cache.obtener(clave, meta.sha256)
+        if ruta is None:
+            ruta = await pdf_cache.materializar(
+                clave, meta.sha256, DocumentoPdfService.iterar_pdf(db, meta.sha256, 0, meta.tamano)
+            )
+        if ruta is not None:
+            return _redirigir_a_nginx(ruta, descarga)
+
+    async def contenido():
+        # Sesión propia: la del request se cierra al terminar el endpoint
+        async with SessionPostgresAsync() as pg:
+            async for chunk in DocumentoPdfService.iterar_pdf(pg, meta.sha256, descarga.inicio, descarga.largo):
+                yield chunk
+
+    return StreamingResponse(
+        contenido(),
+        status_code=descarga.status_code,
+        media_type="application/pdf",
+        headers=descarga.headers,
+    )
 
 
 @router.post("/upsert")
@@ -41,31 +115,139 @@ async def upsert_documento_pdf(
     numero: int = Form(...),
     pdf: UploadFile = File(...),
     request: Request = None,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_postgres_db_async),
     response: Response = None,
     _: bool = Depends(verify_api_key)
 ):
+    """
+    Crea (201) o reemplaza (200) el PDF de (tipo, numero) del tenant.
+    El archivo se transmite a PostgreSQL sin cargarse entero en memoria
+    (ver DocumentoPdfService.upsert).
+    """
     tenant_id = _get_tenant_id(request)
     try:
-        instance = db.query(DocumentoPDF).filter_by(tipo=tipo, numero=numero, tenant_id=tenant_id).first()
-        pdf_bytes = await pdf.read()
-        if instance:
-            instance.pdf = pdf_bytes
-            db.commit()
-            db.refresh(instance)
-            response.status_code = 200
-            return {"id": instance.id, "tipo": instance.tipo, "numero": instance.numero, "tenant_id": instance.tenant_id}
-        else:
-            new_doc = DocumentoPDF(tipo=tipo, numero=numero, pdf=pdf_bytes, tenant_id=tenant_id)
-            db.add(new_doc)
-            db.commit()
-            db.refresh(new_doc)
-            response.status_code = 201
-            return {"id": new_doc.id, "tipo": new_doc.tipo, "numero": new_doc.numero, "tenant_id": new_doc.tenant_id}
-    except SQLAlchemyError as e:
-        db.rollback()
+        resultado = await DocumentoPdfService.upsert(db, tenant_id, tipo, numero, pdf)
+    except (SQLAlchemyError, asyncpg.PostgresError, ValueError) as e:
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+    pdf_cache.invalidar_documento(tenant_id, tipo, numero)
+    linealizador_pdf.programar([resultado.sha256])
+    response.status_code = 201 if resultado.creado else 200
+    return {"id": resultado.id, "tipo": tipo, "numero": numero, "tenant_id": tenant_id}
+
+
+def _es_zip(nombre: str, content_type: str) -> bool:
+    return nombre.lower().endswith(".zip") or content_type in TIPOS_ZIP
+
+
+async def _volcar_body(request: Request) -> BinaryIO:
+    """Vuelca el body a un temporal (un zip necesita acceso aleatorio al directorio central)."""
+    archivo = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    async for chunk in request.stream():
+        await anyio.to_thread.run_sync(archivo.write, chunk)
+    archivo.seek(0)
+    return archivo
+
+
+@router.post("/bulk", response_model=ResultadoCargaMasiva)
+async def carga_masiva_documentos_pdf(
+    request: Request,
+    db: AsyncSession = Depends(get_postgres_db_async),
+    _: bool = Depends(verify_api_key)
+):
+    """
+    Carga masiva de PDFs para los procesos de sincronización del ERP.
+
+    Acepta:
+    - multipart/form-data con una parte de archivo por PDF, o partes .zip
+    - un body application/zip
+
+    Cada archivo debe llamarse <tipo>_<numero>.pdf (dentro del zip puede estar en
+    carpetas). Se escriben en transacciones de PDF_BULK_BATCH_SIZE documentos y la
+    respuesta informa el estado de cada item: creado, actualizado, omitido o error.
+    """
+    tenant_id = _get_tenant_id(request)
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    archivos: List[ArchivoRecibido] = []
+    errores: List[ResultadoCargaItem] = []
+
+    def agregar_zip(nombre: str, contenido: BinaryIO) -> None:
+        try:
+            zip_file = pila.enter_context(zipfile.ZipFile(contenido))
+        except (zipfile.BadZipFile, OSError) as e:
+            errores.append(ResultadoCargaItem(nombre=nombre, estado="error", detalle=f"Zip inválido: {e}"))
+            return
+        archivos.extend(archivos_zip(zip_file))
+
+    async with AsyncExitStack() as pila:
+        if content_type == "multipart/form-data":
+            # El parser de Starlette transmite el body y vuelca cada parte a disco
+            form = await pila.enter_async_context(
+                request.form(max_files=settings.PDF_BULK_MAX_FILES, max_fields=settings.PDF_BULK_MAX_FILES)
+            )
+            for _campo, parte in form.multi_items():
+                if isinstance(parte, str):
+                    continue
+                nombre = parte.filename or ""
+                if _es_zip(nombre, parte.content_type or ""):
+                    agregar_zip(nombre, parte.file)
+                else:
+                    archivos.append(ArchivoRecibido(
+                        nombre, tamano_archivo(parte.file), partial(rebobinar, parte.file), cerrar=False
+                    ))
+        elif content_type in TIPOS_ZIP:
+            agregar_zip("body.zip", pila.enter_context(await _volcar_body(request)))
+        else:
+            raise HTTPException(status_code=415, detail="Se espera multipart/form-data o application/zip")
+
+        if len(archivos) > settings.PDF_BULK_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"Máximo {settings.PDF_BULK_MAX_FILES} archivos por carga")
+        if not archivos and not errores:
+            raise HTTPException(status_code=400, detail="La carga no contiene archivos")
+
+        return await CargaMasivaPdfService.cargar(
+            db, tenant_id, archivos,
+            tamano_lote=settings.PDF_BULK_BATCH_SIZE,
+            max_bytes=settings.PDF_BULK_MAX_FILE_BYTES,
+            errores_previos=errores,
+        )
+
+
+@router.post("/zip")
+async def descargar_zip_documentos_pdf(
+    solicitud: SolicitudZipPdf,
+    request: Request,
+    _: bool = Depends(verify_api_key)
+):
+    """
+    Descarga los PDFs de varios documentos en un zip armado al vuelo.
+
+    El body indica una lista de documentos (tipo, loc_cod, numero) o un filtro de
+    aprobados: tipo, aprobado_por y rango fecha_desde / fecha_hasta. Cada PDF se lee
+    de pdf001 o, si ya no está ahí, de documentos_pdf; los que no se encuentran se
+    listan en faltantes.txt dentro del zip.
+    """
+    tenant_id = _get_tenant_id(request)
+    limite = settings.PDF_ZIP_MAX_DOCUMENTOS
+    if solicitud.documentos:
+        claves = [(d.tipo, d.loc_cod, d.numero) for d in solicitud.documentos]
+    else:
+        claves = await DescargaZipPdfService.claves_aprobadas(
+            _tenant_con_conexion(request), solicitud.tipo, solicitud.aprobado_por,
+            solicitud.fecha_desde, solicitud.fecha_hasta, limite + 1,
+        )
+    if len(claves) > limite:
+        raise HTTPException(status_code=413, detail=f"Máximo {limite} documentos por zip")
+    if not claves:
+        raise HTTPException(status_code=404, detail="No hay documentos para el filtro indicado")
+
+    return StreamingResponse(
+        DescargaZipPdfService.generar_zip(tenant_id, claves, settings.REPPDF_BATCH_SIZE),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="documentos_pdf.zip"'},
+    )
+
 
 @router.get("/get-cliente")
 async def get_pdf_cliente(
@@ -76,59 +258,71 @@ async def get_pdf_cliente(
     _: bool = Depends(verify_api_key)
 ):
     """
-    Obtiene un PDF desde la tabla pdf001 de la base de datos del cliente (lexascl_reppdf).
+    Obtiene un PDF desde la tabla pdf001 de la base de datos del cliente (lexascl_reppdf),
+    sirviéndolo desde la réplica local (pdf_replicas / pdf_blobs) cuando ya está copiado.
     El emp_cd (PdfEmpCd) se resuelve automáticamente del tenant del request.
+    ETag / Last-Modified vienen de pdf001_meta; soporta 304 y rangos de bytes (206).
+    Con PDF_ACCEL_REDIRECT_PREFIX el PDF se materializa en la caché y lo envía nginx.
 
     Parámetros:
         loc_cod: Código de local (PdfLocCod)
         tipo:    Tipo de documento (PdfTipo)
         numero:  Número de documento (PdfNumero)
     """
-    tenant = getattr(request.state, "tenant", None)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant no encontrado para este dominio")
-    emp_cd = tenant.id
-
-    host = os.getenv("REPPDF_HOST", "179.27.210.204")
-    port = int(os.getenv("REPPDF_PORT", "3306"))
-    db_name = os.getenv("REPPDF_DB", "lexascl_reppdf")
-    user = os.getenv("REPPDF_USER")
-    password = os.getenv("REPPDF_PASSWORD")
-
-    if not user or not password:
-        raise HTTPException(status_code=503, detail="Credenciales de base de datos de PDFs no configuradas")
-
-    db_cliente = create_tenant_session(
-        db_host=host,
-        db_port=port,
-        db_name=db_name,
-        db_user=user,
-        db_password=password
-    )
+    emp_cd = _get_tenant_id(request)
 
     try:
-        result = db_cliente.execute(
-            text("""
-                SELECT PdfBlob FROM pdf001
-                WHERE PdfEmpCd = :emp_cd
-                  AND PdfLocCod = :loc_cod
-                  AND PdfTipo   = :tipo
-                  AND PdfNumero = :numero
-                LIMIT 1
-            """),
-            {"emp_cd": emp_cd, "loc_cod": loc_cod, "tipo": tipo, "numero": numero}
-        )
-        row = result.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="PDF no encontrado en la base de datos del cliente")
-        if not row[0] or len(bytes(row[0])) == 0:
-            raise HTTPException(status_code=422, detail="El registro existe pero no tiene contenido PDF")
-
-        return FastAPIResponse(content=bytes(row[0]), media_type="application/pdf")
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener PDF del cliente: {str(e)}")
-    finally:
-        db_cliente.close()
+        resuelto = await pdf_replica.resolver(emp_cd, tipo, loc_cod, numero)
+    except ReppdfNoDisponibleError as e:
+        raise HTTPException(status_code=503, detail=f"Base de datos de PDFs no disponible: {e}")
+
+    if resuelto is None:
+        raise HTTPException(status_code=404, detail="PDF no encontrado en la base de datos del cliente")
+    meta = resuelto.meta
+    if meta.tamano == 0:
+        raise HTTPException(status_code=422, detail="El registro existe pero no tiene contenido PDF")
+
+    descarga = preparar_descarga(request.headers, meta.tamano, meta.sha256, meta.actualizado)
+    if descarga.sin_cuerpo:
+        return FastAPIResponse(status_code=descarga.status_code, headers=descarga.headers)
+
+    clave = (emp_cd, tipo, loc_cod, numero)
+    ruta = await pdf_cache.obtener(clave, meta.sha256)
+    nginx = _usar_nginx(request, descarga)
+    if ruta is None and nginx and meta.sha256:
+        # Se materializa completo en la caché para que lo envíe nginx
+        if resuelto.blob_sha256 is not None:
+            fuente = pdf_replica.iterar_local(resuelto.blob_sha256, 0, meta.tamano)
+        else:
+            fuente = pdf_replica.copiar_al_terminar(
+                reppdf_client.iterar_pdf(emp_cd, tipo, loc_cod, numero, 0, meta.tamano),
+                emp_cd, tipo, loc_cod, numero, meta,
+            )
+        try:
+            ruta = await pdf_cache.materializar(clave, meta.sha256, fuente)
+        except ReppdfNoDisponibleError as e:
+            raise HTTPException(status_code=503, detail=f"Base de datos de PDFs no disponible: {e}")
+    if ruta is not None:
+        if nginx:
+            return _redirigir_a_nginx(ruta, descarga)
+        # Hit: se sirve desde disco local sin ir a REPPDF
+        if descarga.status_code == 200:
+            return FileResponse(ruta, media_type="application/pdf", headers=descarga.headers)
+        cuerpo = pdf_cache.iterar(ruta, descarga.inicio, descarga.largo)
+    elif resuelto.blob_sha256 is not None:
+        # Copia en la réplica local (pdf_blobs)
+        cuerpo = pdf_replica.iterar_local(resuelto.blob_sha256, descarga.inicio, descarga.largo)
+    else:
+        # Se transmite por ventanas: la memoria por request no depende del tamaño del PDF
+        cuerpo = reppdf_client.iterar_pdf(emp_cd, tipo, loc_cod, numero, descarga.inicio, descarga.largo)
+        if descarga.status_code == 200 and meta.sha256:
+            cuerpo = pdf_cache.guardar_mientras_transmite(clave, meta.sha256, cuerpo)
+            # Terminada la respuesta, se copia a la réplica (desde la caché en disco)
+            cuerpo = pdf_replica.copiar_al_terminar(cuerpo, emp_cd, tipo, loc_cod, numero, meta)
+
+    return StreamingResponse(
+        cuerpo,
+        status_code=descarga.status_code,
+        media_type="application/pdf",
+        headers=descarga.headers,
+    )
@@ -1,9 +1,9 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
 
-from app.core.deps import get_tenant_db, get_current_user_id
+from app.core.deps import get_tenant_db_async, get_current_user_id
 from app.schemas.orden_compra import (
     OrdenCompraDetalle,
     OrdenCompraIndicadores,
@@ -12,37 +12,54 @@ from app.schemas.orden_compra import (
     DetalleOrdenCompra,
     ItemOrdenCompra
 )
+from app.services.indicadores_cache import indicadores_cache
 from app.services.orden_compra_service import OrdenCompraService
+from app.utils.keyset import CursorInvalidoError
 
 router = APIRouter()
 
 @router.get("/indicadores", response_model=OrdenCompraIndicadores)
-def obtener_indicadores(
-    db: Session = Depends(get_tenant_db),
+async def obtener_indicadores(
+    request: Request,
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: str = Depends(get_current_user_id)
 ) -> Any:
     """
-    Obtener indicadores del dashboard para órdenes de compra.
+    Obtener indicadores del dashboard para órdenes de compra (con montos y desglose por local).
+    Cacheados por tenant; se invalidan al aprobar, anular o desaprobar.
     """
     service = OrdenCompraService()
-    return service.obtener_indicadores(db, current_user)
+    tenant = getattr(request.state, 'tenant', None)
+    tenant_id = tenant.id if tenant else 1
+    return await service.obtener_indicadores(db, current_user, tenant_id=tenant_id)
 
 @router.get("/pendientes", response_model=List[OrdenCompraDetalle])
 async def obtener_pendientes(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(5000, ge=1, le=5000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor de la página anterior"),
     request: Request = None,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: str = Depends(get_current_user_id)
 ) -> Any:
     """
     Obtener órdenes pendientes con validación PDF.
     Filtro: ocp_A1_Ap=0 AND ocp_A4_Ap=1 AND ocp_pdt IN ('T','I','N')
+    Paginación por cursor (header X-Next-Cursor) o, por compatibilidad, skip/limit.
     """
     service = OrdenCompraService()
     tenant = getattr(request.state, 'tenant', None) if request else None
     tenant_id = tenant.id if tenant else 1
-    return await service.obtener_pendientes_con_pdf(db, skip=skip, limit=limit, tenant_id=tenant_id)
+    try:
+        ordenes, siguiente = await service.obtener_pendientes_con_pdf(
+            db, skip=skip, limit=limit, tenant_id=tenant_id, cursor=cursor
+        )
+    except CursorInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+    return ordenes
 
 @router.get("/aprobadas", response_model=List[OrdenCompraDetalle])
 async def obtener_aprobadas(
@@ -51,57 +68,67 @@ async def obtener_aprobadas(
     fecha_hasta: date = Query(None, description="Fecha hasta (opcional)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor de la página anterior"),
+    response: Response = None,
     request: Request = None,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: str = Depends(get_current_user_id)
 ) -> Any:
     """
     Obtener órdenes aprobadas con validación PDF.
     Si no se especifica usuario/fechas: solo las aprobadas hoy
+    Paginación por cursor (header X-Next-Cursor) o, por compatibilidad, skip/limit.
     """
     service = OrdenCompraService()
     tenant = getattr(request.state, 'tenant', None) if request else None
     tenant_id = tenant.id if tenant else 1
-    return await service.obtener_aprobadas_con_pdf(
-        db,
-        usuario or None,
-        fecha_desde,
-        fecha_hasta,
-        skip=skip,
-        limit=limit,
-        tenant_id=tenant_id
-    )
+    try:
+        ordenes, siguiente = await service.obtener_aprobadas_con_pdf(
+            db,
+            usuario or None,
+            fecha_desde,
+            fecha_hasta,
+            skip=skip,
+            limit=limit,
+            tenant_id=tenant_id,
+            cursor=cursor
+        )
+    except CursorInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+    return ordenes
 
 @router.get("/{loc_cod}/{ocp_nro}/items", response_model=List[ItemOrdenCompra])
-def obtener_items_orden(
+async def obtener_items_orden(
     loc_cod: int,
     ocp_nro: int,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: str = Depends(get_current_user_id)
 ) -> List[ItemOrdenCompra]:
     service = OrdenCompraService()
-    return service.obtener_items(db, loc_cod, ocp_nro)
+    return await service.obtener_items(db, loc_cod, ocp_nro)
 
 
 @router.get("/{loc_cod}/{ocp_nro}/detalle", response_model=DetalleOrdenCompra)
 async def obtener_detalle_orden(
     loc_cod: int,
     ocp_nro: int,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: str = Depends(get_current_user_id)
 ) -> DetalleOrdenCompra:
     service = OrdenCompraService()
-    result = service.obtener_detalle(db, loc_cod, ocp_nro)
+    result = await service.obtener_detalle(db, loc_cod, ocp_nro)
     if not result:
         raise HTTPException(status_code=404, detail="Orden de compra no encontrada")
     return result
 
 
 @router.post("/aprobar", response_model=OrdenCompraAprobadoResponse)
-def aprobar_orden(
+async def aprobar_orden(
     orden_in: OrdenCompraAprobar,
     request: Request,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: str = Depends(get_current_user_id)
 ) -> Any:
     """
@@ -110,7 +137,7 @@ def aprobar_orden(
     service = OrdenCompraService()
     tenant = getattr(request.state, 'tenant', None)
     tenant_id = tenant.id if tenant else 1
-    orden = service.aprobar_orden(
+    orden = await service.aprobar_orden(
         db,
         orden_in.ocp_nro,
         orden_in.Loc_cod,
@@ -123,6 +150,7 @@ def aprobar_orden(
             status_code=404, 
             detail="La orden de compra no existe"
         )
+    indicadores_cache.invalidar(tenant_id)
         
     return OrdenCompraAprobadoResponse(
         message="Orden aprobada exitosamente",
@@ -131,19 +159,22 @@ def aprobar_orden(
     )
 
 @router.post("/anular", response_model=OrdenCompraAprobadoResponse)
-def anular_orden(
+async def anular_orden(
     orden_in: OrdenCompraAprobar,
-    db: Session = Depends(get_tenant_db),
+    request: Request,
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: str = Depends(get_current_user_id)
 ) -> Any:
     """
     Anular una orden de compra (ocp_pdt = 'N').
     """
     service = OrdenCompraService()
-    orden = service.anular_orden(db, orden_in.ocp_nro, orden_in.Loc_cod)
+    orden = await service.anular_orden(db, orden_in.ocp_nro, orden_in.Loc_cod)
 
     if not orden:
         raise HTTPException(status_code=404, detail="La orden de compra no existe o ya está anulada")
+    tenant = getattr(request.state, 'tenant', None)
+    indicadores_cache.invalidar(tenant.id if tenant else 1)
 
     return OrdenCompraAprobadoResponse(
         message="Orden anulada exitosamente",
@@ -153,16 +184,17 @@ def anular_orden(
 
 
 @router.post("/desaprobar", response_model=OrdenCompraAprobadoResponse)
-def desaprobar_orden(
+async def desaprobar_orden(
     orden_in: OrdenCompraAprobar,
-    db: Session = Depends(get_tenant_db),
+    request: Request,
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: str = Depends(get_current_user_id)
 ) -> Any:
     """
     Deshacer aprobación de una orden de compra (nivel 2).
     """
     service = OrdenCompraService()
-    orden = service.desaprobar_orden(
+    orden = await service.desaprobar_orden(
         db, 
         orden_in.ocp_nro, 
         orden_in.Loc_cod
@@ -173,6 +205,8 @@ def desaprobar_orden(
             status_code=404, 
             detail="La orden de compra no existe"
         )
+    tenant = getattr(request.state, 'tenant', None)
+    indicadores_cache.invalidar(tenant.id if tenant else 1)
         
     return OrdenCompraAprobadoResponse(
         message="Aprobación deshecha exitosamente",
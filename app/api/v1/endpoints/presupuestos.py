@@ -1,14 +1,13 @@
 """
 Endpoints REST API para gestión de presupuestos
 """
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 import asyncio
 
-from app.core.deps import get_tenant_db, get_current_user, get_current_user_id
+from app.core.deps import get_tenant_db_async, get_current_user, get_current_user_id
 from app.models.usuario import Usuario
-from app.models.local import Local
 from app.schemas.presupuesto import (
     PresupuestoIndicadores,
     PresupuestoDetalle,
@@ -16,7 +15,9 @@ from app.schemas.presupuesto import (
     PresupuestoAprobadoResponse
 )
 from app.schemas.presupuesto_detalle import DetallePresupuesto, PresupuestoHistorico
+from app.services.indicadores_cache import indicadores_cache
 from app.services.presupuesto_service import PresupuestoService
+from app.utils.keyset import CursorInvalidoError
 
 router = APIRouter()
 
@@ -32,13 +33,17 @@ router = APIRouter()
       (Pre_vbLib = 1 AND pre_vbgg = 0 y pre_est <> 'N')
     - **Aprobados**: Presupuestos aprobados por gerencia general
       (pre_vbgg = 1)
+    - **Montos**: suma de Pre_Neto de pendientes y aprobados
+    - **Por local**: los mismos indicadores desglosados por sucursal
     
-    Estos indicadores son útiles para dashboards y reportes ejecutivos.
+    Estos indicadores son útiles para dashboards y reportes ejecutivos. Se cachean
+    unos segundos por tenant y se invalidan al aprobar, anular o desaprobar.
     """,
     tags=["Indicadores"]
 )
 async def obtener_indicadores(
-    db: Session = Depends(get_tenant_db),
+    request: Request,
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: Usuario = Depends(get_current_user)
 ) -> PresupuestoIndicadores:
     """
@@ -48,13 +53,15 @@ async def obtener_indicadores(
         db: Sesión de base de datos (inyectada automáticamente)
         
     Returns:
-        PresupuestoIndicadores: Objeto con contadores de pendientes y aprobados
+        PresupuestoIndicadores: Contadores, montos y desglose por local
         
     Raises:
         HTTPException: Error 500 si hay problemas con la base de datos
     """
     try:
-        return PresupuestoService.obtener_indicadores(db)
+        tenant = getattr(request.state, 'tenant', None)
+        tenant_id = tenant.id if tenant else 1
+        return await PresupuestoService.obtener_indicadores(db, tenant_id=tenant_id)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -74,15 +81,19 @@ async def obtener_indicadores(
     
     Criterio: Pre_vbLib = 1 AND pre_vbgg = 0
     
-    Soporta paginación mediante parámetros skip y limit.
+    Paginación por cursor: si la página viene completa, el header X-Next-Cursor trae
+    el valor a enviar como `cursor` para pedir la siguiente (costo constante).
+    skip/limit (OFFSET) se mantiene por compatibilidad; con cursor, skip se ignora.
     """,
     tags=["Presupuestos"]
 )
 async def listar_presupuestos_pendientes(
+    response: Response,
     skip: int = 0,
     limit: int = 5000,
+    cursor: Optional[str] = None,
     request: Request = None,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: Usuario = Depends(get_current_user)
 ) -> List[PresupuestoDetalle]:
     """
@@ -91,13 +102,14 @@ async def listar_presupuestos_pendientes(
     Args:
         skip: Número de registros a omitir (default: 0)
         limit: Cantidad máxima de registros a retornar (default: 100, max: 1000)
+        cursor: X-Next-Cursor de la página anterior
         db: Sesión de base de datos (inyectada automáticamente)
         
     Returns:
         List[PresupuestoDetalle]: Lista de presupuestos pendientes
         
     Raises:
-        HTTPException: Error 400 si los parámetros son inválidos
+        HTTPException: Error 400 si los parámetros o el cursor son inválidos
         HTTPException: Error 500 si hay problemas con la base de datos
     """
     if limit > 5000:
@@ -107,25 +119,23 @@ async def listar_presupuestos_pendientes(
         )
 
     try:
-        presupuestos = PresupuestoService.obtener_presupuestos_pendientes(
-            db, skip=skip, limit=limit
-        )
         tenant = getattr(request.state, 'tenant', None) if request else None
         tenant_id = tenant.id if tenant else 1
 
-        # Una sola query batch para todos los PDFs
-        items = [(p.Loc_cod, p.pre_nro) for p in presupuestos]
-        pdf_map = PresupuestoService._verificar_pdfs_batch(items, tenant_id, 1)
-
-        # Batch lookup de nombres de sucursales
-        loc_cods = list({p.Loc_cod for p in presupuestos})
-        locales = db.query(Local).filter(Local.Loc_cod.in_(loc_cods)).all()
-        loc_map = {l.Loc_cod: l.Loc_des for l in locales}
+        # Query principal (+ estados PDF por lotes) y nombres de sucursales en paralelo
+        (presupuestos, pdf_map, siguiente), loc_map = await asyncio.gather(
+            PresupuestoService.obtener_presupuestos_pendientes(
+                db, skip=skip, limit=limit, tenant_id=tenant_id, cursor=cursor
+            ),
+            PresupuestoService.obtener_nombres_locales(tenant),
+        )
+        if siguiente:
+            response.headers["X-Next-Cursor"] = siguiente
 
         # Enriquecer con información de PDFs y sucursal
         presupuestos_enriquecidos = []
         for presupuesto in presupuestos:
-            tienepdf = pdf_map.get((presupuesto.Loc_cod, presupuesto.pre_nro), 0)
+            tienepdf = pdf_map.get((presupuesto.Loc_cod, presupuesto.pre_nro))
 
             presupuesto_dict = {
                 "Loc_cod": presupuesto.Loc_cod,
@@ -157,6 +167,8 @@ async def listar_presupuestos_pendientes(
             presupuestos_enriquecidos.append(presupuesto_detalle)
         
         return presupuestos_enriquecidos
+    except CursorInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -176,7 +188,8 @@ async def listar_presupuestos_pendientes(
     - pre_vbggUsu = usuario especificado
     - pre_vbggDt entre fecha_desde y fecha_hasta
     
-    Soporta paginación mediante parámetros skip y limit.
+    Paginación por cursor (header X-Next-Cursor -> parámetro `cursor`) o, por
+    compatibilidad, skip/limit.
     """,
     tags=["Presupuestos"]
 )
@@ -184,10 +197,12 @@ async def listar_presupuestos_aprobados(
     usuario: str,
     fecha_desde: str,
     fecha_hasta: str,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     request: Request = None,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: Usuario = Depends(get_current_user)
 ) -> List[PresupuestoDetalle]:
     """
@@ -199,6 +214,7 @@ async def listar_presupuestos_aprobados(
         fecha_hasta: Fecha final del rango (formato YYYY-MM-DD)
         skip: Número de registros a omitir (default: 0)
         limit: Cantidad máxima de registros a retornar (default: 100, max: 1000)
+        cursor: X-Next-Cursor de la página anterior
         db: Sesión de base de datos (inyectada automáticamente)
         
     Returns:
@@ -218,21 +234,20 @@ async def listar_presupuestos_aprobados(
         )
     
     try:
-        presupuestos = PresupuestoService.obtener_presupuestos_aprobados(
-            db, usuario=usuario, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta,
-            skip=skip, limit=limit
-        )
         tenant = getattr(request.state, 'tenant', None) if request else None
         tenant_id = tenant.id if tenant else 1
 
-        # Una sola query batch para todos los PDFs
-        items = [(p.Loc_cod, p.pre_nro) for p in presupuestos]
-        pdf_map = PresupuestoService._verificar_pdfs_batch(items, tenant_id, 1)
+        presupuestos, pdf_map, siguiente = await PresupuestoService.obtener_presupuestos_aprobados(
+            db, usuario=usuario, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta,
+            skip=skip, limit=limit, tenant_id=tenant_id, cursor=cursor
+        )
+        if siguiente:
+            response.headers["X-Next-Cursor"] = siguiente
 
         # Enriquecer con información de PDFs
         presupuestos_enriquecidos = []
         for presupuesto in presupuestos:
-            tienepdf = pdf_map.get((presupuesto.Loc_cod, presupuesto.pre_nro), 0)
+            tienepdf = pdf_map.get((presupuesto.Loc_cod, presupuesto.pre_nro))
 
             # Crear diccionario con todos los campos requeridos por PresupuestoDetalle
             presupuesto_dict = {
@@ -268,6 +283,8 @@ async def listar_presupuestos_aprobados(
             presupuestos_enriquecidos.append(presupuesto_detalle)
 
         return presupuestos_enriquecidos
+    except CursorInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -286,13 +303,13 @@ async def buscar_historico(
     skip: int = 0,
     limit: int = 50,
     request: Request = None,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: Usuario = Depends(get_current_user)
 ) -> List[PresupuestoHistorico]:
     try:
         tenant = getattr(request.state, 'tenant', None) if request else None
         tenant_id = tenant.id if tenant else 1
-        return PresupuestoService.buscar_historico(db, q, skip=skip, limit=min(limit, 50), tenant_id=tenant_id)
+        return await PresupuestoService.buscar_historico(db, q, skip=skip, limit=min(limit, 50), tenant_id=tenant_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al buscar historial: {str(e)}")
 
@@ -306,11 +323,11 @@ async def buscar_historico(
 async def obtener_detalle_presupuesto(
     loc_cod: int,
     pre_nro: int,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: Usuario = Depends(get_current_user)
 ) -> DetallePresupuesto:
     try:
-        return PresupuestoService.obtener_detalle(db, loc_cod, pre_nro)
+        return await PresupuestoService.obtener_detalle(db, loc_cod, pre_nro)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -337,7 +354,7 @@ async def obtener_detalle_presupuesto(
 async def aprobar_presupuesto(
     data: PresupuestoAprobar,
     request: Request,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     usuario: str = Depends(get_current_user_id)
 ) -> PresupuestoAprobadoResponse:
     """
@@ -365,13 +382,14 @@ async def aprobar_presupuesto(
     try:
         tenant = getattr(request.state, 'tenant', None)
         tenant_id = tenant.id if tenant else 1
-        resultado = PresupuestoService.aprobar_presupuesto(
+        resultado = await PresupuestoService.aprobar_presupuesto(
             db,
             loc_cod=data.Loc_cod,
             pre_nro=data.pre_nro,
             usuario=usuario,
             tenant_id=tenant_id
         )
+        indicadores_cache.invalidar(tenant_id)
         
         return PresupuestoAprobadoResponse(
             success=True,
@@ -400,16 +418,19 @@ async def aprobar_presupuesto(
 )
 async def anular_presupuesto(
     data: PresupuestoAprobar,
-    db: Session = Depends(get_tenant_db),
+    request: Request,
+    db: AsyncSession = Depends(get_tenant_db_async),
     usuario: str = Depends(get_current_user_id)
 ) -> PresupuestoAprobadoResponse:
     from datetime import date as date_type
     try:
-        resultado = PresupuestoService.anular_presupuesto(
+        resultado = await PresupuestoService.anular_presupuesto(
             db,
             loc_cod=data.Loc_cod,
             pre_nro=data.pre_nro,
         )
+        tenant = getattr(request.state, 'tenant', None)
+        indicadores_cache.invalidar(tenant.id if tenant else 1)
         return PresupuestoAprobadoResponse(
             success=True,
             message="Presupuesto anulado exitosamente",
@@ -446,19 +467,22 @@ async def anular_presupuesto(
 )
 async def desaprobar_presupuesto(
     data: PresupuestoAprobar,
-    db: Session = Depends(get_tenant_db),
+    request: Request,
+    db: AsyncSession = Depends(get_tenant_db_async),
     usuario: str = Depends(get_current_user_id)
 ) -> PresupuestoAprobadoResponse:
     """
     Desaprueba un presupuesto.
     """
     try:
-        resultado = PresupuestoService.desaprobar_presupuesto(
+        resultado = await PresupuestoService.desaprobar_presupuesto(
             db,
             loc_cod=data.Loc_cod,
             pre_nro=data.pre_nro,
             usuario=usuario
         )
+        tenant = getattr(request.state, 'tenant', None)
+        indicadores_cache.invalidar(tenant.id if tenant else 1)
         
         # Como respuesta usamos el mismo modelo pero con datos revertidos
         return PresupuestoAprobadoResponse(
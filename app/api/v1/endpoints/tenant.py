@@ -3,13 +3,16 @@ Endpoint de configuración de tenant.
 Retorna la paleta de colores y datos del tenant según el dominio (header Host).
 No requiere autenticación - es el primer llamado del frontend al cargar la app.
 """
+from dataclasses import asdict
 from fastapi import APIRouter, Request, HTTPException, status, Depends
 from pydantic import BaseModel
 from typing import Optional, List
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from app.core.deps import get_tenant_db
+from app.core.deps import get_tenant_db_async
+from app.services.asesor_indices import AsesorIndices
 
 router = APIRouter()
 
@@ -98,24 +101,54 @@ class TableCheck(BaseModel):
     ok: bool
 
 
+class ConsultaCheck(BaseModel):
+    consulta: str
+    tabla: str
+    tipo_acceso: Optional[str]
+    indice_usado: Optional[str]
+    filas_estimadas: Optional[int]
+    problemas: List[str]
+    indice_sugerido: Optional[str]
+    ok: bool
+
+
 class DbCheckResponse(BaseModel):
     tenant: str
     base_de_datos: str
     checks: List[TableCheck]
     tiene_errores: bool
+    # Asesor de índices: EXPLAIN de las queries de los listados y DDL de los índices que faltan
+    consultas: List[ConsultaCheck] = []
+    ddl_sugerido: List[str] = []
 
 
 @router.get(
     "/db-check",
     response_model=DbCheckResponse,
     summary="Diagnóstico de compatibilidad de BD del tenant",
+    description="""
+    Verifica que existan las tablas y columnas que usa la app y, con `indices=true`
+    (default), corre EXPLAIN sobre las queries de los listados: marca full scans,
+    filesorts y funciones sobre columnas en el WHERE, y sugiere los `CREATE INDEX`
+    que faltan en `ddl_sugerido`. No modifica la BD.
+    """,
     tags=["Tenant"]
 )
-def check_tenant_db(request: Request, db: Session = Depends(get_tenant_db)) -> DbCheckResponse:
+async def check_tenant_db(
+    request: Request,
+    indices: bool = True,
+    db: AsyncSession = Depends(get_tenant_db_async)
+) -> DbCheckResponse:
     tenant = getattr(request.state, "tenant", None)
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant no encontrado")
 
+    # El chequeo usa la API síncrona (SHOW/DESCRIBE/EXPLAIN) sobre la conexión aiomysql:
+    # el tenant no necesita un engine PyMySQL aparte
+    return await db.run_sync(lambda sesion: _check_tenant_db(sesion, tenant, indices))
+
+
+def _check_tenant_db(db: Session, tenant, indices: bool) -> DbCheckResponse:
     db_name = tenant.conexion.db_name
     checks: List[TableCheck] = []
 
@@ -157,9 +190,19 @@ def check_tenant_db(request: Request, db: Session = Depends(get_tenant_db)) -> D
 
     tiene_errores = any(not c.ok for c in checks)
 
+    consultas: List[ConsultaCheck] = []
+    ddl_sugerido: List[str] = []
+    if indices:
+        # Solo las tablas completas: una query con columnas faltantes no se puede explicar
+        tablas_ok = [c.tabla for c in checks if c.ok]
+        diagnosticos, ddl_sugerido = AsesorIndices.diagnosticar(db, tablas_ok)
+        consultas = [ConsultaCheck(**asdict(d)) for d in diagnosticos]
+
     return DbCheckResponse(
         tenant=tenant.nombre,
         base_de_datos=db_name,
         checks=checks,
         tiene_errores=tiene_errores,
+        consultas=consultas,
+        ddl_sugerido=ddl_sugerido,
     )
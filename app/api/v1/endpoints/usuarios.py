@@ -2,10 +2,10 @@
 Endpoints REST API para gestión de usuarios
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.core.deps import get_tenant_db, get_current_user
+from app.core.deps import get_tenant_db_async, get_current_user
 from app.models.usuario import Usuario
 from app.schemas.usuario import UsuarioDetalle
 from app.services.usuario_service import UsuarioService
@@ -29,7 +29,7 @@ router = APIRouter()
 async def listar_usuarios(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: Usuario = Depends(get_current_user)
 ) -> List[UsuarioDetalle]:
     """
@@ -54,7 +54,7 @@ async def listar_usuarios(
         )
     
     try:
-        usuarios = UsuarioService.obtener_todos_usuarios(db, skip=skip, limit=limit)
+        usuarios = await UsuarioService.obtener_todos_usuarios(db, skip=skip, limit=limit)
         return usuarios
     except Exception as e:
         raise HTTPException(
@@ -71,7 +71,7 @@ async def listar_usuarios(
     tags=["Usuarios"]
 )
 async def contar_usuarios(
-    db: Session = Depends(get_tenant_db),
+    db: AsyncSession = Depends(get_tenant_db_async),
     current_user: Usuario = Depends(get_current_user)
 ) -> dict:
     """
@@ -87,7 +87,7 @@ async def contar_usuarios(
         HTTPException: Error 500 si hay problemas con la base de datos
     """
     try:
-        total = UsuarioService.contar_usuarios(db)
+        total = await UsuarioService.contar_usuarios(db)
         return {"total": total}
     except Exception as e:
         raise HTTPException(
@@ -1,4 +1,7 @@
 from fastapi import Header, HTTPException, status, Depends
+from fastapi.responses import JSONResponse
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
 import os
 
 
@@ -10,3 +13,29 @@ async def verify_api_key(x_api_key: str = Header(...)):
             detail="Invalid or missing API Key",
         )
     return True
+
+
+class ApiKeyMiddleware:
+    """
+    Middleware ASGI que exige X-API-Key en todas las rutas bajo path_prefix
+    (endpoints de documentos PDF en PostgreSQL).
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            conn = HTTPConnection(scope)
+            if conn.url.path.startswith(self.path_prefix):
+                api_key = os.getenv("API_KEY")
+                header_key = conn.headers.get("x-api-key")
+                if not api_key or header_key != api_key:
+                    response = JSONResponse(
+                        status_code=401,
+                        content={"detail": f"Invalid or missing API Key. Path: {conn.url.path}"}
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
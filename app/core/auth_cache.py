@@ -0,0 +1,121 @@
+"""
+Cachés en memoria para get_current_user, por tenant.
+
+- Claims verificados: token -> (UserCd, exp). Un token ya verificado no vuelve a
+  pasar por la firma de python-jose hasta que expira. LRU acotado por tenant
+  (AUTH_TOKEN_CACHE_MAX); la clave es el sha256 del token, no el token.
+- Fila de ctbm01: (tenant, UserCd) -> columnas del usuario, con TTL corto
+  (AUTH_USUARIO_CACHE_TTL_SECONDS). Ahorra el round trip a la BD MySQL del tenant.
+  Cada request recibe su propio Usuario transitorio (no ligado a ninguna sesión).
+
+Invalidación explícita: invalidar_usuario (p.ej. al hacer login) e invalidar_tenant
+(el registro de tenants detecta un cambio en el tenant o su conexión).
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import time
+
+from app.core.config import get_settings
+from app.models.usuario import Usuario
+
+settings = get_settings()
+
+_COLUMNAS_USUARIO = [columna.key for columna in Usuario.__table__.columns]
+
+
+def _huella(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class AuthCache:
+    """Claims de tokens verificados (LRU por tenant) y filas de usuario (TTL)."""
+
+    def __init__(self, max_tokens_por_tenant: int, ttl_usuario: float, max_usuarios: int):
+        self.max_tokens_por_tenant = max_tokens_por_tenant
+        self.ttl_usuario = ttl_usuario
+        self.max_usuarios = max_usuarios
+        # tenant_id -> {huella del token: (UserCd, exp epoch)}, el primero es el menos reciente
+        self._tokens: Dict[int, "OrderedDict[bytes, Tuple[str, float]]"] = {}
+        # (tenant_id, UserCd) -> (columnas, vence monotonic)
+        self._usuarios: "OrderedDict[Tuple[int, str], Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    # --- Claims ---
+
+    def usuario_de_token(self, tenant_id: int, token: str) -> Optional[str]:
+        """UserCd de un token ya verificado y vigente, o None (hay que verificarlo)."""
+        tokens = self._tokens.get(tenant_id)
+        if not tokens:
+            return None
+        huella = _huella(token)
+        entrada = tokens.get(huella)
+        if entrada is None:
+            return None
+        usuario, exp = entrada
+        if exp <= time.time():
+            del tokens[huella]
+            return None
+        tokens.move_to_end(huella)
+        return usuario
+
+    def guardar_token(self, tenant_id: int, token: str, usuario: str, exp: float) -> None:
+        if self.max_tokens_por_tenant <= 0 or exp <= time.time():
+            return
+        tokens = self._tokens.setdefault(tenant_id, OrderedDict())
+        tokens[_huella(token)] = (usuario, exp)
+        tokens.move_to_end(_huella(token))
+        while len(tokens) > self.max_tokens_por_tenant:
+            tokens.popitem(last=False)
+
+    # --- Filas de usuario ---
+
+    def usuario(self, tenant_id: int, user_cd: str) -> Optional[Usuario]:
+        """Usuario cacheado si no venció, como instancia nueva sin sesión."""
+        clave = (tenant_id, user_cd)
+        entrada = self._usuarios.get(clave)
+        if entrada is None:
+            return None
+        columnas, vence = entrada
+        if vence <= time.monotonic():
+            del self._usuarios[clave]
+            return None
+        self._usuarios.move_to_end(clave)
+        return Usuario(**columnas)
+
+    def guardar_usuario(self, tenant_id: int, usuario: Usuario) -> None:
+        if self.ttl_usuario <= 0:
+            return
+        clave = (tenant_id, usuario.UserCd)
+        columnas = {nombre: getattr(usuario, nombre) for nombre in _COLUMNAS_USUARIO}
+        self._usuarios[clave] = (columnas, time.monotonic() + self.ttl_usuario)
+        self._usuarios.move_to_end(clave)
+        while len(self._usuarios) > self.max_usuarios:
+            self._usuarios.popitem(last=False)
+
+    # --- Invalidación ---
+
+    def invalidar_usuario(self, tenant_id: int, user_cd: str) -> None:
+        """Descarta la fila y los tokens cacheados de un usuario."""
+        self._usuarios.pop((tenant_id, user_cd), None)
+        tokens = self._tokens.get(tenant_id)
+        if tokens:
+            for huella in [h for h, (usuario, _) in tokens.items() if usuario == user_cd]:
+                del tokens[huella]
+
+    def invalidar_tenant(self, tenant_id: int) -> None:
+        """Descarta todo lo cacheado de un tenant."""
+        self._tokens.pop(tenant_id, None)
+        for clave in [c for c in self._usuarios if c[0] == tenant_id]:
+            del self._usuarios[clave]
+
+    def limpiar(self) -> None:
+        self._tokens.clear()
+        self._usuarios.clear()
+
+
+# Instancia global del proceso
+auth_cache = AuthCache(
+    max_tokens_por_tenant=settings.AUTH_TOKEN_CACHE_MAX,
+    ttl_usuario=settings.AUTH_USUARIO_CACHE_TTL_SECONDS,
+    max_usuarios=settings.AUTH_USUARIO_CACHE_MAX,
+)
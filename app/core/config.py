@@ -17,7 +17,72 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
-    
+    # Caché de get_current_user: tokens ya verificados (LRU por tenant, hasta su exp)
+    # y filas de ctbm01 por (tenant, UserCd); 0 deshabilita cada una
+    AUTH_TOKEN_CACHE_MAX: int = 5000
+    AUTH_USUARIO_CACHE_TTL_SECONDS: int = 60
+    AUTH_USUARIO_CACHE_MAX: int = 10000
+
+    # Multitenancy
+    TENANT_REGISTRY_TTL_SECONDS: int = 60
+    # Presupuesto global de conexiones MySQL (pool_size + max_overflow) por worker.
+    # Cada tenant activo reserva un pool (solo el engine aiomysql): con el default 5+10
+    # caben 4 tenants antes de desalojar; subirlo si un worker atiende más tenants a la vez
+    TENANT_DB_MAX_CONNECTIONS: int = 60
+    # Segundos sin uso tras los cuales se libera el engine de un tenant
+    TENANT_DB_IDLE_SECONDS: int = 600
+
+    # REPPDF (BD remota de PDFs): pool propio, deadline por llamada y circuit breaker
+    REPPDF_POOL_SIZE: int = 5
+    REPPDF_MAX_OVERFLOW: int = 5
+    REPPDF_TIMEOUT_SECONDS: float = 3.0
+    REPPDF_CIRCUIT_FAILURES: int = 5
+    REPPDF_CIRCUIT_RESET_SECONDS: float = 30.0
+    # Claves (loc, número) por query de estado de PDFs; los lotes corren en paralelo
+    REPPDF_BATCH_SIZE: int = 200
+    # Tamaño de cada ventana SUBSTRING al transmitir un PDF desde pdf001
+    REPPDF_CHUNK_BYTES: int = 256 * 1024
+
+    # Caché local en disco de PDFs de REPPDF (directorio vacío = deshabilitada).
+    # PDF_CACHE_MAX_BYTES es el total del directorio, compartido por los workers: cada
+    # uno lleva su LRU con PDF_CACHE_MAX_BYTES / WEB_CONCURRENCY
+    PDF_CACHE_DIR: str = "/tmp/mcn_pdf_cache"
+    PDF_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Workers de uvicorn (misma variable que lee uvicorn para --workers)
+    WEB_CONCURRENCY: int = 1
+    # Location interna de nginx que sirve PDF_CACHE_DIR (p.ej. "/_pdf_cache/"). Si se define,
+    # los PDFs se materializan en la caché y nginx los envía vía X-Accel-Redirect (sendfile);
+    # vacío = el worker transmite los bytes
+    PDF_ACCEL_REDIRECT_PREFIX: str = ""
+
+    # Carga masiva de PDFs (/documentos-pdf/bulk)
+    PDF_BULK_BATCH_SIZE: int = 50  # PDFs por transacción
+    PDF_BULK_MAX_FILES: int = 5000  # archivos por request (partes multipart o miembros del zip)
+    PDF_BULK_MAX_FILE_BYTES: int = 50 * 1024 * 1024
+
+    # Linealización (fast web view) de PDFs de documentos_pdf en segundo plano, con qpdf
+    PDF_LINEARIZAR: bool = False
+    PDF_QPDF_BIN: str = "qpdf"
+    PDF_LINEARIZAR_PROCESOS: int = 2  # procesos qpdf simultáneos por worker
+    PDF_LINEARIZAR_MIN_BYTES: int = 256 * 1024  # uno chico llega completo igual de rápido
+    PDF_LINEARIZAR_TIMEOUT_SECONDS: float = 120.0
+
+    # Descarga de varios PDFs en un zip (/documentos-pdf/zip)
+    PDF_ZIP_MAX_DOCUMENTOS: int = 2000
+
+    # Caché por tenant de /indicadores (presupuestos y órdenes de compra); 0 = deshabilitada.
+    # Se invalida al aprobar/anular/desaprobar; el TTL acota los cambios hechos por el ERP
+    INDICADORES_CACHE_TTL_SECONDS: int = 30
+    # Caché por tenant de los nombres de sucursales (loc001); 0 = deshabilitada
+    LOCALES_CACHE_TTL_SECONDS: int = 300
+
+    # Réplica local de PDFs de REPPDF (pdf_replicas + pdf_blobs)
+    PDF_REPLICA_HABILITADA: bool = True
+    PDF_REPLICA_TTL_SECONDS: int = 300  # antigüedad máxima de la verificación contra pdf001_meta
+    PDF_REPLICA_COPIAS_SIMULTANEAS: int = 2
+    # Sesiones Postgres simultáneas por worker para leer/registrar la réplica (pool 5+10)
+    PDF_REPLICA_SESIONES_SIMULTANEAS: int = 4
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,60 @@
+"""
+CORS dinámico: permite cualquier origen registrado en la tabla tenants.
+Sin hardcodear dominios — agregar tenant en DB es suficiente.
+El Origin se valida con la misma resolución de tenant (una sola por request).
+"""
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.tenant_middleware import resolver_tenant
+
+
+class DynamicCORSMiddleware:
+    CORS_HEADERS = {
+        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
+        "Access-Control-Allow-Headers": (
+            "Authorization, Content-Type, X-Tenant-Domain, X-API-Key, "
+            "Range, If-Range, If-None-Match, If-Modified-Since"
+        ),
+        "Access-Control-Expose-Headers": "ETag, Last-Modified, Content-Range, Content-Length, Accept-Ranges, Content-Disposition, X-Next-Cursor",
+        "Access-Control-Allow-Credentials": "true",
+        "Access-Control-Max-Age": "600",
+    }
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Reutiliza la resolución hecha por TenantMiddleware (lookup en memoria, sin BD)
+        resolution = await resolver_tenant(HTTPConnection(scope))
+        origin = resolution.origin
+        allowed = resolution.origin_permitido
+
+        # Preflight OPTIONS — responder inmediatamente
+        if scope["method"] == "OPTIONS":
+            headers = dict(self.CORS_HEADERS)
+            if allowed and origin:
+                headers["Access-Control-Allow-Origin"] = origin
+            await Response(status_code=204, headers=headers)(scope, receive, send)
+            return
+
+        if not (allowed and origin):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_con_cors(message: Message) -> None:
+            # Solo se tocan los headers; los chunks del body pasan sin buffering
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["Access-Control-Allow-Origin"] = origin
+                for k, v in self.CORS_HEADERS.items():
+                    headers[k] = v
+            await send(message)
+
+        await self.app(scope, receive, send_con_cors)
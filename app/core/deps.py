@@ -1,24 +1,24 @@
 """
 Dependencies para FastAPI - Autenticación y autorización
 """
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import decode_access_token
-from app.db.tenant_session import create_tenant_session
+from app.core.auth_cache import auth_cache
+from app.core.security import verificar_access_token
+from app.db.tenant_session import get_tenant_session, get_tenant_async_session, PoolAgotadoError
 from app.models.usuario import Usuario
 
 # Esquema de seguridad Bearer Token (auto_error=False para retornar 401 en lugar de 403)
 security = HTTPBearer(auto_error=False)
 
 
-def get_tenant_db(request: Request) -> Generator[Session, None, None]:
-    """
-    Dependency que retorna una sesión SQLAlchemy a la BD MySQL del tenant actual.
-    El tenant es resuelto por TenantMiddleware a partir del header Host.
-    """
+def _tenant_con_conexion(request: Request):
+    """Retorna el tenant del request o lanza 404/503 si no existe o no tiene BD configurada."""
     tenant = getattr(request.state, "tenant", None)
     if not tenant:
         raise HTTPException(
@@ -30,20 +30,76 @@ def get_tenant_db(request: Request) -> Generator[Session, None, None]:
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="El tenant no tiene base de datos configurada"
         )
-    conn = tenant.conexion
-    db = create_tenant_session(conn.db_host, conn.db_port, conn.db_name, conn.db_user, conn.db_password)
+    return tenant
+
+
+def get_tenant_db(request: Request) -> Generator[Session, None, None]:
+    """
+    Dependency que retorna una sesión SQLAlchemy a la BD MySQL del tenant actual.
+    El tenant es resuelto por TenantMiddleware a partir del header Host.
+
+    Uso:
+        @router.get("/datos")
+        def endpoint(db: Session = Depends(get_tenant_db)):
+            ...
+
+    Raises:
+        HTTPException 404: Si no hay tenant para el dominio.
+        HTTPException 503: Si el tenant no tiene conexión configurada o no hay cupo en el pool.
+    """
+    tenant = _tenant_con_conexion(request)
+    try:
+        db = get_tenant_session(tenant)
+    except PoolAgotadoError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_tenant_db_async(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Variante asíncrona de get_tenant_db: AsyncSession sobre aiomysql.
+    Las queries se esperan con await y no bloquean el event loop, así una BD
+    de tenant lenta no congela los requests de los demás tenants.
+
+    Uso:
+        @router.get("/datos")
+        async def endpoint(db: AsyncSession = Depends(get_tenant_db_async)):
+            result = await db.execute(select(...))
+    """
+    tenant = _tenant_con_conexion(request)
+    try:
+        db = get_tenant_async_session(tenant)
+    except PoolAgotadoError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_tenant_db)
+    db: AsyncSession = Depends(get_tenant_db_async)
 ) -> Usuario:
     """
     Dependency que valida el token JWT y retorna el usuario actual.
+
+    Este dependency debe ser usado en todos los endpoints protegidos.
+    Los tokens ya verificados y las filas de ctbm01 se cachean por tenant
+    (ver auth_cache): en el caso común no se verifica la firma ni se consulta la BD.
+
+    Raises:
+        HTTPException 401: Si el token es inválido o el usuario no existe
     """
     if not credentials:
         raise HTTPException(
@@ -52,17 +108,26 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"}
         )
     token = credentials.credentials
+    tenant_id = _tenant_con_conexion(request).id
 
-    usuario_id = decode_access_token(token)
-
+    usuario_id = auth_cache.usuario_de_token(tenant_id, token)
     if usuario_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido o expirado",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-
-    usuario = db.query(Usuario).filter(Usuario.UserCd == usuario_id).first()
+        claims = verificar_access_token(token)
+        if claims is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido o expirado",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        usuario_id, exp = claims
+        auth_cache.guardar_token(tenant_id, token, usuario_id, exp)
+
+    usuario = auth_cache.usuario(tenant_id, usuario_id)
+    if usuario is not None:
+        return usuario
+
+    result = await db.execute(select(Usuario).where(Usuario.UserCd == usuario_id))
+    usuario = result.scalars().first()
 
     if usuario is None:
         raise HTTPException(
@@ -71,6 +136,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+    auth_cache.guardar_usuario(tenant_id, usuario)
     return usuario
 
 
@@ -79,104 +145,7 @@ async def get_current_user_id(
 ) -> str:
     """
     Dependency que retorna solo el ID del usuario actual.
-    """
-    return current_user.UserCd
 
-    """
-    Dependency que valida el token JWT y retorna el usuario actual.
-    
-    Este dependency debe ser usado en todos los endpoints protegidos.
-    
-    Args:
-        credentials: Credenciales del header Authorization (Bearer token)
-        db: Sesión de base de datos
-        
-    Returns:
-        Usuario: Usuario autenticado
-        
-    Raises:
-        HTTPException 401: Si el token es inválido o el usuario no existe
-        
-    Example:
-        @router.get("/protected")
-        async def protected_route(current_user: Usuario = Depends(get_current_user)):
-            return {"user": current_user.UserCd}
-    """
-    token = credentials.credentials
-    
-    # Decodificar token
-    usuario_id = decode_access_token(token)
-    
-    if usuario_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido o expirado",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    # Buscar usuario en la base de datos
-    usuario = db.query(Usuario).filter(Usuario.UserCd == usuario_id).first()
-    
-    if usuario is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario no encontrado",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    return usuario
-
-
-async def get_current_user_id(
-    current_user: Usuario = Depends(get_current_user)
-) -> str:
-    """
-    Dependency que retorna solo el ID del usuario actual.
-    
     Útil cuando solo necesitas el UserCd sin todo el objeto Usuario.
-    
-    Args:
-        current_user: Usuario actual (inyectado por get_current_user)
-        
-    Returns:
-        str: UserCd del usuario autenticado
-        
-    Example:
-        @router.post("/aprobar")
-        async def aprobar(usuario: str = Depends(get_current_user_id)):
-            # usuario contiene el UserCd
-            pass
     """
     return current_user.UserCd
-
-
-def get_tenant_db(request: Request) -> Generator[Session, None, None]:
-    """
-    Dependency que retorna una sesión SQLAlchemy a la BD MySQL del tenant actual.
-    El tenant es resuelto por TenantMiddleware a partir del header Host.
-
-    Uso:
-        @router.get("/datos")
-        def endpoint(db: Session = Depends(get_tenant_db)):
-            ...
-
-    Raises:
-        HTTPException 404: Si no hay tenant para el dominio o sin conexión configurada.
-    """
-    tenant = getattr(request.state, "tenant", None)
-    if not tenant:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Tenant no encontrado para este dominio"
-        )
-    if not tenant.conexion:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="El tenant no tiene base de datos configurada"
-        )
-    conn = tenant.conexion
-    db = create_tenant_session(conn.db_host, conn.db_port, conn.db_name, conn.db_user, conn.db_password)
-    try:
-        yield db
-    finally:
-        db.close()
@@ -2,7 +2,7 @@
 Utilidades de seguridad: JWT, hashing de contraseñas
 """
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -72,9 +72,25 @@ def decode_access_token(token: str) -> Optional[str]:
     Returns:
         Optional[str]: Usuario extraído del token o None si es inválido
     """
+    claims = verificar_access_token(token)
+    return claims[0] if claims else None
+
+
+def verificar_access_token(token: str) -> Optional[Tuple[str, float]]:
+    """
+    Verifica firma y expiración de un token JWT.
+    
+    Args:
+        token: Token JWT a verificar
+        
+    Returns:
+        Optional[Tuple[str, float]]: (usuario, exp en epoch) o None si es inválido
+    """
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        usuario: str = payload.get("sub")
-        return usuario
     except JWTError:
         return None
+    usuario = payload.get("sub")
+    if usuario is None:
+        return None
+    return usuario, float(payload.get("exp") or 0)
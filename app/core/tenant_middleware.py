@@ -1,13 +1,18 @@
 """
 Middleware de resolución de tenant.
-Lee el header Host de cada request, busca el tenant en PostgreSQL
-y lo adjunta a request.state.tenant para uso en endpoints y dependencias.
+Lee el header Host de cada request, busca el tenant en el registro en memoria
+(ver app/core/tenant_registry.py) y lo adjunta a request.state.tenant para uso
+en endpoints y dependencias.
+
+La resolución se hace una sola vez por request (resolver_tenant) y la comparten
+TenantMiddleware y DynamicCORSMiddleware.
 """
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.db.session_postgres import SessionPostgres
-from app.models.tenant import Tenant
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlparse
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.tenant_registry import tenant_registry, TenantSnapshot
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,15 +21,34 @@ logger = logging.getLogger(__name__)
 _BYPASS_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json", "/db-test"}
 
 
-class TenantMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Siempre adjuntar tenant al estado (None si no se encuentra)
-        request.state.tenant = None
+@dataclass(frozen=True)
+class TenantResolution:
+    """Resultado de resolver un request: tenant (si aplica) y si su Origin es un dominio registrado."""
+    tenant: Optional[TenantSnapshot]
+    origin: str
+    origin_permitido: bool
+
+
+def _es_bypass(path: str) -> bool:
+    return path in _BYPASS_PATHS or path.startswith("/docs") or path.startswith("/openapi")
 
-        path = request.url.path
-        if path in _BYPASS_PATHS or path.startswith("/docs") or path.startswith("/openapi"):
-            return await call_next(request)
 
+async def resolver_tenant(request: HTTPConnection) -> TenantResolution:
+    """
+    Resuelve tenant y permiso CORS del request. El resultado se guarda en
+    request.state, así que llamadas posteriores en el mismo request no repiten el trabajo.
+    """
+    cached = getattr(request.state, "tenant_resolution", None)
+    if cached is not None:
+        return cached
+
+    path = request.url.path
+    origin = request.headers.get("origin", "")
+    origin_host = (urlparse(origin.strip().lower()).hostname or "") if origin else ""
+
+    tenant = None
+    tenant_domain = ""
+    if not _es_bypass(path):
         # Extraer host limpio (sin puerto)
         host = request.headers.get("host", "").split(":")[0].lower()
 
@@ -34,34 +58,46 @@ class TenantMiddleware(BaseHTTPMiddleware):
         # 3. Referer (fallback adicional)
         # 4. Host (último recurso)
         x_tenant = request.headers.get("x-tenant-domain", "").strip().lower()
-        origin = request.headers.get("origin", "").strip().lower()
         referer = request.headers.get("referer", "").strip().lower()
 
         if x_tenant:
             tenant_domain = x_tenant
         elif origin:
             # Origin tiene formato https://dominio.com — extraer solo el hostname
-            from urllib.parse import urlparse
-            tenant_domain = urlparse(origin).hostname or host
+            tenant_domain = origin_host or host
         elif referer:
-            from urllib.parse import urlparse
             tenant_domain = urlparse(referer).hostname or host
         else:
             tenant_domain = host
 
         if tenant_domain:
-            db = SessionPostgres()
-            try:
-                tenant = db.query(Tenant).filter(
-                    Tenant.dominio == tenant_domain,
-                    Tenant.activo == True
-                ).first()
-                request.state.tenant = tenant
-                if not tenant:
-                    logger.warning(f"Tenant no encontrado para dominio: '{tenant_domain}' (path: {path})")
-            except Exception as e:
-                logger.error(f"Error al resolver tenant para dominio '{tenant_domain}': {e}", exc_info=True)
-            finally:
-                db.close()
-
-        return await call_next(request)
+            tenant = await tenant_registry.obtener(tenant_domain)
+            if not tenant:
+                logger.warning(f"Tenant no encontrado para dominio: '{tenant_domain}' (path: {path})")
+
+    # El Origin se valida contra los dominios registrados; si coincide con el
+    # dominio ya resuelto se reutiliza el resultado.
+    if not origin_host:
+        origin_permitido = False
+    elif origin_host == tenant_domain:
+        origin_permitido = tenant is not None
+    else:
+        origin_permitido = await tenant_registry.obtener(origin_host) is not None
+
+    resolution = TenantResolution(tenant=tenant, origin=origin, origin_permitido=origin_permitido)
+    request.state.tenant_resolution = resolution
+    request.state.tenant = tenant
+    return resolution
+
+
+class TenantMiddleware:
+    """Middleware ASGI puro: no envuelve el body de la respuesta, solo completa scope["state"]."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            # Siempre adjuntar tenant al estado (None si no se encuentra)
+            await resolver_tenant(HTTPConnection(scope))
+        await self.app(scope, receive, send)
@@ -0,0 +1,247 @@
+"""
+Registro en memoria de tenants.
+
+Mantiene snapshots inmutables de Tenant, TenantTema y TenantConexion indexados
+por dominio, de modo que resolver el tenant de un request sea un lookup en un
+dict sin ir a PostgreSQL.
+
+El registro se recarga (con asyncpg, sin bloquear el event loop):
+- Inmediatamente al recibir un NOTIFY en el canal 'tenant_registry'
+  (triggers sobre tenants, tenant_temas y tenant_conexiones, migración 0005).
+- En segundo plano cuando vence el TTL (respaldo si se pierde la conexión LISTEN).
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+import asyncio
+import logging
+import time
+
+import asyncpg
+from sqlalchemy import select
+
+from app.core.auth_cache import auth_cache
+from app.core.config import get_settings
+from app.db import session_postgres
+from app.db.session_postgres import SessionPostgresAsync
+from app.models.tenant import Tenant
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+NOTIFY_CHANNEL = "tenant_registry"
+
+
+@dataclass(frozen=True)
+class TemaSnapshot:
+    nombre: str
+    color_primary: str
+    color_secondary: str
+    color_background: str
+    color_surface: str
+    color_text: str
+
+
+@dataclass(frozen=True)
+class ConexionSnapshot:
+    db_host: str
+    db_port: int
+    db_name: str
+    db_user: str
+    db_password: str
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: int = 30
+    connect_timeout: int = 10
+
+
+@dataclass(frozen=True)
+class TenantSnapshot:
+    id: int
+    slug: str
+    nombre: str
+    dominio: str
+    logo_url: Optional[str]
+    tema: Optional[TemaSnapshot]
+    conexion: Optional[ConexionSnapshot]
+
+    @classmethod
+    def desde_modelo(cls, tenant: Tenant) -> "TenantSnapshot":
+        tema = tenant.tema
+        conn = tenant.conexion
+        return cls(
+            id=tenant.id,
+            slug=tenant.slug,
+            nombre=tenant.nombre,
+            dominio=tenant.dominio.lower(),
+            logo_url=tenant.logo_url,
+            tema=TemaSnapshot(
+                nombre=tema.nombre,
+                color_primary=tema.color_primary,
+                color_secondary=tema.color_secondary,
+                color_background=tema.color_background,
+                color_surface=tema.color_surface,
+                color_text=tema.color_text,
+            ) if tema else None,
+            conexion=ConexionSnapshot(
+                db_host=conn.db_host,
+                db_port=conn.db_port,
+                db_name=conn.db_name,
+                db_user=conn.db_user,
+                db_password=conn.db_password,
+                pool_size=conn.pool_size,
+                max_overflow=conn.max_overflow,
+                pool_timeout=conn.pool_timeout,
+                connect_timeout=conn.connect_timeout,
+            ) if conn else None,
+        )
+
+
+class TenantRegistry:
+    """
+    Mapa dominio -> TenantSnapshot con TTL.
+
+    Las lecturas nunca esperan salvo en el arranque en frío (registro nunca cargado).
+    Al vencer el TTL se sirve el snapshot actual y la recarga corre como tarea aparte.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self._ttl = ttl_seconds
+        self._por_dominio: Dict[str, TenantSnapshot] = {}
+        self._cargado_en: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._tarea: Optional[asyncio.Task] = None
+        self._pendiente = False
+
+    async def obtener(self, dominio: str) -> Optional[TenantSnapshot]:
+        """Retorna el tenant activo para el dominio o None."""
+        if self._cargado_en is None:
+            await self.recargar(solo_si_vacio=True)
+        elif time.monotonic() - self._cargado_en > self._ttl and not self._refrescando:
+            self.programar_recarga()
+        return self._por_dominio.get(dominio)
+
+    async def recargar(self, solo_si_vacio: bool = False) -> None:
+        """
+        Lee todos los tenants activos y reemplaza el mapa de forma atómica.
+
+        Con solo_si_vacio (arranque en frío) no se recarga si otra request ya cargó el
+        registro mientras se esperaba el lock: N requests concurrentes, una sola lectura.
+        """
+        async with self._lock:
+            if solo_si_vacio and self._cargado_en is not None:
+                return
+            try:
+                async with SessionPostgresAsync() as db:
+                    result = await db.execute(select(Tenant).where(Tenant.activo == True))
+                    tenants = result.unique().scalars().all()
+                anteriores = {t.id: t for t in self._por_dominio.values()}
+                self._por_dominio = {
+                    t.dominio.lower(): TenantSnapshot.desde_modelo(t) for t in tenants
+                }
+                # Tenants que cambiaron (p.ej. de BD) o se desactivaron: sus usuarios cacheados ya no valen
+                actuales = {t.id: t for t in self._por_dominio.values()}
+                for tenant_id, anterior in anteriores.items():
+                    if actuales.get(tenant_id) != anterior:
+                        auth_cache.invalidar_tenant(tenant_id)
+                self._cargado_en = time.monotonic()
+                logger.info(f"Registro de tenants cargado: {len(self._por_dominio)} tenants activos")
+            except Exception as e:
+                logger.error(f"Error al cargar registro de tenants: {e}", exc_info=True)
+
+    def invalidar(self) -> None:
+        """Fuerza que la próxima lectura dispare una recarga."""
+        if self._cargado_en is not None:
+            self._cargado_en = 0.0
+
+    @property
+    def _refrescando(self) -> bool:
+        return self._tarea is not None and not self._tarea.done()
+
+    def programar_recarga(self) -> None:
+        """
+        Agenda una recarga en segundo plano. Si ya hay una en curso, se repite al
+        terminar para no perder cambios notificados mientras se leía.
+        """
+        if self._refrescando:
+            self._pendiente = True
+            return
+        self._tarea = asyncio.get_running_loop().create_task(self._recargar_pendientes())
+
+    async def _recargar_pendientes(self) -> None:
+        while True:
+            self._pendiente = False
+            await self.recargar()
+            if not self._pendiente:
+                return
+
+
+class TenantRegistryListener:
+    """
+    Tarea asyncio que escucha NOTIFY en PostgreSQL (asyncpg) y recarga el registro al instante.
+    Si la conexión se cae, reintenta; mientras tanto el TTL sigue cubriendo los cambios.
+    """
+
+    def __init__(self, registry: TenantRegistry, ping_interval: float = 30.0, retry_delay: float = 5.0):
+        self._registry = registry
+        self._ping_interval = ping_interval
+        self._retry_delay = retry_delay
+        self._tarea: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._tarea and not self._tarea.done():
+            return
+        self._tarea = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._tarea:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    async def _connect(self) -> asyncpg.Connection:
+        conn = await asyncpg.connect(
+            host=session_postgres.POSTGRES_HOST,
+            port=int(session_postgres.POSTGRES_PORT),
+            database=session_postgres.POSTGRES_DB,
+            user=session_postgres.POSTGRES_USER,
+            password=session_postgres.POSTGRES_PASSWORD,
+        )
+        await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        return conn
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        logger.info(f"Cambio en '{payload}': recargando registro de tenants")
+        self._registry.programar_recarga()
+
+    async def _run(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = await self._connect()
+                # Recargar al (re)conectar por si hubo cambios mientras no escuchábamos
+                await self._registry.recargar()
+                while True:
+                    await asyncio.sleep(self._ping_interval)
+                    # Detecta conexiones caídas (los NOTIFY llegan por callback)
+                    await conn.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"LISTEN {NOTIFY_CHANNEL} interrumpido: {e}")
+                self._registry.invalidar()
+                await asyncio.sleep(self._retry_delay)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    try:
+                        await conn.close(timeout=5)
+                    except Exception:
+                        pass
+
+
+# Instancias globales del proceso
+tenant_registry = TenantRegistry(ttl_seconds=settings.TENANT_REGISTRY_TTL_SECONDS)
+tenant_registry_listener = TenantRegistryListener(tenant_registry)
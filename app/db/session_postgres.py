@@ -1,9 +1,14 @@
 """
-Sesión de base de datos para PostgreSQL (documentos_pdf)
+Sesión de base de datos para PostgreSQL (tenants, temas, conexiones, documentos_pdf)
+
+- engine_postgres / SessionPostgres: psycopg2 síncrono (scripts, alembic, servicios internos).
+- engine_postgres_async / SessionPostgresAsync: asyncpg, para el camino de requests
+  (registro de tenants, middlewares y endpoints de documentos PDF).
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 import os
 
 POSTGRES_USER = os.getenv("POSTGRES_USER", "lexasdulce")
@@ -13,6 +18,7 @@ POSTGRES_HOST = os.getenv("POSTGRES_HOST", "postgres")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
 POSTGRES_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+POSTGRES_ASYNC_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 engine_postgres = create_engine(
     POSTGRES_URL,
@@ -23,6 +29,15 @@ engine_postgres = create_engine(
 
 SessionPostgres = sessionmaker(autocommit=False, autoflush=False, bind=engine_postgres)
 
+engine_postgres_async = create_async_engine(
+    POSTGRES_ASYNC_URL,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    echo=False
+)
+
+SessionPostgresAsync = async_sessionmaker(engine_postgres_async, autoflush=False, expire_on_commit=False)
+
 
 def get_postgres_db() -> Generator[Session, None, None]:
     db = SessionPostgres()
@@ -38,3 +53,9 @@ def get_postgres_db_sync() -> Session:
     Usar solo para servicios internos - recordar cerrar la sesión.
     """
     return SessionPostgres()
+
+
+async def get_postgres_db_async() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency asíncrona (asyncpg) para la BD de control."""
+    async with SessionPostgresAsync() as db:
+        yield db
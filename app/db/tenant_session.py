@@ -1,33 +1,289 @@
 """
 Sesión dinámica de MySQL por tenant.
 Crea conexiones a la BD MySQL de cada tenant usando sus credenciales almacenadas en PostgreSQL.
-Las engines se cachean por URL para no recrearlas en cada request.
+
+Los engines los administra TenantEngineManager, indexados por tenant (no por URL):
+- Presupuesto global de conexiones (pool_size + max_overflow) entre todos los tenants.
+- Tamaño de pool y timeouts por tenant desde tenant_conexiones.
+- Desalojo LRU con dispose() de engines inactivos.
+- Un sessionmaker cacheado por engine.
+- Si cambian las credenciales del tenant, el engine anterior se descarta.
+
+Los endpoints de tenant usan el engine asíncrono (aiomysql); el síncrono (PyMySQL)
+solo se crea si algo pide get_tenant_session. Ambos cuentan contra el mismo
+presupuesto global, así que un tenant servido async reserva un solo pool.
 """
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional, Set, Union
+import asyncio
+import concurrent.futures
+import hashlib
+import logging
+import threading
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 
-_engine_cache: dict = {}
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class PoolAgotadoError(Exception):
+    """No hay presupuesto de conexiones disponible para crear un nuevo engine."""
+
+
+@dataclass
+class _EngineEntry:
+    huella: str
+    engine: Union[Engine, AsyncEngine]
+    session_factory: Union[sessionmaker, async_sessionmaker]
+    capacidad: int
+    ultimo_uso: float
+    # Event loop donde se creó un engine async: sus conexiones solo se cierran en él
+    loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pool(self):
+        engine = self.engine.sync_engine if isinstance(self.engine, AsyncEngine) else self.engine
+        return engine.pool
+
+    async def dispose(self) -> None:
+        # Un AsyncEngine cierra sus conexiones aiomysql con await; el dispose() síncrono
+        # de sync_engine fuera de un greenlet falla (MissingGreenlet) y las filtra.
+        if isinstance(self.engine, AsyncEngine):
+            await self.engine.dispose()
+        else:
+            self.engine.dispose()
+
+
+def _loop_actual() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _url_mysql(db_host: str, db_port: int, db_name: str, db_user: str, db_password: str, driver: str = "pymysql") -> str:
+    return f"mysql+{driver}://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}?charset=utf8mb4"
+
+
+class TenantEngineManager:
+    """
+    Cache LRU de engines MySQL con presupuesto global de conexiones.
+
+    Cada entrada reserva pool_size + max_overflow conexiones del presupuesto. Si al crear
+    un engine no hay cupo, se liberan (dispose) los engines inactivos menos usados;
+    un engine con conexiones en uso nunca se desaloja.
+
+    El desalojo ocurre dentro de session_factory (síncrono): el dispose de un engine
+    async se programa como tarea en su event loop; dispose_all() las espera.
+    """
+
+    def __init__(self, max_conexiones: int, idle_seconds: int):
+        self.max_conexiones = max_conexiones
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[Hashable, _EngineEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._cierres: Set[Union[asyncio.Future, concurrent.futures.Future]] = set()
+
+    @property
+    def conexiones_reservadas(self) -> int:
+        return sum(e.capacidad for e in self._entries.values())
+
+    def session_factory(self, clave: Hashable, *args, **kwargs) -> sessionmaker:
+        """Retorna el sessionmaker síncrono (PyMySQL) cacheado para la clave."""
+        return self._factory(clave, False, *args, **kwargs)
+
+    def async_session_factory(self, clave: Hashable, *args, **kwargs) -> async_sessionmaker:
+        """Retorna el async_sessionmaker (aiomysql) cacheado para la clave."""
+        return self._factory(clave, True, *args, **kwargs)
 
+    def _factory(
+        self,
+        clave: Hashable,
+        asincrono: bool,
+        db_host: str,
+        db_port: int,
+        db_name: str,
+        db_user: str,
+        db_password: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: int = 30,
+        connect_timeout: int = 10,
+    ) -> Union[sessionmaker, async_sessionmaker]:
+        clave = (clave, "async" if asincrono else "sync")
+        url = _url_mysql(db_host, db_port, db_name, db_user, db_password, "aiomysql" if asincrono else "pymysql")
+        huella = hashlib.sha256(
+            f"{url}|{pool_size}|{max_overflow}|{pool_timeout}|{connect_timeout}".encode()
+        ).hexdigest()
+        ahora = time.monotonic()
 
-def _get_or_create_engine(url: str):
-    """Retorna engine existente o crea uno nuevo y lo cachea."""
-    if url not in _engine_cache:
-        _engine_cache[url] = create_engine(
-            url,
-            pool_pre_ping=True,
-            pool_recycle=3600,
-            pool_size=5,
-            max_overflow=10,
-        )
-    return _engine_cache[url]
+        with self._lock:
+            self._desalojar_inactivos(ahora)
+
+            entry = self._entries.get(clave)
+            if entry is not None and entry.huella == huella:
+                entry.ultimo_uso = ahora
+                self._entries.move_to_end(clave)
+                return entry.session_factory
+
+            if entry is not None:
+                # Credenciales o configuración rotadas: descartar el engine anterior
+                logger.info(f"Configuración de conexión cambió para '{clave}': recreando engine")
+                self._descartar(clave)
+
+            capacidad = pool_size + max_overflow
+            self._liberar_cupo(capacidad)
+
+            crear: Callable = create_async_engine if asincrono else create_engine
+            engine = crear(
+                url,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                connect_args={"connect_timeout": connect_timeout},
+            )
+            if asincrono:
+                factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+            else:
+                factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            self._entries[clave] = _EngineEntry(
+                huella=huella,
+                engine=engine,
+                session_factory=factory,
+                capacidad=capacidad,
+                ultimo_uso=ahora,
+                loop=_loop_actual() if asincrono else None,
+            )
+            return factory
+
+    async def dispose_all(self) -> None:
+        """Cierra todos los engines y espera los cierres pendientes (shutdown)."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            await entry.dispose()
+        if self._cierres:
+            await asyncio.gather(
+                *(asyncio.wrap_future(c) if isinstance(c, concurrent.futures.Future) else c
+                  for c in list(self._cierres)),
+                return_exceptions=True,
+            )
+
+    def _en_uso(self, entry: _EngineEntry) -> bool:
+        return entry.pool.checkedout() > 0
+
+    def _descartar(self, clave: Hashable) -> None:
+        entry = self._entries.pop(clave)
+        if not isinstance(entry.engine, AsyncEngine):
+            entry.engine.dispose()
+            return
+        if entry.loop is None or entry.loop.is_closed():
+            # Sin event loop (engine creado fuera de uno, p.ej. scripts/tests)
+            asyncio.run(entry.dispose())
+            return
+        if _loop_actual() is entry.loop:
+            cierre = entry.loop.create_task(entry.dispose())
+        else:
+            # Desde otro hilo (threadpool de un endpoint síncrono)
+            cierre = asyncio.run_coroutine_threadsafe(entry.dispose(), entry.loop)
+        self._cierres.add(cierre)
+        cierre.add_done_callback(self._fin_cierre)
+
+    def _fin_cierre(self, cierre: Union[asyncio.Future, concurrent.futures.Future]) -> None:
+        self._cierres.discard(cierre)
+        if not cierre.cancelled() and cierre.exception() is not None:
+            logger.warning(f"Error cerrando engine desalojado: {cierre.exception()}")
+
+    def _desalojar_inactivos(self, ahora: float) -> None:
+        for clave, entry in list(self._entries.items()):
+            if ahora - entry.ultimo_uso > self.idle_seconds and not self._en_uso(entry):
+                logger.info(f"Liberando engine inactivo de '{clave}'")
+                self._descartar(clave)
+
+    def _liberar_cupo(self, capacidad: int) -> None:
+        """Desaloja engines inactivos en orden LRU hasta que la nueva capacidad quepa."""
+        if capacidad > self.max_conexiones:
+            raise PoolAgotadoError(
+                f"El pool solicitado ({capacidad}) excede el presupuesto global ({self.max_conexiones})"
+            )
+        for clave, entry in list(self._entries.items()):  # de menos a más reciente
+            if self.conexiones_reservadas + capacidad <= self.max_conexiones:
+                return
+            if not self._en_uso(entry):
+                logger.info(f"Presupuesto de conexiones lleno: desalojando engine de '{clave}'")
+                self._descartar(clave)
+        if self.conexiones_reservadas + capacidad > self.max_conexiones:
+            raise PoolAgotadoError(
+                f"Presupuesto de conexiones agotado ({self.conexiones_reservadas}/{self.max_conexiones})"
+            )
+
+
+tenant_engines = TenantEngineManager(
+    max_conexiones=settings.TENANT_DB_MAX_CONNECTIONS,
+    idle_seconds=settings.TENANT_DB_IDLE_SECONDS,
+)
+
+
+def _config_pool(conn) -> dict:
+    return dict(
+        pool_size=conn.pool_size,
+        max_overflow=conn.max_overflow,
+        pool_timeout=conn.pool_timeout,
+        connect_timeout=conn.connect_timeout,
+    )
+
+
+def get_tenant_session(tenant) -> Session:
+    """
+    Crea una sesión síncrona para la BD MySQL del tenant (TenantSnapshot con conexion).
+    Recordar cerrar la sesión después de usarla.
+    """
+    conn = tenant.conexion
+    factory = tenant_engines.session_factory(
+        tenant.id, conn.db_host, conn.db_port, conn.db_name, conn.db_user, conn.db_password,
+        **_config_pool(conn)
+    )
+    return factory()
+
+
+def get_tenant_async_session(tenant) -> AsyncSession:
+    """
+    Crea una AsyncSession (aiomysql) para la BD MySQL del tenant.
+    Recordar cerrarla con await session.close().
+    """
+    conn = tenant.conexion
+    factory = tenant_engines.async_session_factory(
+        tenant.id, conn.db_host, conn.db_port, conn.db_name, conn.db_user, conn.db_password,
+        **_config_pool(conn)
+    )
+    return factory()
 
 
 def create_tenant_session(db_host: str, db_port: int, db_name: str, db_user: str, db_password: str) -> Session:
     """
-    Crea y retorna una sesión SQLAlchemy para la BD MySQL del tenant.
+    Crea y retorna una sesión SQLAlchemy para una BD MySQL arbitraria (p.ej. REPPDF).
+    El engine se indexa por usuario@host:puerto/bd, sin incluir la contraseña.
     Recordar cerrar la sesión después de usarla.
     """
-    url = f"mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}?charset=utf8mb4"
-    engine = _get_or_create_engine(url)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal()
+    clave = f"{db_user}@{db_host}:{db_port}/{db_name}"
+    factory = tenant_engines.session_factory(clave, db_host, db_port, db_name, db_user, db_password)
+    return factory()
+
+
+def create_tenant_async_session(db_host: str, db_port: int, db_name: str, db_user: str, db_password: str) -> AsyncSession:
+    """Variante asíncrona (aiomysql) de create_tenant_session."""
+    clave = f"{db_user}@{db_host}:{db_port}/{db_name}"
+    factory = tenant_engines.async_session_factory(clave, db_host, db_port, db_name, db_user, db_password)
+    return factory()
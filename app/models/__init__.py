@@ -1,5 +1,8 @@
 # noqa: F401
 from .documento_pdf import DocumentoPDF
+from .pdf_blob import PdfBlob
+from .pdf_blob_linealizado import PdfBlobLinealizado
+from .pdf_replica import PdfReplica
 # Models Package
 from app.models.presupuesto import Presupuesto
 from app.models.usuario import Usuario
@@ -1,14 +1,21 @@
-from sqlalchemy import Column, BigInteger, SmallInteger, Integer, TIMESTAMP, LargeBinary, ForeignKey
+from sqlalchemy import Column, BigInteger, SmallInteger, Integer, String, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.db.base_class import Base
 
 
 class DocumentoPDF(Base):
     __tablename__ = "documentos_pdf"
+    __table_args__ = (
+        Index("uq_documentos_pdf_tenant_tipo_numero", "tenant_id", "tipo", "numero", unique=True),
+    )
 
     id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)
     tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
     tipo = Column(SmallInteger, nullable=False, comment="1=presupuesto, 2=orden de compra")
     numero = Column(BigInteger, nullable=False)
     fecha_creacion = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
-    pdf = Column(LargeBinary, nullable=False)
+    # Contenido en pdf_blobs (deduplicado por hash); sha256 / tamano también sirven
+    # de validadores HTTP (ETag / Content-Length) sin leer el blob
+    sha256 = Column(String(64), ForeignKey("pdf_blobs.sha256"), nullable=False, index=True)
+    tamano = Column(BigInteger, nullable=False)
+    fecha_actualizacion = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
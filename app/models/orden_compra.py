@@ -45,8 +45,8 @@ class OrdenCompra(Base):
     ocp_A4_Hr = Column(String(8), nullable=False, default='')
     ocp_A4_Usu = Column(String(10), nullable=False, default='')
 
-    # Relaciones
-    proveedor = relationship("Proveedor", lazy="joined")
+    # Relaciones (no se cargan por defecto: options(joinedload(OrdenCompra.proveedor)))
+    proveedor = relationship("Proveedor", lazy="raise")
 
     __table_args__ = (
         PrimaryKeyConstraint('Loc_cod', 'ocp_nro'),
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, Integer, String, TIMESTAMP, LargeBinary
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class PdfBlob(Base):
+    """Contenido de un PDF, guardado una sola vez por sha256 (ver DocumentoPdfService)."""
+    __tablename__ = "pdf_blobs"
+
+    sha256 = Column(String(64), primary_key=True, comment="sha256 del PDF original")
+    compresion = Column(String(10), nullable=False, server_default="none", comment="zstd | none")
+    tamano = Column(BigInteger, nullable=False, comment="Bytes del PDF original")
+    tamano_almacenado = Column(BigInteger, nullable=False, comment="Bytes de contenido (comprimido o no)")
+    # Documentos que lo referencian; mantenido por el trigger trg_documentos_pdf_refcount
+    refcount = Column(Integer, nullable=False, server_default="0")
+    fecha_creacion = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    contenido = deferred(Column(LargeBinary, nullable=False))
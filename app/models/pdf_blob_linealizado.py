@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Text, TIMESTAMP, ForeignKey
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class PdfBlobLinealizado(Base):
+    """Versión linealizada de un blob de pdf_blobs (ver LinealizadorPdf)."""
+    __tablename__ = "pdf_blobs_linealizados"
+
+    sha256 = Column(String(64), ForeignKey("pdf_blobs.sha256", ondelete="CASCADE"), primary_key=True,
+                    comment="Blob original")
+    estado = Column(String(20), nullable=False, comment="linealizado | ya_linealizado | error")
+    # Refcount del blob linealizado mantenido por trg_pdf_blobs_linealizados_refcount
+    sha256_linealizado = Column(String(64), ForeignKey("pdf_blobs.sha256"), nullable=True, index=True)
+    detalle = Column(Text, nullable=True)
+    fecha_creacion = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
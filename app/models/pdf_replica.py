@@ -0,0 +1,20 @@
+from sqlalchemy import Column, BigInteger, SmallInteger, Integer, String, TIMESTAMP, ForeignKey
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class PdfReplica(Base):
+    """Copia local de un PDF de pdf001 (REPPDF) y de su fila de pdf001_meta (ver PdfReplica service)."""
+    __tablename__ = "pdf_replicas"
+
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), primary_key=True, comment="PdfEmpCd")
+    tipo = Column(SmallInteger, primary_key=True, comment="1=presupuesto, 2=orden de compra")
+    loc_cod = Column(Integer, primary_key=True)
+    numero = Column(BigInteger, primary_key=True)
+    # Copia de pdf001_meta
+    tamano = Column(BigInteger, nullable=False, comment="PdfBytes (0 = registro sin contenido)")
+    sha256 = Column(String(64), nullable=True, comment="PdfSha256")
+    actualizado = Column(TIMESTAMP(timezone=False), nullable=True, comment="PdfActualizado")
+    # Contenido copiado a pdf_blobs; solo se usa si coincide con sha256
+    blob_sha256 = Column(String(64), ForeignKey("pdf_blobs.sha256"), nullable=True, index=True)
+    verificado = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), comment="Última verificación contra REPPDF")
@@ -39,8 +39,8 @@ class Presupuesto(Base):
     pre_suc = Column(SmallInteger, nullable=False, comment="Sucursal del cliente")
     pre_VenCod = Column(SmallInteger, nullable=False, comment="Código del vendedor")
     
-    # Relación con Cliente
-    cliente = relationship(Cliente, foreign_keys=[pre_rut], lazy="joined")
+    # Relación con Cliente (no se carga por defecto: options(joinedload(Presupuesto.cliente)))
+    cliente = relationship(Cliente, foreign_keys=[pre_rut], lazy="raise")
 
     # Detalles
     pre_req = Column(CHAR(20), nullable=False)
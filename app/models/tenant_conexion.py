@@ -14,4 +14,10 @@ class TenantConexion(Base):
     db_user = Column(String(100), nullable=False)
     db_password = Column(String(256), nullable=False)
 
+    # Pool de conexiones por tenant (ver app/db/tenant_session.py)
+    pool_size = Column(Integer, nullable=False, server_default="5")
+    max_overflow = Column(Integer, nullable=False, server_default="10")
+    pool_timeout = Column(Integer, nullable=False, server_default="30", comment="Segundos esperando conexión libre del pool")
+    connect_timeout = Column(Integer, nullable=False, server_default="10", comment="Segundos para establecer conexión MySQL")
+
     tenant = relationship("Tenant", back_populates="conexion")
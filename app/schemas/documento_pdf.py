@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import date
+from typing import List, Optional
+
+
+# Resultado de un PDF dentro de una carga masiva
+class ResultadoCargaItem(BaseModel):
+    nombre: str = Field(..., description="Nombre del archivo (parte multipart o miembro del zip)")
+    tipo: Optional[int] = None
+    numero: Optional[int] = None
+    estado: str = Field(..., description="creado | actualizado | omitido | error")
+    id: Optional[int] = None
+    detalle: Optional[str] = None
+
+
+# Respuesta de POST /documentos-pdf/bulk
+class ResultadoCargaMasiva(BaseModel):
+    total: int
+    creados: int
+    actualizados: int
+    omitidos: int
+    errores: int
+    items: List[ResultadoCargaItem]
+
+
+# Documento a incluir en un zip
+class ClaveDocumentoPdf(BaseModel):
+    tipo: int = Field(..., description="1=presupuesto, 2=orden de compra", ge=1, le=2)
+    loc_cod: int
+    numero: int
+
+
+# Body de POST /documentos-pdf/zip: lista de documentos o filtro de aprobados
+class SolicitudZipPdf(BaseModel):
+    documentos: Optional[List[ClaveDocumentoPdf]] = Field(None, description="Documentos a incluir")
+    tipo: Optional[int] = Field(None, description="Filtro: 1=presupuesto, 2=orden de compra", ge=1, le=2)
+    aprobado_por: Optional[str] = Field(None, description="Filtro: usuario que aprobó")
+    fecha_desde: Optional[date] = Field(None, description="Filtro: fecha de aprobación desde")
+    fecha_hasta: Optional[date] = Field(None, description="Filtro: fecha de aprobación hasta")
+
+    @model_validator(mode="after")
+    def documentos_o_filtro(self):
+        filtro = (self.tipo, self.aprobado_por, self.fecha_desde, self.fecha_hasta)
+        if self.documentos:
+            if any(valor is not None for valor in filtro):
+                raise ValueError("Indicar documentos o un filtro, no ambos")
+        elif any(valor is None for valor in filtro):
+            raise ValueError("Indicar documentos, o tipo, aprobado_por, fecha_desde y fecha_hasta")
+        return self
@@ -1,12 +1,25 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
+# Indicadores de un local (sucursal)
+class OrdenCompraIndicadoresLocal(BaseModel):
+    Loc_cod: int
+    loc_des: Optional[str] = None
+    total: int = 0
+    pendientes: int = 0
+    aprobadas: int = 0
+    monto_pendientes: int = Field(0, description="Suma de monto_total de las pendientes")
+    monto_aprobadas: int = Field(0, description="Suma de monto_total de las aprobadas")
+
 # Esquema para indicadores del dashboard
 class OrdenCompraIndicadores(BaseModel):
     total: int
     pendientes: int
     aprobadas: int
+    monto_pendientes: int = Field(0, description="Suma de monto_total de las pendientes")
+    monto_aprobadas: int = Field(0, description="Suma de monto_total de las aprobadas")
+    por_local: List[OrdenCompraIndicadoresLocal] = Field(default_factory=list)
 
 # Esquema base
 class OrdenCompraBase(BaseModel):
@@ -26,7 +39,7 @@ class OrdenCompraDetalle(OrdenCompraBase):
     ocp_fee: date
     proveedor_nombre: str
     monto_total: int
-    tienepdf: Optional[int] = Field(None, description="0=no existe, 1=tiene PDF, 2=existe sin contenido", ge=0, le=2)
+    tienepdf: Optional[int] = Field(None, description="0=no existe, 1=tiene PDF, 2=existe sin contenido, null=desconocido (REPPDF no disponible)", ge=0, le=2)
     loc_des: Optional[str] = None
 
     # Flujo de aprobaciones para lista
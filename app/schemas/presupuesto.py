@@ -3,7 +3,18 @@ Schemas Pydantic para presupuestos y sus indicadores
 """
 from pydantic import BaseModel, Field
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
+
+
+class PresupuestoIndicadoresLocal(BaseModel):
+    """Indicadores de presupuestos de un local (sucursal)."""
+
+    Loc_cod: int = Field(..., description="Código de local")
+    loc_des: Optional[str] = Field(None, description="Nombre de la sucursal")
+    pendientes: int = Field(0, description="Presupuestos pendientes de aprobación final", ge=0)
+    aprobados: int = Field(0, description="Presupuestos aprobados por gerencia", ge=0)
+    monto_pendientes: int = Field(0, description="Suma de Pre_Neto de los pendientes")
+    monto_aprobados: int = Field(0, description="Suma de Pre_Neto de los aprobados")
 
 
 class PresupuestoIndicadores(BaseModel):
@@ -13,6 +24,9 @@ class PresupuestoIndicadores(BaseModel):
     Attributes:
         pendientes: Total de presupuestos pendientes de aprobación (Pre_vbLib=1 AND pre_vbgg=0)
         aprobados: Total de presupuestos aprobados (pre_vbgg=1)
+        monto_pendientes: Suma de Pre_Neto de los pendientes
+        monto_aprobados: Suma de Pre_Neto de los aprobados
+        por_local: Los mismos indicadores desglosados por local
     """
     
     pendientes: int = Field(
@@ -25,12 +39,30 @@ class PresupuestoIndicadores(BaseModel):
         description="Total de presupuestos aprobados por gerencia",
         ge=0
     )
+    monto_pendientes: int = Field(0, description="Suma de Pre_Neto de los pendientes")
+    monto_aprobados: int = Field(0, description="Suma de Pre_Neto de los aprobados")
+    por_local: List[PresupuestoIndicadoresLocal] = Field(
+        default_factory=list,
+        description="Indicadores por local (solo locales con presupuestos pendientes o aprobados)"
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
                 "pendientes": 15,
-                "aprobados": 234
+                "aprobados": 234,
+                "monto_pendientes": 45000000,
+                "monto_aprobados": 980000000,
+                "por_local": [
+                    {
+                        "Loc_cod": 1,
+                        "loc_des": "Casa Matriz",
+                        "pendientes": 15,
+                        "aprobados": 234,
+                        "monto_pendientes": 45000000,
+                        "monto_aprobados": 980000000
+                    }
+                ]
             }
         }
 
@@ -69,7 +101,7 @@ class PresupuestoDetalle(PresupuestoBase):
     pre_vbggDt: Optional[date] = Field(None, description="Fecha VB Gerencia")
     pre_trnFec: date = Field(..., description="Fecha de transacción")
     pre_trnusu: str = Field(..., description="Usuario de transacción")
-    tienepdf: Optional[int] = Field(None, description="0=no existe, 1=tiene PDF, 2=existe sin contenido", ge=0, le=2)
+    tienepdf: Optional[int] = Field(None, description="0=no existe, 1=tiene PDF, 2=existe sin contenido, null=desconocido (REPPDF no disponible)", ge=0, le=2)
     loc_des: Optional[str] = Field(None, description="Nombre de la sucursal")
 
     class Config:
@@ -0,0 +1,250 @@
+"""
+Asesor de índices para la BD MySQL de un tenant (/tenant/db-check).
+
+Las BDs de los tenants son del cliente y sus claves (schema/db_tables.sql) no calzan
+con los filtros de los listados: p.ej. Pre_vbLib/pre_vbgg/pre_est ORDER BY pre_fec en
+cot013, o lower(ocp_A1_Usu) en adq004, que ningún índice sobre la columna puede usar.
+
+Por cada query caliente (las mismas que arman los servicios, con valores de muestra):
+- EXPLAIN y se marca full scan (type ALL/index), filesort y tabla temporal sobre la
+  tabla principal; si hay alguno, también las funciones aplicadas a columnas en el
+  WHERE (lower(col) = ...).
+- Si hay problemas y el tenant no tiene un índice con las columnas sugeridas como
+  prefijo, se genera el CREATE INDEX listo para aplicar.
+
+Los índices funcionales (lower(ocp_A1_Usu)) requieren MySQL 8.0.13+; en versiones
+anteriores o MariaDB se sugiere la alternativa sin la columna del usuario.
+Nada se aplica automáticamente.
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.services.orden_compra_service import OrdenCompraService
+from app.services.presupuesto_service import PresupuestoService
+
+logger = logging.getLogger(__name__)
+
+# Valores de muestra: el plan no depende de que existan filas con ellos
+_USUARIO_MUESTRA = "ADMIN"
+_DIAS_MUESTRA = 30
+_LIMITE_MUESTRA = 100
+
+_VERSION_INDICES_FUNCIONALES = (8, 0, 13)
+_FUNCION_SOBRE_COLUMNA = re.compile(r"\b(lower|upper|trim|date|cast)\((?:`?\w+`?\.)?`?(\w+)`?\)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class IndiceSugerido:
+    nombre: str
+    tabla: str
+    # Columnas en orden; una parte funcional va entre paréntesis: "(lower(`ocp_A1_Usu`))"
+    columnas: Tuple[str, ...]
+
+    @property
+    def funcional(self) -> bool:
+        return any(c.startswith("(") for c in self.columnas)
+
+    def ddl(self) -> str:
+        partes = ", ".join(c if c.startswith("(") else f"`{c}`" for c in self.columnas)
+        return f"CREATE INDEX `{self.nombre}` ON `{self.tabla}` ({partes});"
+
+
+@dataclass(frozen=True)
+class ConsultaCaliente:
+    nombre: str
+    tabla: str
+    consulta: Callable[[], Select]
+    indice: IndiceSugerido
+    # Sin soporte de índices funcionales
+    alternativa: Optional[IndiceSugerido] = None
+
+
+@dataclass
+class DiagnosticoConsulta:
+    consulta: str
+    tabla: str
+    tipo_acceso: Optional[str] = None
+    indice_usado: Optional[str] = None
+    filas_estimadas: Optional[int] = None
+    problemas: List[str] = field(default_factory=list)
+    indice_sugerido: Optional[str] = None
+    ok: bool = True
+
+
+def _rango_muestra() -> Tuple[date, date]:
+    hoy = date.today()
+    return hoy - timedelta(days=_DIAS_MUESTRA), hoy
+
+
+_INDICE_OC_APROBADAS_FECHA = IndiceSugerido(
+    "mcn_adq004_aprobadas", "adq004", ("ocp_A1_Ap", "ocp_A1_Dt", "ocp_A1_Hr", "Loc_cod", "ocp_nro"),
+)
+
+CONSULTAS_CALIENTES: Tuple[ConsultaCaliente, ...] = (
+    ConsultaCaliente(
+        "presupuestos_pendientes", "cot013",
+        lambda: PresupuestoService.consulta_pendientes(limit=_LIMITE_MUESTRA),
+        # pre_est <> 'N' no es igualdad: va al final, se filtra en el índice (ICP)
+        IndiceSugerido(
+            "mcn_cot013_pendientes", "cot013",
+            ("Pre_vbLib", "pre_vbgg", "pre_fec", "Loc_cod", "pre_nro", "pre_est"),
+        ),
+    ),
+    ConsultaCaliente(
+        "presupuestos_aprobados", "cot013",
+        lambda: PresupuestoService.consulta_aprobados(_USUARIO_MUESTRA, *_rango_muestra(), limit=_LIMITE_MUESTRA),
+        IndiceSugerido(
+            "mcn_cot013_aprobados", "cot013",
+            ("pre_vbgg", "pre_vbggUsu", "pre_vbggDt", "Loc_cod", "pre_nro"),
+        ),
+    ),
+    ConsultaCaliente(
+        "ordenes_pendientes", "adq004",
+        lambda: OrdenCompraService().consulta_pendientes(limit=_LIMITE_MUESTRA),
+        # ocp_pdt IN (...) antes de ocp_fec rompería el orden del índice: va al final (ICP)
+        IndiceSugerido(
+            "mcn_adq004_pendientes", "adq004",
+            ("ocp_A1_Ap", "ocp_A2_Ap", "ocp_fec", "Loc_cod", "ocp_nro", "ocp_pdt"),
+        ),
+    ),
+    ConsultaCaliente(
+        "ordenes_aprobadas_hoy", "adq004",
+        lambda: OrdenCompraService().consulta_aprobadas(limit=_LIMITE_MUESTRA),
+        _INDICE_OC_APROBADAS_FECHA,
+    ),
+    ConsultaCaliente(
+        "ordenes_aprobadas_usuario", "adq004",
+        lambda: OrdenCompraService().consulta_aprobadas(_USUARIO_MUESTRA, *_rango_muestra(), limit=_LIMITE_MUESTRA),
+        IndiceSugerido(
+            "mcn_adq004_aprobadas_usuario", "adq004",
+            ("ocp_A1_Ap", "(lower(`ocp_A1_Usu`))", "ocp_A1_Dt", "ocp_A1_Hr", "Loc_cod", "ocp_nro"),
+        ),
+        alternativa=_INDICE_OC_APROBADAS_FECHA,
+    ),
+)
+
+
+def version_mysql(texto: str) -> Tuple[Tuple[int, ...], bool]:
+    """('8.0.35-log') -> ((8, 0, 35), es_mariadb)."""
+    numeros = re.match(r"(\d+)\.(\d+)\.(\d+)", texto or "")
+    version = tuple(int(n) for n in numeros.groups()) if numeros else (0, 0, 0)
+    return version, "mariadb" in (texto or "").lower()
+
+
+def _normalizar(parte: str) -> str:
+    return re.sub(r"[`()\s]", "", parte).lower()
+
+
+def tiene_prefijo(indices: Dict[str, List[str]], columnas: Sequence[str]) -> Optional[str]:
+    """Nombre de un índice existente cuyas primeras columnas son `columnas`, o None."""
+    buscadas = [_normalizar(c) for c in columnas]
+    for nombre, partes in indices.items():
+        if [_normalizar(p) for p in partes[:len(buscadas)]] == buscadas:
+            return nombre
+    return None
+
+
+def problemas_plan(filas: Sequence[dict], tabla: str) -> List[str]:
+    """Problemas de las filas de EXPLAIN (formato tradicional) que leen `tabla`."""
+    problemas = []
+    for fila in filas:
+        if (fila.get("table") or "").lower() != tabla.lower():
+            continue
+        extra = fila.get("Extra") or ""
+        if fila.get("type") == "ALL":
+            problemas.append("Full table scan")
+        elif fila.get("type") == "index":
+            problemas.append("Full index scan")
+        if "Using filesort" in extra:
+            problemas.append("Using filesort")
+        if "Using temporary" in extra:
+            problemas.append("Using temporary")
+    return problemas
+
+
+def funciones_sobre_columnas(where: str) -> List[str]:
+    """Columnas envueltas en una función en el WHERE (ningún índice sobre la columna sirve)."""
+    return [
+        f"{m.group(1).lower()}({m.group(2)}) impide usar un índice sobre {m.group(2)}"
+        for m in _FUNCION_SOBRE_COLUMNA.finditer(where)
+    ]
+
+
+class AsesorIndices:
+    """EXPLAIN de las queries calientes en la BD del tenant y DDL de los índices que faltan."""
+
+    @staticmethod
+    def _indices(db: Session, tabla: str) -> Dict[str, List[str]]:
+        """{Key_name: [columna o expresión, ...]} en orden de Seq_in_index."""
+        indices: Dict[str, List[Tuple[int, str]]] = {}
+        for fila in db.execute(text(f"SHOW INDEX FROM `{tabla}`")).mappings():
+            parte = fila.get("Column_name") or fila.get("Expression") or ""
+            indices.setdefault(fila["Key_name"], []).append((fila["Seq_in_index"], parte))
+        return {nombre: [p for _, p in sorted(partes)] for nombre, partes in indices.items()}
+
+    @staticmethod
+    def diagnosticar(db: Session, tablas_existentes: Sequence[str]) -> Tuple[List[DiagnosticoConsulta], List[str]]:
+        """
+        Retorna (diagnóstico por query, DDL sugerido sin duplicados). Las queries sobre
+        tablas que no existen en el tenant se omiten (ya las reporta el chequeo de schema).
+        """
+        version, mariadb = version_mysql(db.execute(text("SELECT VERSION()")).scalar())
+        funcionales = not mariadb and version >= _VERSION_INDICES_FUNCIONALES
+        dialecto = db.get_bind().dialect
+        existentes = {t.lower() for t in tablas_existentes}
+        indices_por_tabla: Dict[str, Dict[str, List[str]]] = {}
+
+        diagnosticos: List[DiagnosticoConsulta] = []
+        ddl: List[str] = []
+        for caliente in CONSULTAS_CALIENTES:
+            if caliente.tabla not in existentes:
+                continue
+            diagnostico = DiagnosticoConsulta(consulta=caliente.nombre, tabla=caliente.tabla)
+            diagnosticos.append(diagnostico)
+
+            consulta = caliente.consulta()
+            compilar = {"literal_binds": True}
+            sql = str(consulta.compile(dialect=dialecto, compile_kwargs=compilar))
+            where = str(consulta.whereclause.compile(dialect=dialecto, compile_kwargs=compilar))
+            try:
+                # Sin parámetros: el driver no interpreta el SQL como plantilla
+                filas = [dict(f) for f in db.connection().exec_driver_sql(f"EXPLAIN {sql}").mappings()]
+            except Exception as e:
+                logger.warning(f"EXPLAIN de {caliente.nombre} falló: {e}")
+                diagnostico.problemas.append(f"EXPLAIN falló: {e}")
+                diagnostico.ok = False
+                continue
+
+            principal = next((f for f in filas if (f.get("table") or "").lower() == caliente.tabla), {})
+            diagnostico.tipo_acceso = principal.get("type")
+            diagnostico.indice_usado = principal.get("key")
+            diagnostico.filas_estimadas = principal.get("rows")
+            diagnostico.problemas = problemas_plan(filas, caliente.tabla)
+            if not diagnostico.problemas:
+                continue
+            # Explica por qué no sirven los índices existentes sobre esas columnas
+            diagnostico.problemas += funciones_sobre_columnas(where)
+            diagnostico.ok = False
+
+            indice = caliente.indice
+            if indice.funcional and not funcionales:
+                indice = caliente.alternativa
+            if indice is None:
+                continue
+            if caliente.tabla not in indices_por_tabla:
+                indices_por_tabla[caliente.tabla] = AsesorIndices._indices(db, caliente.tabla)
+            if tiene_prefijo(indices_por_tabla[caliente.tabla], indice.columnas):
+                # El índice ya existe: el optimizador lo descarta (tabla chica, estadísticas)
+                continue
+            diagnostico.indice_sugerido = indice.ddl()
+            if diagnostico.indice_sugerido not in ddl:
+                ddl.append(diagnostico.indice_sugerido)
+
+        return diagnosticos, ddl
@@ -1,7 +1,8 @@
 """
 Servicio de lógica de negocio para autenticación
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from app.models.usuario import Usuario
 from app.core.security import verify_password, create_access_token
@@ -14,7 +15,7 @@ class AuthService:
     """
     
     @staticmethod
-    def autenticar_usuario(db: Session, usuario: str, password: str) -> dict:
+    async def autenticar_usuario(db: AsyncSession, usuario: str, password: str) -> dict:
         """
         Autentica un usuario verificando sus credenciales.
         
@@ -30,7 +31,8 @@ class AuthService:
             ValueError: Si las credenciales son inválidas
         """
         # Buscar usuario en la base de datos
-        db_usuario = db.query(Usuario).filter(Usuario.UserCd == usuario).first()
+        result = await db.execute(select(Usuario).where(Usuario.UserCd == usuario))
+        db_usuario = result.scalars().first()
         
         if not db_usuario:
             raise ValueError("Usuario o contraseña incorrectos")
@@ -0,0 +1,183 @@
+"""
+Carga masiva de PDFs en documentos_pdf (POST /documentos-pdf/bulk).
+
+El lote llega como partes multipart (un PDF por parte) o como un zip; cada archivo
+debe llamarse <tipo>_<numero>.pdf. Los archivos válidos se escriben en lotes de
+PDF_BULK_BATCH_SIZE, una transacción por lote (DocumentoPdfService.upsert_lote),
+y se informa el estado de cada item.
+"""
+from dataclasses import dataclass
+from functools import partial
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import re
+import zipfile
+import zlib
+
+import anyio
+import asyncpg
+import zstandard
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.documento_pdf import ResultadoCargaItem, ResultadoCargaMasiva
+from app.services.documento_pdf_service import DocumentoPdfService, ItemCarga
+from app.services.linealizacion_pdf import linealizador_pdf
+from app.services.pdf_cache import pdf_cache
+from app.services.reppdf_client import TIPO_ORDEN_COMPRA, TIPO_PRESUPUESTO
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_PDF = re.compile(r"^(\d+)_(\d+)\.pdf$", re.IGNORECASE)
+FIRMA_PDF = b"%PDF-"
+
+
+@dataclass(frozen=True)
+class ArchivoRecibido:
+    """Un archivo del lote aún sin validar (ver ItemCarga para `abrir` y `cerrar`)."""
+    nombre: str
+    tamano: int
+    abrir: Callable[[], BinaryIO]
+    cerrar: bool = True
+
+
+def archivos_zip(zip_file: zipfile.ZipFile) -> List[ArchivoRecibido]:
+    """Miembros del zip; se descomprimen recién al escribirlos en PostgreSQL."""
+    return [
+        ArchivoRecibido(info.filename, info.file_size, partial(zip_file.open, info))
+        for info in zip_file.infolist()
+        if not info.is_dir()
+    ]
+
+
+def _error(nombre: str, detalle: str, tipo: Optional[int] = None, numero: Optional[int] = None) -> ResultadoCargaItem:
+    return ResultadoCargaItem(nombre=nombre, tipo=tipo, numero=numero, estado="error", detalle=detalle)
+
+
+def validar_archivo(archivo: ArchivoRecibido, max_bytes: int) -> Tuple[Optional[ItemCarga], Optional[ResultadoCargaItem]]:
+    """
+    Valida nombre, tipo, tamaño y firma %PDF- de un archivo (lee solo los primeros bytes).
+
+    Returns:
+        (item, None) si es válido, o (None, resultado con estado "error")
+    """
+    coincidencia = NOMBRE_PDF.match(os.path.basename(archivo.nombre))
+    if not coincidencia:
+        return None, _error(archivo.nombre, "Nombre inválido, se espera <tipo>_<numero>.pdf")
+    tipo, numero = int(coincidencia.group(1)), int(coincidencia.group(2))
+    if tipo not in (TIPO_PRESUPUESTO, TIPO_ORDEN_COMPRA):
+        return None, _error(archivo.nombre, f"Tipo {tipo} inválido (1=presupuesto, 2=orden de compra)", tipo, numero)
+    if archivo.tamano == 0:
+        return None, _error(archivo.nombre, "Archivo vacío", tipo, numero)
+    if archivo.tamano > max_bytes:
+        return None, _error(archivo.nombre, f"Archivo excede {max_bytes} bytes", tipo, numero)
+
+    try:
+        contenido = archivo.abrir()
+        try:
+            firma = contenido.read(len(FIRMA_PDF))
+        finally:
+            if archivo.cerrar:
+                contenido.close()
+    except (OSError, zipfile.BadZipFile, zlib.error, RuntimeError) as e:
+        return None, _error(archivo.nombre, f"No se pudo leer el archivo: {e}", tipo, numero)
+    if firma != FIRMA_PDF:
+        return None, _error(archivo.nombre, "El archivo no es un PDF", tipo, numero)
+
+    return ItemCarga(archivo.nombre, tipo, numero, archivo.tamano, archivo.abrir, archivo.cerrar), None
+
+
+class CargaMasivaPdfService:
+    """
+    Servicio para la carga masiva de PDFs.
+    """
+
+    @staticmethod
+    async def cargar(
+        db: AsyncSession,
+        tenant_id: int,
+        archivos: List[ArchivoRecibido],
+        tamano_lote: int,
+        max_bytes: int,
+        errores_previos: Optional[List[ResultadoCargaItem]] = None,
+    ) -> ResultadoCargaMasiva:
+        """
+        Valida y escribe los archivos del lote en documentos_pdf.
+
+        - Un (tipo, numero) repetido en el mismo request: gana el último, los anteriores
+          quedan "omitido".
+        - Si falla la transacción de un lote, sus items se reintentan de a uno para que
+          un archivo malo no arrastre al resto.
+
+        Args:
+            errores_previos: Items ya rechazados por el endpoint (p.ej. un zip corrupto)
+        """
+        resultados: List[ResultadoCargaItem] = list(errores_previos or [])
+        validados = await anyio.to_thread.run_sync(
+            lambda: [validar_archivo(archivo, max_bytes) for archivo in archivos]
+        )
+
+        # (tipo, numero) -> índice en `resultados` del item vigente
+        posiciones: Dict[Tuple[int, int], int] = {}
+        pendientes: Dict[int, ItemCarga] = {}
+        for item, error in validados:
+            if error is not None:
+                resultados.append(error)
+                continue
+            clave = (item.tipo, item.numero)
+            anterior = posiciones.get(clave)
+            if anterior is not None:
+                pendientes.pop(anterior)
+                resultados[anterior] = ResultadoCargaItem(
+                    nombre=resultados[anterior].nombre, tipo=item.tipo, numero=item.numero,
+                    estado="omitido", detalle=f"Reemplazado por {item.nombre} en el mismo lote",
+                )
+            posiciones[clave] = len(resultados)
+            pendientes[len(resultados)] = item
+            resultados.append(ResultadoCargaItem(nombre=item.nombre, tipo=item.tipo, numero=item.numero, estado="pendiente"))
+
+        indices = list(pendientes)
+        for desde in range(0, len(indices), tamano_lote):
+            lote = indices[desde:desde + tamano_lote]
+            if not await CargaMasivaPdfService._escribir_lote(db, tenant_id, lote, pendientes, resultados) and len(lote) > 1:
+                for indice in lote:
+                    await CargaMasivaPdfService._escribir_lote(db, tenant_id, [indice], pendientes, resultados)
+
+        return ResultadoCargaMasiva(
+            total=len(resultados),
+            creados=sum(r.estado == "creado" for r in resultados),
+            actualizados=sum(r.estado == "actualizado" for r in resultados),
+            omitidos=sum(r.estado == "omitido" for r in resultados),
+            errores=sum(r.estado == "error" for r in resultados),
+            items=resultados,
+        )
+
+    @staticmethod
+    async def _escribir_lote(
+        db: AsyncSession,
+        tenant_id: int,
+        lote: List[int],
+        pendientes: Dict[int, ItemCarga],
+        resultados: List[ResultadoCargaItem],
+    ) -> bool:
+        """Escribe un lote en una transacción y actualiza sus resultados. False si falló."""
+        items = [pendientes[i] for i in lote]
+        try:
+            escritos = await DocumentoPdfService.upsert_lote(db, tenant_id, items)
+        except (SQLAlchemyError, asyncpg.PostgresError, ValueError, OSError, zipfile.BadZipFile, zlib.error, zstandard.ZstdError) as e:
+            logger.warning(f"Carga masiva tenant {tenant_id}: falló lote de {len(items)} PDFs: {e}")
+            await db.rollback()
+            for indice, item in zip(lote, items):
+                resultados[indice] = _error(item.nombre, str(e), item.tipo, item.numero)
+            return False
+
+        for indice, item in zip(lote, items):
+            escrito = escritos[(item.tipo, item.numero)]
+            resultados[indice] = ResultadoCargaItem(
+                nombre=item.nombre, tipo=item.tipo, numero=item.numero,
+                estado="creado" if escrito.creado else "actualizado", id=escrito.id,
+            )
+            pdf_cache.invalidar_documento(tenant_id, item.tipo, item.numero)
+        linealizador_pdf.programar(escrito.sha256 for escrito in escritos.values())
+        return True
@@ -0,0 +1,174 @@
+"""
+Descarga de varios PDFs en un zip armado al vuelo (POST /documentos-pdf/zip).
+
+- Los metadatos se consultan por lotes: primero pdf001_meta (REPPDF) y, para los que
+  no están ahí (p.ej. aprobados, cuyo PDF se borra de pdf001), documentos_pdf.
+- Cada PDF se transmite por ventanas (SUBSTRING / substr) directo al zip, que se
+  escribe sobre un stream no seekable: la memoria no depende de la cantidad ni del
+  tamaño de los archivos.
+- Los documentos que no se encuentran se listan en faltantes.txt al final del zip.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+import io
+import logging
+import zipfile
+
+from app.db.session_postgres import SessionPostgresAsync
+from app.db.tenant_session import get_tenant_async_session
+from app.services.documento_pdf_service import DocumentoPdfService
+from app.services.orden_compra_service import OrdenCompraService
+from app.services.presupuesto_service import PresupuestoService
+from app.services.reppdf_client import (
+    reppdf_client, PdfMeta, ReppdfNoDisponibleError, TIPO_ORDEN_COMPRA, TIPO_PRESUPUESTO,
+)
+
+logger = logging.getLogger(__name__)
+
+ClaveZip = Tuple[int, int, int]  # (tipo, loc_cod, numero)
+
+NOMBRES_TIPO = {TIPO_PRESUPUESTO: "presupuesto", TIPO_ORDEN_COMPRA: "orden_compra"}
+
+
+@dataclass(frozen=True)
+class EntradaZip:
+    """Un archivo del zip; `chunks` se invoca recién al escribirlo."""
+    nombre: str
+    tamano: int
+    fecha: Optional[datetime]
+    chunks: Callable[[], AsyncIterator[bytes]]
+
+
+class _SalidaZip(io.RawIOBase):
+    """
+    Destino no seekable para zipfile: acumula lo escrito hasta que se vacía. Como
+    tell() falla, zipfile escribe cada entrada con data descriptor (sin volver atrás).
+    """
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def _fecha_zip(fecha: Optional[datetime]) -> Tuple[int, int, int, int, int, int]:
+    fecha = fecha or datetime.now()
+    if fecha.year < 1980:
+        fecha = datetime(1980, 1, 1)
+    return fecha.timetuple()[:6]
+
+
+async def zip_en_flujo(entradas: AsyncIterable[EntradaZip]) -> AsyncIterator[bytes]:
+    """
+    Genera un zip a partir de entradas asíncronas, entregando los bytes a medida que
+    se escriben. Los PDFs ya vienen comprimidos: se guardan sin compresión (ZIP_STORED).
+    """
+    salida = _SalidaZip()
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_STORED, allowZip64=True) as zip_file:
+        async for entrada in entradas:
+            info = zipfile.ZipInfo(entrada.nombre, date_time=_fecha_zip(entrada.fecha))
+            # Con el tamaño declarado zipfile decide si la entrada necesita ZIP64
+            info.file_size = entrada.tamano
+            with zip_file.open(info, "w") as destino:
+                async for chunk in entrada.chunks():
+                    destino.write(chunk)
+                    datos = salida.vaciar()
+                    if datos:
+                        yield datos
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def _texto(nombre: str, contenido: str) -> EntradaZip:
+    datos = contenido.encode("utf-8")
+
+    async def chunks():
+        yield datos
+    return EntradaZip(nombre, len(datos), None, chunks)
+
+
+class DescargaZipPdfService:
+    """
+    Servicio para la descarga de PDFs de varios documentos en un solo zip.
+    """
+
+    @staticmethod
+    async def claves_aprobadas(
+        tenant, tipo: int, usuario: str, fecha_desde: date, fecha_hasta: date, limite: int
+    ) -> List[ClaveZip]:
+        """Claves de los documentos de `tipo` aprobados por `usuario` entre dos fechas."""
+        async with get_tenant_async_session(tenant) as db:
+            if tipo == TIPO_PRESUPUESTO:
+                claves = await PresupuestoService.claves_aprobadas(db, usuario, fecha_desde, fecha_hasta, limite)
+            else:
+                claves = await OrdenCompraService().claves_aprobadas(db, usuario, fecha_desde, fecha_hasta, limite)
+        return [(tipo, loc_cod, numero) for loc_cod, numero in claves]
+
+    @staticmethod
+    def generar_zip(tenant_id: int, claves: List[ClaveZip], tamano_lote: int) -> AsyncIterator[bytes]:
+        """Stream del zip con el PDF de cada clave (sin duplicados, en el orden recibido)."""
+        return zip_en_flujo(DescargaZipPdfService._entradas(tenant_id, list(dict.fromkeys(claves)), tamano_lote))
+
+    @staticmethod
+    async def _entradas(tenant_id: int, claves: List[ClaveZip], tamano_lote: int) -> AsyncIterator[EntradaZip]:
+        faltantes: List[str] = []
+        async with SessionPostgresAsync() as pg:
+            for desde in range(0, len(claves), tamano_lote):
+                lote = claves[desde:desde + tamano_lote]
+                reppdf, locales, sin_reppdf = await DescargaZipPdfService._metadatos_lote(pg, tenant_id, lote)
+                for tipo, loc_cod, numero in lote:
+                    nombre = f"{NOMBRES_TIPO.get(tipo, f'tipo{tipo}')}_{loc_cod}_{numero}.pdf"
+                    meta = reppdf.get((tipo, loc_cod, numero))
+                    if meta is not None:
+                        yield EntradaZip(
+                            nombre, meta.tamano, meta.actualizado,
+                            lambda t=tipo, loc=loc_cod, n=numero, m=meta:
+                                reppdf_client.iterar_pdf(tenant_id, t, loc, n, 0, m.tamano),
+                        )
+                        continue
+                    fila = locales.get((tipo, numero))
+                    if fila is not None:
+                        yield EntradaZip(
+                            nombre, fila.tamano, fila.fecha_actualizacion,
+                            lambda f=fila: DocumentoPdfService.iterar_pdf(pg, f.sha256, 0, f.tamano),
+                        )
+                        continue
+                    faltantes.append(f"{nombre}: {'REPPDF no disponible' if tipo in sin_reppdf else 'no encontrado'}")
+
+        if faltantes:
+            yield _texto("faltantes.txt", "\n".join(faltantes) + "\n")
+
+    @staticmethod
+    async def _metadatos_lote(pg, tenant_id: int, lote: List[ClaveZip]):
+        """
+        Metadatos del lote: {(tipo, loc, numero): PdfMeta} de REPPDF y, para el resto,
+        {(tipo, numero): fila} de documentos_pdf, más los tipos que no se pudieron
+        consultar en REPPDF. Los PDFs vacíos se omiten.
+        """
+        reppdf: Dict[ClaveZip, PdfMeta] = {}
+        sin_reppdf: Set[int] = set()
+        for tipo in dict.fromkeys(t for t, _, _ in lote):
+            items = [(loc_cod, numero) for t, loc_cod, numero in lote if t == tipo]
+            try:
+                metas = await reppdf_client.metadatos_lote(tenant_id, tipo, items)
+            except ReppdfNoDisponibleError as e:
+                # Sin REPPDF todavía se puede servir lo que esté en documentos_pdf
+                logger.warning(f"Zip PDFs tenant {tenant_id}: REPPDF no disponible para {len(items)} docs: {e}")
+                metas = {}
+                sin_reppdf.add(tipo)
+            reppdf.update({(tipo, loc, n): m for (loc, n), m in metas.items() if m.tamano > 0})
+
+        pendientes = [(t, n) for t, loc, n in lote if (t, loc, n) not in reppdf]
+        locales = await DocumentoPdfService.metadatos_lote(pg, tenant_id, pendientes)
+        return reppdf, {clave: fila for clave, fila in locales.items() if fila.tamano}, sin_reppdf
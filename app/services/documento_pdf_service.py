@@ -0,0 +1,399 @@
+"""
+Servicio de lógica de negocio para documentos PDF (PostgreSQL, tablas documentos_pdf y pdf_blobs)
+
+El contenido se guarda una sola vez por sha256 en pdf_blobs, comprimido con zstd
+cuando ahorra espacio y el PDF no pasa de COMPRESION_MAX_BYTES; documentos_pdf solo
+apunta al hash. Un upload cuyo hash ya
+existe no vuelve a transmitir ni comprimir el PDF. La descompresión al leer es
+transparente (iterar_pdf).
+"""
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
+import os
+import struct
+import tempfile
+
+import anyio
+import zstandard
+from sqlalchemy import Row, func, select, tuple_
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.documento_pdf import DocumentoPDF
+from app.models.pdf_blob import PdfBlob
+from app.models.pdf_blob_linealizado import PdfBlobLinealizado
+
+# Encabezado y fin del formato binario de COPY (ver "COPY ... BINARY" en la doc. de PostgreSQL)
+_COPY_FIRMA = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_FIN = struct.pack("!h", -1)
+
+TAMANO_CHUNK = 256 * 1024
+
+COMPRESION_ZSTD = "zstd"
+COMPRESION_NINGUNA = "none"
+NIVEL_ZSTD = 3
+# Los PDFs suelen traer sus streams ya comprimidos: solo se guarda en zstd si ahorra al menos esto
+AHORRO_MINIMO = 0.05
+# Un rango de un blob zstd se descomprime desde el byte 0: los PDFs grandes (los que se
+# piden por Range) se guardan sin comprimir para leer la ventana con substr
+COMPRESION_MAX_BYTES = 2 * 1024 * 1024
+
+_INSERTAR_BLOBS_SQL = """
+    INSERT INTO pdf_blobs (sha256, compresion, tamano, tamano_almacenado, contenido)
+    SELECT sha256, compresion, tamano, tamano_almacenado, contenido FROM pdf_blobs_carga
+    ON CONFLICT (sha256) DO NOTHING
+"""
+
+# El refcount de pdf_blobs lo ajusta el trigger trg_documentos_pdf_refcount
+_UPSERT_DOCUMENTOS_SQL = """
+    INSERT INTO documentos_pdf (tenant_id, tipo, numero, sha256, tamano)
+    SELECT $1, d.tipo, d.numero, d.sha256, d.tamano
+    FROM unnest($2::smallint[], $3::bigint[], $4::text[], $5::bigint[]) AS d(tipo, numero, sha256, tamano)
+    ON CONFLICT (tenant_id, tipo, numero) DO UPDATE
+    SET sha256 = EXCLUDED.sha256,
+        tamano = EXCLUDED.tamano,
+        fecha_actualizacion = CASE WHEN documentos_pdf.sha256 = EXCLUDED.sha256
+                                   THEN documentos_pdf.fecha_actualizacion ELSE now() END
+    RETURNING tipo, numero, id, (xmax = 0) AS creado
+"""
+
+
+@dataclass(frozen=True)
+class ResultadoUpsert:
+    id: int
+    creado: bool
+    sha256: str
+    tamano: int
+    # True si el contenido ya estaba en pdf_blobs y no se volvió a guardar
+    blob_existente: bool = False
+
+
+@dataclass(frozen=True)
+class ItemCarga:
+    """
+    Un PDF a guardar. `abrir` retorna un archivo binario síncrono posicionado al inicio
+    (parte multipart ya en disco o miembro de un zip); se cierra tras leerlo salvo que
+    `cerrar` sea False (el dueño del archivo lo cierra).
+    """
+    nombre: str
+    tipo: int
+    numero: int
+    tamano: int
+    abrir: Callable[[], BinaryIO]
+    cerrar: bool = True
+
+
+@dataclass(frozen=True)
+class BlobPreparado:
+    """Contenido listo para COPY a pdf_blobs: el PDF original o su versión zstd."""
+    sha256: str
+    compresion: str
+    tamano: int
+    tamano_almacenado: int
+    abrir: Callable[[], BinaryIO]
+    cerrar: bool = True
+
+
+def tamano_archivo(archivo: BinaryIO) -> int:
+    """Tamaño de un archivo (p.ej. el SpooledTemporaryFile de un UploadFile) sin leerlo."""
+    posicion = archivo.tell()
+    archivo.seek(0, os.SEEK_END)
+    tamano = archivo.tell()
+    archivo.seek(posicion)
+    return tamano
+
+
+def rebobinar(archivo: BinaryIO) -> BinaryIO:
+    """Para usar un archivo abierto como `abrir` de ItemCarga (con cerrar=False)."""
+    archivo.seek(0)
+    return archivo
+
+
+def hash_item(item: ItemCarga) -> str:
+    """sha256 del contenido, leyendo por chunks. Síncrono: correr en un thread."""
+    digest = hashlib.sha256()
+    leidos = 0
+    archivo = item.abrir()
+    try:
+        while True:
+            chunk = archivo.read(TAMANO_CHUNK)
+            if not chunk:
+                break
+            leidos += len(chunk)
+            digest.update(chunk)
+    finally:
+        if item.cerrar:
+            archivo.close()
+    if leidos != item.tamano:
+        raise ValueError(f"{item.nombre}: tamaño inesperado ({leidos} != {item.tamano})")
+    return digest.hexdigest()
+
+
+def preparar_blob(item: ItemCarga, sha256: str, pila: ExitStack) -> BlobPreparado:
+    """
+    Comprime el PDF con zstd a un temporal (cerrado por `pila`). Si no ahorra al menos
+    AHORRO_MINIMO, o pasa de COMPRESION_MAX_BYTES, se guarda el original. Síncrono:
+    correr en un thread.
+    """
+    if item.tamano > COMPRESION_MAX_BYTES:
+        return BlobPreparado(sha256, COMPRESION_NINGUNA, item.tamano, item.tamano, item.abrir, item.cerrar)
+    temporal = pila.enter_context(tempfile.SpooledTemporaryFile(max_size=4 * TAMANO_CHUNK))
+    archivo = item.abrir()
+    try:
+        compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD, write_checksum=True)
+        _, escritos = compresor.copy_stream(
+            archivo, temporal, size=item.tamano, read_size=TAMANO_CHUNK, write_size=TAMANO_CHUNK
+        )
+    finally:
+        if item.cerrar:
+            archivo.close()
+    if escritos <= item.tamano * (1 - AHORRO_MINIMO):
+        return BlobPreparado(sha256, COMPRESION_ZSTD, item.tamano, escritos, lambda: rebobinar(temporal), cerrar=False)
+    return BlobPreparado(sha256, COMPRESION_NINGUNA, item.tamano, item.tamano, item.abrir, item.cerrar)
+
+
+def _campo_texto(valor: str) -> bytes:
+    datos = valor.encode("utf-8")
+    return struct.pack("!i", len(datos)) + datos
+
+
+async def copy_binario_blobs(blobs: List[BlobPreparado]) -> AsyncIterator[bytes]:
+    """
+    Genera un stream COPY BINARY con una fila de pdf_blobs_carga
+    (sha256, compresion, tamano, tamano_almacenado, contenido) por blob. El contenido
+    se lee por chunks en un thread, sin cargarlo entero en memoria.
+    """
+    yield _COPY_FIRMA
+    for blob in blobs:
+        yield (
+            struct.pack("!h", 5)
+            + _campo_texto(blob.sha256)
+            + _campo_texto(blob.compresion)
+            + struct.pack("!iqiqi", 8, blob.tamano, 8, blob.tamano_almacenado, blob.tamano_almacenado)
+        )
+        archivo = await anyio.to_thread.run_sync(blob.abrir)
+        leidos = 0
+        try:
+            while True:
+                chunk = await anyio.to_thread.run_sync(archivo.read, TAMANO_CHUNK)
+                if not chunk:
+                    break
+                leidos += len(chunk)
+                yield chunk
+        finally:
+            if blob.cerrar:
+                archivo.close()
+        if leidos != blob.tamano_almacenado:
+            raise ValueError(f"Blob {blob.sha256}: tamaño inesperado ({leidos} != {blob.tamano_almacenado})")
+    yield _COPY_FIN
+
+
+async def conexion_asyncpg(db: AsyncSession):
+    """Conexión asyncpg subyacente de la sesión (para COPY y transacciones explícitas)."""
+    conexion = await db.connection()
+    return (await conexion.get_raw_connection()).driver_connection
+
+
+class DocumentoPdfService:
+    """
+    Servicio para la carga y lectura de PDFs en documentos_pdf / pdf_blobs.
+    """
+
+    @staticmethod
+    async def upsert(db: AsyncSession, tenant_id: int, tipo: int, numero: int, archivo) -> ResultadoUpsert:
+        """
+        Inserta o reemplaza el PDF de (tenant_id, tipo, numero) sin cargarlo entero en memoria.
+
+        Args:
+            db: Sesión asíncrona de PostgreSQL (asyncpg)
+            archivo: UploadFile (ya volcado a disco por el parser multipart)
+
+        Returns:
+            ResultadoUpsert con el id y si el registro fue creado (True) o reemplazado (False)
+        """
+        item = ItemCarga(
+            archivo.filename or f"{tipo}_{numero}.pdf", tipo, numero,
+            tamano_archivo(archivo.file), lambda: rebobinar(archivo.file), cerrar=False,
+        )
+        resultados = await DocumentoPdfService.upsert_lote(db, tenant_id, [item])
+        return resultados[(tipo, numero)]
+
+    @staticmethod
+    async def upsert_lote(
+        db: AsyncSession, tenant_id: int, items: List[ItemCarga]
+    ) -> Dict[Tuple[int, int], ResultadoUpsert]:
+        """
+        Inserta o reemplaza varios PDFs en una sola transacción.
+
+        1. Calcula el sha256 de cada archivo localmente.
+        2. Guarda los blobs que falten (ver guardar_blobs).
+        3. Un solo INSERT ... ON CONFLICT DO UPDATE apunta los documentos a sus blobs.
+
+        Los items deben tener (tipo, numero) distintos: PostgreSQL no permite que un
+        mismo INSERT ... ON CONFLICT afecte dos veces la misma fila.
+
+        Returns:
+            {(tipo, numero): ResultadoUpsert} de cada item del lote
+        """
+        hashes = await anyio.to_thread.run_sync(lambda: [hash_item(item) for item in items])
+
+        asyncpg_conn = await conexion_asyncpg(db)
+        with ExitStack() as pila:
+            async with asyncpg_conn.transaction():
+                existentes = await DocumentoPdfService.guardar_blobs(asyncpg_conn, items, hashes, pila)
+                filas = await asyncpg_conn.fetch(
+                    _UPSERT_DOCUMENTOS_SQL,
+                    tenant_id,
+                    [item.tipo for item in items],
+                    [item.numero for item in items],
+                    hashes,
+                    [item.tamano for item in items],
+                )
+
+        por_documento = {(item.tipo, item.numero): (sha256, item) for sha256, item in zip(hashes, items)}
+        resultados: Dict[Tuple[int, int], ResultadoUpsert] = {}
+        for fila in filas:
+            sha256, item = por_documento[(fila["tipo"], fila["numero"])]
+            resultados[(item.tipo, item.numero)] = ResultadoUpsert(
+                id=fila["id"], creado=fila["creado"], sha256=sha256, tamano=item.tamano,
+                blob_existente=sha256 in existentes,
+            )
+        return resultados
+
+    @staticmethod
+    async def guardar_blobs(asyncpg_conn, items: List[ItemCarga], hashes: List[str], pila: ExitStack) -> Set[str]:
+        """
+        Guarda en pdf_blobs el contenido de los items que aún no existe. Debe llamarse
+        dentro de una transacción, antes de insertar las filas que referencian los blobs.
+
+        - Bloquea (FOR KEY SHARE) los blobs que ya existen, para que no los borre un
+          DELETE concurrente; esos no se vuelven a transmitir.
+        - Comprime los nuevos y los envía con un único COPY BINARY a una tabla temporal,
+          de donde pasan a pdf_blobs.
+
+        Returns:
+            Hashes que ya existían
+        """
+        # Un blob por hash, aunque varios items tengan el mismo contenido
+        por_hash = dict(zip(hashes, items))
+        existentes = {
+            fila["sha256"] for fila in await asyncpg_conn.fetch(
+                "SELECT sha256 FROM pdf_blobs WHERE sha256 = ANY($1::text[]) ORDER BY sha256 FOR KEY SHARE",
+                sorted(por_hash),
+            )
+        }
+        nuevos = [(sha256, item) for sha256, item in por_hash.items() if sha256 not in existentes]
+        if not nuevos:
+            return existentes
+        blobs = await anyio.to_thread.run_sync(
+            lambda: [preparar_blob(item, sha256, pila) for sha256, item in nuevos]
+        )
+        await asyncpg_conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS pdf_blobs_carga "
+            "(sha256 text NOT NULL, compresion text NOT NULL, tamano bigint NOT NULL, "
+            "tamano_almacenado bigint NOT NULL, contenido bytea NOT NULL) ON COMMIT DELETE ROWS"
+        )
+        await asyncpg_conn.copy_to_table(
+            "pdf_blobs_carga",
+            source=copy_binario_blobs(blobs),
+            columns=["sha256", "compresion", "tamano", "tamano_almacenado", "contenido"],
+            format="binary",
+        )
+        await asyncpg_conn.execute(_INSERTAR_BLOBS_SQL)
+        return existentes
+
+    @staticmethod
+    async def metadatos_lote(db: AsyncSession, tenant_id: int, claves: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], Row]:
+        """
+        Id, tamaño, sha256 y fecha de un lote de (tipo, numero) en una sola consulta, sin
+        leer los blobs. Los documentos que no existen no aparecen en el resultado.
+        """
+        claves = list(claves)
+        if not claves:
+            return {}
+        result = await db.execute(
+            select(
+                DocumentoPDF.tipo, DocumentoPDF.numero, DocumentoPDF.id,
+                DocumentoPDF.tamano, DocumentoPDF.sha256, DocumentoPDF.fecha_actualizacion,
+            ).where(
+                DocumentoPDF.tenant_id == tenant_id,
+                tuple_(DocumentoPDF.tipo, DocumentoPDF.numero).in_(claves),
+            )
+        )
+        return {(fila.tipo, fila.numero): fila for fila in result.all()}
+
+    @staticmethod
+    async def metadatos_descarga(
+        db: AsyncSession, tenant_id: int, tipo: int, numero: int, original: bool = False
+    ) -> Optional[Row]:
+        """
+        Id, sha256, tamaño y fecha del PDF a servir para (tipo, numero), sin leer el blob.
+        Si existe su versión linealizada (ver LinealizadorPdf) se usa esa, salvo con
+        original=True.
+        """
+        if original:
+            return (await db.execute(
+                select(DocumentoPDF.id, DocumentoPDF.sha256, DocumentoPDF.tamano, DocumentoPDF.fecha_actualizacion)
+                .filter_by(tipo=tipo, numero=numero, tenant_id=tenant_id)
+            )).first()
+        blob_linealizado = aliased(PdfBlob)
+        return (await db.execute(
+            select(
+                DocumentoPDF.id,
+                func.coalesce(blob_linealizado.sha256, DocumentoPDF.sha256).label("sha256"),
+                func.coalesce(blob_linealizado.tamano, DocumentoPDF.tamano).label("tamano"),
+                DocumentoPDF.fecha_actualizacion,
+            )
+            .outerjoin(PdfBlobLinealizado, PdfBlobLinealizado.sha256 == DocumentoPDF.sha256)
+            .outerjoin(blob_linealizado, blob_linealizado.sha256 == PdfBlobLinealizado.sha256_linealizado)
+            .where(DocumentoPDF.tenant_id == tenant_id, DocumentoPDF.tipo == tipo, DocumentoPDF.numero == numero)
+        )).first()
+
+    @staticmethod
+    async def iterar_pdf(db: AsyncSession, sha256: str, inicio: int, largo: int) -> AsyncIterator[bytes]:
+        """
+        Entrega los bytes [inicio, inicio + largo) del PDF original.
+
+        Sin compresión lee solo esa ventana con substr. En zstd descomprime en flujo
+        desde el inicio del blob (leído en ventanas de TAMANO_CHUNK) y descarta lo
+        anterior a `inicio`; solo se comprimen PDFs de hasta COMPRESION_MAX_BYTES.
+        """
+        compresion, almacenado = (await db.execute(
+            select(PdfBlob.compresion, PdfBlob.tamano_almacenado).where(PdfBlob.sha256 == sha256)
+        )).one()
+        if compresion == COMPRESION_NINGUNA:
+            async for chunk in DocumentoPdfService._ventanas(db, sha256, inicio, largo):
+                yield chunk
+            return
+
+        fin = inicio + largo
+        posicion = 0
+        descompresor = zstandard.ZstdDecompressor().decompressobj()
+        async for comprimido in DocumentoPdfService._ventanas(db, sha256, 0, almacenado):
+            datos = descompresor.decompress(comprimido)
+            desde, hasta = max(inicio - posicion, 0), min(fin - posicion, len(datos))
+            if desde < hasta:
+                yield datos[desde:hasta]
+            posicion += len(datos)
+            if posicion >= fin:
+                return
+        if posicion < fin:
+            raise ValueError(f"Blob {sha256} truncado: {posicion} de {fin} bytes")
+
+    @staticmethod
+    async def _ventanas(db: AsyncSession, sha256: str, inicio: int, largo: int) -> AsyncIterator[bytes]:
+        """Bytes [inicio, inicio + largo) de pdf_blobs.contenido en ventanas substr de TAMANO_CHUNK."""
+        fin = inicio + largo
+        posicion = inicio
+        while posicion < fin:
+            chunk = (await db.execute(
+                # substr es 1-based
+                select(func.substr(PdfBlob.contenido, posicion + 1, min(TAMANO_CHUNK, fin - posicion)))
+                .where(PdfBlob.sha256 == sha256)
+            )).scalar()
+            if not chunk:
+                raise ValueError(f"Blob {sha256} truncado o eliminado durante la lectura (byte {posicion})")
+            yield bytes(chunk)
+            posicion += len(chunk)
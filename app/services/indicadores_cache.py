@@ -0,0 +1,65 @@
+"""
+Caché en memoria de los indicadores del dashboard (presupuestos y órdenes de compra), por tenant.
+
+Los dashboards consultan /indicadores constantemente; la query de agregación recorre
+cot013/adq004 completas. El resultado se guarda por (tenant, listado) durante
+INDICADORES_CACHE_TTL_SECONDS.
+
+- Los endpoints de aprobar, anular y desaprobar invalidan el tenant tras el commit.
+- El TTL acota lo desactualizado de los cambios hechos fuera de esta API (el ERP
+  escribe directo en la BD del tenant).
+- Cada tenant lleva una generación: un cálculo que empezó antes de una invalidación
+  no se guarda al terminar (traería conteos previos al cambio).
+"""
+from typing import Any, Dict, Optional, Tuple
+import time
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+INDICADORES_PRESUPUESTOS = "presupuestos"
+INDICADORES_ORDENES_COMPRA = "ordenes_compra"
+
+
+class IndicadoresCache:
+    """Indicadores por (tenant_id, listado) con TTL; 0 segundos la deshabilita."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # (tenant_id, listado) -> (indicadores, vence monotonic)
+        self._entradas: Dict[Tuple[int, str], Tuple[Any, float]] = {}
+        self._generaciones: Dict[int, int] = {}
+
+    def generacion(self, tenant_id: int) -> int:
+        """Tomarla antes de calcular y pasarla a guardar()."""
+        return self._generaciones.get(tenant_id, 0)
+
+    def obtener(self, tenant_id: int, listado: str) -> Optional[Any]:
+        clave = (tenant_id, listado)
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        indicadores, vence = entrada
+        if vence <= time.monotonic():
+            del self._entradas[clave]
+            return None
+        return indicadores
+
+    def guardar(self, tenant_id: int, listado: str, indicadores: Any, generacion: int) -> None:
+        if self.ttl <= 0 or generacion != self.generacion(tenant_id):
+            return
+        self._entradas[(tenant_id, listado)] = (indicadores, time.monotonic() + self.ttl)
+
+    def invalidar(self, tenant_id: int) -> None:
+        """Descarta los indicadores del tenant (tras aprobar, anular o desaprobar)."""
+        self._generaciones[tenant_id] = self.generacion(tenant_id) + 1
+        for clave in [c for c in self._entradas if c[0] == tenant_id]:
+            del self._entradas[clave]
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+
+
+# Instancia global del proceso
+indicadores_cache = IndicadoresCache(ttl=settings.INDICADORES_CACHE_TTL_SECONDS)
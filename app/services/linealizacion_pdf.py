@@ -0,0 +1,191 @@
+"""
+Linealización ("fast web view") de los PDFs de documentos_pdf, en segundo plano.
+
+Un PDF linealizado trae primero lo necesario para mostrar la primera página; con
+rangos de bytes (206) el visor la renderiza sin descargar el archivo completo.
+
+- Tras /upsert o /bulk, cada blob nuevo se encola; un pool acotado de procesos qpdf
+  (PDF_LINEARIZAR_PROCESOS) genera la versión linealizada.
+- El original no se toca: la versión linealizada es otro blob de pdf_blobs, asociada
+  al original en pdf_blobs_linealizados (una vez por contenido, no por documento).
+- También se registran los PDFs que ya venían linealizados y los que qpdf no pudo
+  procesar, para no reintentarlos en cada carga.
+"""
+from contextlib import ExitStack
+from functools import partial
+from typing import Dict, Iterable, Optional, Tuple
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+
+import anyio
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.db.session_postgres import SessionPostgresAsync
+from app.models.pdf_blob import PdfBlob
+from app.models.pdf_blob_linealizado import PdfBlobLinealizado
+from app.services.documento_pdf_service import DocumentoPdfService, ItemCarga, conexion_asyncpg, hash_item
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+ESTADO_LINEALIZADO = "linealizado"
+ESTADO_YA_LINEALIZADO = "ya_linealizado"
+ESTADO_ERROR = "error"
+
+# qpdf: 0 = ok, 3 = ok con advertencias (el archivo de salida es válido)
+_SALIDAS_QPDF_OK = (0, 3)
+# El diccionario /Linearized debe ser el primer objeto del archivo (ISO 32000-1, anexo F)
+BYTES_CABECERA = 1024
+
+
+def es_linealizado(cabecera: bytes) -> bool:
+    """True si los primeros bytes del PDF traen el diccionario de linealización."""
+    return b"/Linearized" in cabecera[:BYTES_CABECERA]
+
+
+def _leer_cabecera(ruta: str) -> bytes:
+    with open(ruta, "rb") as archivo:
+        return archivo.read(BYTES_CABECERA)
+
+
+class LinealizadorPdf:
+    """Cola de linealización con qpdf; deshabilitada por config o si qpdf no está instalado."""
+
+    def __init__(self, habilitado: bool, qpdf: str, procesos: int, min_bytes: int, timeout: float):
+        self.habilitado = habilitado
+        self.qpdf = qpdf
+        self.procesos = procesos
+        self.min_bytes = min_bytes
+        self.timeout = timeout
+        self._ejecutable: Optional[str] = None
+        self._tareas: Dict[str, asyncio.Task] = {}
+        self._semaforo: Optional[asyncio.Semaphore] = None
+
+    def _disponible(self) -> bool:
+        if not self.habilitado:
+            return False
+        if self._ejecutable is None:
+            self._ejecutable = shutil.which(self.qpdf)
+            if self._ejecutable is None:
+                logger.warning(f"Linealización de PDFs deshabilitada: no se encontró '{self.qpdf}'")
+                self.habilitado = False
+                return False
+        return True
+
+    def programar(self, hashes: Iterable[str]) -> None:
+        """Encola la linealización de esos blobs (una sola tarea por contenido)."""
+        if not self._disponible():
+            return
+        for sha256 in hashes:
+            if sha256 in self._tareas:
+                continue
+            tarea = asyncio.ensure_future(self._procesar(sha256))
+            self._tareas[sha256] = tarea
+            tarea.add_done_callback(lambda _, s=sha256: self._tareas.pop(s, None))
+
+    async def _procesar(self, sha256: str) -> None:
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.procesos)
+        try:
+            async with self._semaforo:
+                await self._linealizar(sha256)
+        except Exception as e:
+            logger.warning(f"No se pudo linealizar el PDF {sha256}: {e}")
+
+    async def _linealizar(self, sha256: str) -> None:
+        async with SessionPostgresAsync() as pg:
+            fila = (await pg.execute(
+                select(PdfBlob.tamano, PdfBlobLinealizado.estado)
+                .outerjoin(PdfBlobLinealizado, PdfBlobLinealizado.sha256 == PdfBlob.sha256)
+                .where(PdfBlob.sha256 == sha256)
+            )).first()
+            if fila is None or fila.estado is not None or fila.tamano < self.min_bytes:
+                return
+            with ExitStack() as pila:
+                directorio = pila.enter_context(tempfile.TemporaryDirectory())
+                original = os.path.join(directorio, "original.pdf")
+                async with await anyio.open_file(original, "wb") as archivo:
+                    async for chunk in DocumentoPdfService.iterar_pdf(pg, sha256, 0, fila.tamano):
+                        await archivo.write(chunk)
+                await pg.rollback()
+
+                estado, item, detalle = await self._ejecutar_qpdf(sha256, original, directorio)
+                sha256_linealizado = None
+                if item is not None:
+                    sha256_linealizado = await anyio.to_thread.run_sync(hash_item, item)
+                    if sha256_linealizado == sha256:
+                        estado, item, sha256_linealizado = ESTADO_YA_LINEALIZADO, None, None
+                await self._registrar(sha256, estado, item, sha256_linealizado, detalle, pila)
+
+    async def _ejecutar_qpdf(self, sha256: str, original: str, directorio: str) -> Tuple[str, Optional[ItemCarga], Optional[str]]:
+        """Retorna (estado, item con la versión linealizada o None, detalle del error)."""
+        if es_linealizado(await anyio.to_thread.run_sync(_leer_cabecera, original)):
+            return ESTADO_YA_LINEALIZADO, None, None
+
+        salida = os.path.join(directorio, "linealizado.pdf")
+        proceso = await asyncio.create_subprocess_exec(
+            self._ejecutable, "--linearize", original, salida,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, error = await asyncio.wait_for(proceso.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            proceso.kill()
+            await proceso.wait()
+            return ESTADO_ERROR, None, f"qpdf excedió {self.timeout}s"
+        if proceso.returncode not in _SALIDAS_QPDF_OK:
+            return ESTADO_ERROR, None, error.decode("utf-8", "replace").strip()[:1000]
+
+        item = ItemCarga(
+            f"{sha256}.pdf", 0, 0, os.path.getsize(salida), partial(open, salida, "rb"),
+        )
+        return ESTADO_LINEALIZADO, item, None
+
+    @staticmethod
+    async def _registrar(
+        sha256: str, estado: str, item: Optional[ItemCarga], sha256_linealizado: Optional[str],
+        detalle: Optional[str], pila: ExitStack,
+    ) -> None:
+        async with SessionPostgresAsync() as pg:
+            asyncpg_conn = await conexion_asyncpg(pg)
+            async with asyncpg_conn.transaction():
+                # El original pudo borrarse mientras corría qpdf
+                if not await asyncpg_conn.fetchval(
+                    "SELECT 1 FROM pdf_blobs WHERE sha256 = $1 FOR KEY SHARE", sha256
+                ):
+                    return
+                # Serializa los workers que registran el mismo original; si otro ya lo
+                # hizo, guardar el blob lo dejaría con refcount 0 (el INSERT de abajo no
+                # insertaría y el trigger no lo contaría) y nadie lo borraría
+                await asyncpg_conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", sha256)
+                if await asyncpg_conn.fetchval("SELECT 1 FROM pdf_blobs_linealizados WHERE sha256 = $1", sha256):
+                    return
+                if item is not None:
+                    await DocumentoPdfService.guardar_blobs(asyncpg_conn, [item], [sha256_linealizado], pila)
+                await asyncpg_conn.execute(
+                    "INSERT INTO pdf_blobs_linealizados (sha256, estado, sha256_linealizado, detalle) "
+                    "VALUES ($1, $2, $3, $4) ON CONFLICT (sha256) DO NOTHING",
+                    sha256, estado, sha256_linealizado, detalle,
+                )
+        logger.info(f"PDF {sha256}: {estado}")
+
+    async def detener(self) -> None:
+        """Cancela las linealizaciones en curso (shutdown)."""
+        tareas = list(self._tareas.values())
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+
+linealizador_pdf = LinealizadorPdf(
+    habilitado=settings.PDF_LINEARIZAR,
+    qpdf=settings.PDF_QPDF_BIN,
+    procesos=settings.PDF_LINEARIZAR_PROCESOS,
+    min_bytes=settings.PDF_LINEARIZAR_MIN_BYTES,
+    timeout=settings.PDF_LINEARIZAR_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,44 @@
+"""
+Caché en memoria de los nombres de sucursales (loc001), por tenant.
+
+El listado de presupuestos pendientes resuelve loc_des con {Loc_cod: Loc_des}; loc001
+es chica y casi no cambia, así que se lee entera una vez cada LOCALES_CACHE_TTL_SECONDS
+en vez de en cada request. Un local nuevo creado en el ERP aparece al vencer el TTL.
+"""
+from typing import Dict, Optional, Tuple
+import time
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class LocalesCache:
+    """{Loc_cod: Loc_des} por tenant_id con TTL; 0 segundos la deshabilita."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # tenant_id -> (nombres, vence monotonic)
+        self._entradas: Dict[int, Tuple[Dict[int, str], float]] = {}
+
+    def obtener(self, tenant_id: int) -> Optional[Dict[int, str]]:
+        entrada = self._entradas.get(tenant_id)
+        if entrada is None:
+            return None
+        nombres, vence = entrada
+        if vence <= time.monotonic():
+            del self._entradas[tenant_id]
+            return None
+        return nombres
+
+    def guardar(self, tenant_id: int, nombres: Dict[int, str]) -> None:
+        if self.ttl <= 0:
+            return
+        self._entradas[tenant_id] = (nombres, time.monotonic() + self.ttl)
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+
+
+# Instancia global del proceso
+locales_cache = LocalesCache(ttl=settings.LOCALES_CACHE_TTL_SECONDS)
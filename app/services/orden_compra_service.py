@@ -1,15 +1,20 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import text, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, and_, case, func, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.sql import Select
 from datetime import date, datetime
 import pytz
-import os
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import logging
 
 from app.models.orden_compra import OrdenCompra
 from app.models.local import Local
-from app.schemas.orden_compra import OrdenCompraIndicadores, OrdenCompraDetalle, DetalleOrdenCompra, AprobacionOrdenCompra, ItemOrdenCompra
-from app.db.tenant_session import create_tenant_session
+from app.schemas.orden_compra import OrdenCompraIndicadores, OrdenCompraIndicadoresLocal, OrdenCompraDetalle, DetalleOrdenCompra, AprobacionOrdenCompra, ItemOrdenCompra
+from app.services.indicadores_cache import INDICADORES_ORDENES_COMPRA, indicadores_cache
+from app.services.pdf_replica import pdf_replica
+from app.services.proyecciones import listado_ordenes_compra
+from app.services.reppdf_client import TIPO_ORDEN_COMPRA
+from app.utils.keyset import CursorInvalidoError, decodificar_cursor, despues_de, siguiente_cursor
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -18,191 +23,159 @@ logger = logging.getLogger(__name__)
 # Timezone de Chile
 chile_tz = pytz.timezone('America/Santiago')
 
-class OrdenCompraService:
+# Listados paginables por cursor: nombre y clave de orden (descendente)
+CURSOR_PENDIENTES = "ordenes_pendientes"
+CURSOR_APROBADAS = "ordenes_aprobadas"
+ORDEN_PENDIENTES = (OrdenCompra.ocp_fec, OrdenCompra.Loc_cod, OrdenCompra.ocp_nro)
+ORDEN_APROBADAS = (OrdenCompra.ocp_A1_Dt, OrdenCompra.ocp_A1_Hr, OrdenCompra.Loc_cod, OrdenCompra.ocp_nro)
 
-    def _get_reppdf_session(self):
-        """Crea sesión a lexascl_reppdf usando env vars. Retorna None si no hay credenciales."""
-        host = os.getenv("REPPDF_HOST", "179.27.210.204")
-        port = int(os.getenv("REPPDF_PORT", "3306"))
-        db_name = os.getenv("REPPDF_DB", "lexascl_reppdf")
-        user = os.getenv("REPPDF_USER")
-        password = os.getenv("REPPDF_PASSWORD")
-        if not user or not password:
-            return None
-        return create_tenant_session(
-            db_host=host, db_port=port, db_name=db_name,
-            db_user=user, db_password=password
-        )
-
-    def _verificar_pdfs_batch(self, items: list, tenant_id: int) -> dict:
-        """
-        Consulta en una sola query todos los PDFs para una lista de (loc_cod, numero).
-        Retorna dict {(loc_cod, numero): estado} donde estado: 0=no existe, 1=con PDF, 2=sin contenido.
-        """
-        if not items:
-            return {}
-        db_cliente = self._get_reppdf_session()
-        if not db_cliente:
-            return {}
-        try:
-            numeros = [numero for _, numero in items]
-            in_clause = ",".join(str(n) for n in numeros)
-            result = db_cliente.execute(
-                text(f"""
-                    SELECT PdfLocCod, PdfNumero, LENGTH(PdfBlob) as blob_size
-                    FROM pdf001
-                    WHERE PdfEmpCd = :emp_cd
-                      AND PdfTipo   = 2
-                      AND PdfNumero IN ({in_clause})
-                """),
-                {"emp_cd": tenant_id}
-            )
-            rows = result.fetchall()
-            pdf_map = {}
-            for row in rows:
-                key = (row[0], row[1])
-                blob_size = row[2] or 0
-                pdf_map[key] = 1 if blob_size > 0 else 2
-            for loc_cod, numero in items:
-                if (loc_cod, numero) not in pdf_map:
-                    pdf_map[(loc_cod, numero)] = 0
-            return pdf_map
-        except Exception as e:
-            logger.error(f"Error en batch PDF query: {str(e)}")
-            return {}
-        finally:
-            db_cliente.close()
-
-    def _eliminar_pdf_reppdf(self, loc_cod: int, ocp_nro: int, tenant_id: int) -> None:
-        """Elimina el PDF de pdf001 en REPPDF al aprobar una orden de compra. Falla silenciosamente."""
-        db_cliente = self._get_reppdf_session()
-        if not db_cliente:
-            return
-        try:
-            result = db_cliente.execute(
-                text("""
-                    DELETE FROM pdf001
-                    WHERE PdfEmpCd = :emp_cd
-                      AND PdfTipo   = 2
-                      AND PdfLocCod = :loc_cod
-                      AND PdfNumero = :numero
-                """),
-                {"emp_cd": tenant_id, "loc_cod": loc_cod, "numero": ocp_nro}
-            )
-            db_cliente.commit()
-            logger.info(f"PDF eliminado de REPPDF: tenant={tenant_id}, loc_cod={loc_cod}, ocp_nro={ocp_nro}, filas={result.rowcount}")
-        except Exception as e:
-            logger.error(f"Error al eliminar PDF de REPPDF para orden {ocp_nro}: {e}", exc_info=True)
-        finally:
-            db_cliente.close()
-
-    async def _verificar_pdf_existe(self, loc_cod: int, ocp_nro: int, tenant_id: int) -> int:
-        result = self._verificar_pdfs_batch([(loc_cod, ocp_nro)], tenant_id)
-        return result.get((loc_cod, ocp_nro), 0)
+class OrdenCompraService:
 
-    def obtener_indicadores(self, db: Session, user_id: str = None) -> OrdenCompraIndicadores:
+    async def obtener_indicadores(self, db: AsyncSession, user_id: str = None, tenant_id: int = 1) -> OrdenCompraIndicadores:
         """
         Retorna los indicadores para el dashboard:
         - Total: Todas las órdenes vigentes
-        - Pendientes: ocp_A1_Ap=1 AND ocp_A2_Ap=0 (liberadas pero no aprobadas)
-        - Aprobadas: ocp_A2_Ap=1 (aprobadas finalmente)
+        - Pendientes: ocp_A1_Ap=0 AND ocp_A2_Ap=1 AND ocp_pdt IN ('T','I','N')
+        - Aprobadas: ocp_A1_Ap=1 (aprobadas finalmente)
+        Con montos (ocp_net + ocp_iva + ocp_ila) y desglose por local, en una sola
+        query SUM(CASE ...) agrupada por local. Cacheado por tenant (ver indicadores_cache).
         """
-        total = db.query(func.count(OrdenCompra.ocp_nro)).filter(
-            and_(
-                OrdenCompra.ocp_pdt != 'N',
-                OrdenCompra.ocp_pdt != '',
-                OrdenCompra.ocp_pdt.isnot(None)
+        cacheados = indicadores_cache.obtener(tenant_id, INDICADORES_ORDENES_COMPRA)
+        if cacheados is not None:
+            return cacheados
+        generacion = indicadores_cache.generacion(tenant_id)
+
+        vigente = and_(
+            OrdenCompra.ocp_pdt != 'N',
+            OrdenCompra.ocp_pdt != '',
+            OrdenCompra.ocp_pdt.isnot(None)
+        )
+        pendiente = and_(
+            OrdenCompra.ocp_A1_Ap == 0,
+            OrdenCompra.ocp_A2_Ap == 1,
+            OrdenCompra.ocp_pdt.in_(['T', 'I', 'N'])
+        )
+        aprobada = OrdenCompra.ocp_A1_Ap == 1
+        monto = OrdenCompra.ocp_net + OrdenCompra.ocp_iva + OrdenCompra.ocp_ila
+
+        result = await db.execute(
+            select(
+                OrdenCompra.Loc_cod,
+                Local.Loc_des,
+                func.sum(case((vigente, 1), else_=0)).label("total"),
+                func.sum(case((pendiente, 1), else_=0)).label("pendientes"),
+                func.sum(case((aprobada, 1), else_=0)).label("aprobadas"),
+                func.sum(case((pendiente, monto), else_=0)).label("monto_pendientes"),
+                func.sum(case((aprobada, monto), else_=0)).label("monto_aprobadas"),
+            ).outerjoin(
+                Local, OrdenCompra.Loc_cod == Local.Loc_cod
+            ).group_by(OrdenCompra.Loc_cod, Local.Loc_des).order_by(OrdenCompra.Loc_cod)
+        )
+
+        # MySQL devuelve SUM como DECIMAL
+        por_local = [
+            OrdenCompraIndicadoresLocal(
+                Loc_cod=row.Loc_cod,
+                loc_des=row.Loc_des,
+                total=int(row.total or 0),
+                pendientes=int(row.pendientes or 0),
+                aprobadas=int(row.aprobadas or 0),
+                monto_pendientes=int(row.monto_pendientes or 0),
+                monto_aprobadas=int(row.monto_aprobadas or 0),
             )
-        ).scalar() or 0
+            for row in result.all()
+        ]
+        indicadores = OrdenCompraIndicadores(
+            total=sum(local.total for local in por_local),
+            pendientes=sum(local.pendientes for local in por_local),
+            aprobadas=sum(local.aprobadas for local in por_local),
+            monto_pendientes=sum(local.monto_pendientes for local in por_local),
+            monto_aprobadas=sum(local.monto_aprobadas for local in por_local),
+            por_local=por_local,
+        )
+        indicadores_cache.guardar(tenant_id, INDICADORES_ORDENES_COMPRA, indicadores, generacion)
+        return indicadores
 
-        pendientes = db.query(func.count(OrdenCompra.ocp_nro)).filter(
+    def consulta_pendientes(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Select:
+        """
+        SELECT del listado de pendientes (también lo usa el asesor de índices de /tenant/db-check).
+        Lanza CursorInvalidoError si el cursor no es de este listado.
+        """
+        orden_clave = ORDEN_PENDIENTES
+        consulta = listado_ordenes_compra(con_sucursal=True).where(
             and_(
                 OrdenCompra.ocp_A1_Ap == 0,
                 OrdenCompra.ocp_A2_Ap == 1,
                 OrdenCompra.ocp_pdt.in_(['T', 'I', 'N'])
             )
-        ).scalar() or 0
-
-        aprobadas = db.query(func.count(OrdenCompra.ocp_nro)).filter(
-            OrdenCompra.ocp_A1_Ap == 1
-        ).scalar() or 0
-
-        return OrdenCompraIndicadores(
-            total=total,
-            pendientes=pendientes,
-            aprobadas=aprobadas
-        )
+        ).order_by(*(columna.desc() for columna in orden_clave)).limit(limit)
+        if cursor:
+            return consulta.where(
+                despues_de(orden_clave, decodificar_cursor(cursor, CURSOR_PENDIENTES, len(orden_clave)))
+            )
+        return consulta.offset(skip)
 
-    async def _verificar_pdf_existe(self, loc_cod: int, ocp_nro: int, tenant_id: int) -> int:
+    def consulta_aprobadas(
+        self,
+        user_id: str = None,
+        fecha_desde: date = None,
+        fecha_hasta: date = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Select:
         """
-        Verifica si existe PDF en la tabla pdf001 del cliente (lexascl_reppdf).
-        Retorna: 0 = no existe, 1 = existe con PDF, 2 = existe sin PDF (blob vacío)
-        CLAVE: Usa tipo=2 para órdenes de compra.
+        SELECT del listado de aprobadas (también lo usa el asesor de índices de /tenant/db-check).
+        Sin usuario: las aprobadas hoy. Lanza CursorInvalidoError si el cursor no es de este listado.
         """
-        host = os.getenv("REPPDF_HOST", "179.27.210.204")
-        port = int(os.getenv("REPPDF_PORT", "3306"))
-        db_name = os.getenv("REPPDF_DB", "lexascl_reppdf")
-        user = os.getenv("REPPDF_USER")
-        password = os.getenv("REPPDF_PASSWORD")
-        if not user or not password:
-            return 0
-        db_cliente = None
-        try:
-            db_cliente = create_tenant_session(
-                db_host=host,
-                db_port=port,
-                db_name=db_name,
-                db_user=user,
-                db_password=password
-            )
-            result = db_cliente.execute(
-                text("""
-                    SELECT LENGTH(PdfBlob) as blob_size FROM pdf001
-                    WHERE PdfEmpCd = :emp_cd
-                      AND PdfLocCod = :loc_cod
-                      AND PdfTipo   = 2
-                      AND PdfNumero = :numero
-                    LIMIT 1
-                """),
-                {"emp_cd": tenant_id, "loc_cod": loc_cod, "numero": ocp_nro}
+        # Construir filtros base
+        filters = [OrdenCompra.ocp_A1_Ap == 1]
+
+        # Si no hay usuario específico, mostrar solo las de hoy
+        if user_id is None:
+            hoy_chile = datetime.now(chile_tz).date()
+            filters.append(OrdenCompra.ocp_A1_Dt == hoy_chile)
+        else:
+            # Filtrar por usuario y fechas
+            filters.append(func.lower(OrdenCompra.ocp_A1_Usu) == func.lower(user_id))
+            if fecha_desde:
+                filters.append(OrdenCompra.ocp_A1_Dt >= fecha_desde)
+            if fecha_hasta:
+                filters.append(OrdenCompra.ocp_A1_Dt <= fecha_hasta)
+
+        orden_clave = ORDEN_APROBADAS
+        if cursor:
+            filters.append(
+                despues_de(orden_clave, decodificar_cursor(cursor, CURSOR_APROBADAS, len(orden_clave)))
             )
-            row = result.fetchone()
-            if row is None:
-                return 0
-            blob_size = row[0] or 0
-            return 1 if blob_size > 0 else 2
-        except Exception as e:
-            logger.error(f"Error verificando PDF para orden {ocp_nro}: {str(e)}")
-            return 0
-        finally:
-            if db_cliente:
-                db_cliente.close()
-
-    async def obtener_pendientes_con_pdf(self, db: Session, skip: int = 0, limit: int = 100, tenant_id: int = 1) -> List[OrdenCompraDetalle]:
+        consulta = listado_ordenes_compra().where(
+            and_(*filters)
+        ).order_by(*(columna.desc() for columna in orden_clave)).limit(limit)
+        if not cursor:
+            consulta = consulta.offset(skip)
+        return consulta
+
+    async def obtener_pendientes_con_pdf(
+        self, db: AsyncSession, skip: int = 0, limit: int = 100, tenant_id: int = 1, cursor: Optional[str] = None
+    ) -> Tuple[List[OrdenCompraDetalle], Optional[str]]:
         """
-        Retorna órdenes pendientes con validación PDF.
+        Retorna órdenes pendientes con validación PDF y el cursor de la página siguiente.
         Filtro: ocp_A1_Ap=0 AND ocp_pdt<>'N' AND ocp_pdt<>' ' (sin aprobar en nivel 1)
+        Orden: ocp_fec, Loc_cod, ocp_nro descendentes; con cursor, skip se ignora.
         """
         try:
-            # Consulta con JOIN a proveedor
-            ordenes = db.query(OrdenCompra, Local.Loc_des).outerjoin(
-                Local, OrdenCompra.Loc_cod == Local.Loc_cod
-            ).filter(
-                and_(
-                    OrdenCompra.ocp_A1_Ap == 0,
-                    OrdenCompra.ocp_A2_Ap == 1,
-                    OrdenCompra.ocp_pdt.in_(['T', 'I', 'N'])
-                )
-            ).order_by(OrdenCompra.ocp_fec.desc()).offset(skip).limit(limit).all()
+            # Solo las columnas del listado, con JOIN a proveedor y sucursal, leída en streaming
+            result = await db.stream(self.consulta_pendientes(skip=skip, limit=limit, cursor=cursor))
 
-            # Batch query: una sola consulta para todos los PDFs
-            items = [(o.Loc_cod, o.ocp_nro) for o, _ in ordenes]
-            pdf_map = self._verificar_pdfs_batch(items, tenant_id)
+            # Estados de PDF consultados por lotes mientras llegan las filas
+            ordenes, pdf_map = await pdf_replica.estados_pdf_en_flujo(
+                tenant_id, TIPO_ORDEN_COMPRA, result, lambda o: (o.Loc_cod, o.ocp_nro)
+            )
 
             # Enriquecer con información PDF y sucursal
             ordenes_detalle = []
-            for orden, loc_des in ordenes:
-                tiene_pdf = pdf_map.get((orden.Loc_cod, orden.ocp_nro), 0)
+            for orden in ordenes:
+                tiene_pdf = pdf_map.get((orden.Loc_cod, orden.ocp_nro))
 
                 orden_detalle = OrdenCompraDetalle(
                     Loc_cod=orden.Loc_cod,
@@ -217,7 +190,7 @@ class OrdenCompraService:
                     proveedor_nombre=orden.proveedor_nombre,
                     monto_total=orden.monto_total,
                     tienepdf=tiene_pdf,
-                    loc_des=loc_des,
+                    loc_des=orden.loc_des,
                     ocp_A4_Ap=orden.ocp_A4_Ap or 0,
                     ocp_A4_Usu=(orden.ocp_A4_Usu or '').strip() or None,
                     ocp_A3_Anu=orden.ocp_A3_Anu or 0,
@@ -229,56 +202,50 @@ class OrdenCompraService:
                 )
                 ordenes_detalle.append(orden_detalle)
 
-            return ordenes_detalle
+            siguiente = siguiente_cursor(
+                CURSOR_PENDIENTES, ordenes, limit, lambda o: (o.ocp_fec, o.Loc_cod, o.ocp_nro)
+            )
+            return ordenes_detalle, siguiente
             
+        except CursorInvalidoError:
+            raise
         except Exception as e:
             logger.error(f"Error obteniendo órdenes pendientes: {str(e)}")
             raise
 
     async def obtener_aprobadas_con_pdf(
         self,
-        db: Session,
+        db: AsyncSession,
         user_id: str = None,
         fecha_desde: date = None,
         fecha_hasta: date = None,
         skip: int = 0,
         limit: int = 100,
-        tenant_id: int = 1
-    ) -> List[OrdenCompraDetalle]:
+        tenant_id: int = 1,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[OrdenCompraDetalle], Optional[str]]:
         """
-        Retorna órdenes aprobadas con validación PDF.
+        Retorna órdenes aprobadas con validación PDF y el cursor de la página siguiente.
         Si no se especifica usuario: todas las aprobadas hoy
         Si se especifica usuario y fechas: las del usuario en ese rango
+        Orden: ocp_A1_Dt, ocp_A1_Hr, Loc_cod, ocp_nro descendentes; con cursor, skip se ignora.
         """
         try:
-            # Construir filtros base
-            filters = [OrdenCompra.ocp_A1_Ap == 1]
-
-            # Si no hay usuario específico, mostrar solo las de hoy
-            if user_id is None:
-                hoy_chile = datetime.now(chile_tz).date()
-                filters.append(OrdenCompra.ocp_A1_Dt == hoy_chile)
-            else:
-                # Filtrar por usuario y fechas
-                filters.append(func.lower(OrdenCompra.ocp_A1_Usu) == func.lower(user_id))
-                if fecha_desde:
-                    filters.append(OrdenCompra.ocp_A1_Dt >= fecha_desde)
-                if fecha_hasta:
-                    filters.append(OrdenCompra.ocp_A1_Dt <= fecha_hasta)
-
-            ordenes = db.query(OrdenCompra).filter(
-                and_(*filters)
-            ).order_by(OrdenCompra.ocp_A1_Dt.desc(), OrdenCompra.ocp_A1_Hr.desc()).offset(skip).limit(limit).all()
-
-            # Batch query: una sola consulta para todos los PDFs
-            items = [(o.Loc_cod, o.ocp_nro) for o in ordenes]
-            pdf_map = self._verificar_pdfs_batch(items, tenant_id)
+            consulta = self.consulta_aprobadas(
+                user_id, fecha_desde, fecha_hasta, skip=skip, limit=limit, cursor=cursor
+            )
+            result = await db.stream(consulta)
+
+            # Estados de PDF consultados por lotes mientras llegan las filas
+            ordenes, pdf_map = await pdf_replica.estados_pdf_en_flujo(
+                tenant_id, TIPO_ORDEN_COMPRA, result, lambda o: (o.Loc_cod, o.ocp_nro)
+            )
 
             # Enriquecer con información PDF
             ordenes_detalle = []
             for orden in ordenes:
                 # Verificar PDF
-                tiene_pdf = pdf_map.get((orden.Loc_cod, orden.ocp_nro), 0)
+                tiene_pdf = pdf_map.get((orden.Loc_cod, orden.ocp_nro))
                 
                 # Crear objeto OrdenCompraDetalle
                 orden_detalle = OrdenCompraDetalle(
@@ -307,13 +274,37 @@ class OrdenCompraService:
                 )
                 ordenes_detalle.append(orden_detalle)
 
-            return ordenes_detalle
+            siguiente = siguiente_cursor(
+                CURSOR_APROBADAS, ordenes, limit, lambda o: (o.ocp_A1_Dt, o.ocp_A1_Hr, o.Loc_cod, o.ocp_nro)
+            )
+            return ordenes_detalle, siguiente
             
+        except CursorInvalidoError:
+            raise
         except Exception as e:
             logger.error(f"Error obteniendo órdenes aprobadas: {str(e)}")
             raise
 
-    def obtener_detalle(self, db: Session, loc_cod: int, ocp_nro: int) -> Optional[DetalleOrdenCompra]:
+    async def claves_aprobadas(
+        self, db: AsyncSession, user_id: str, fecha_desde: date, fecha_hasta: date, limite: int
+    ) -> List[Tuple[int, int]]:
+        """
+        (Loc_cod, ocp_nro) de las órdenes aprobadas por un usuario en un rango de fechas,
+        p.ej. para descargar sus PDFs en un zip. Solo lee las columnas de la clave.
+        """
+        result = await db.execute(
+            select(OrdenCompra.Loc_cod, OrdenCompra.ocp_nro).where(
+                and_(
+                    OrdenCompra.ocp_A1_Ap == 1,
+                    func.lower(OrdenCompra.ocp_A1_Usu) == func.lower(user_id),
+                    OrdenCompra.ocp_A1_Dt >= fecha_desde,
+                    OrdenCompra.ocp_A1_Dt <= fecha_hasta
+                )
+            ).order_by(OrdenCompra.ocp_A1_Dt, OrdenCompra.Loc_cod, OrdenCompra.ocp_nro).limit(limite)
+        )
+        return [(row[0], row[1]) for row in result.all()]
+
+    async def obtener_detalle(self, db: AsyncSession, loc_cod: int, ocp_nro: int) -> Optional[DetalleOrdenCompra]:
         def _fecha(val):
             if not val:
                 return None
@@ -324,11 +315,13 @@ class OrdenCompraService:
         def _str(val):
             return val.strip() or None if val else None
 
-        orden = db.query(OrdenCompra, Local.Loc_des).outerjoin(
-            Local, OrdenCompra.Loc_cod == Local.Loc_cod
-        ).filter(
-            and_(OrdenCompra.Loc_cod == loc_cod, OrdenCompra.ocp_nro == ocp_nro)
-        ).first()
+        orden = (await db.execute(
+            select(OrdenCompra, Local.Loc_des).outerjoin(
+                Local, OrdenCompra.Loc_cod == Local.Loc_cod
+            ).options(joinedload(OrdenCompra.proveedor)).where(
+                and_(OrdenCompra.Loc_cod == loc_cod, OrdenCompra.ocp_nro == ocp_nro)
+            )
+        )).first()
 
         if not orden:
             return None
@@ -363,8 +356,8 @@ class OrdenCompraService:
             )
         )
 
-    def obtener_items(self, db: Session, loc_cod: int, ocp_nro: int) -> List[ItemOrdenCompra]:
-        result = db.execute(
+    async def obtener_items(self, db: AsyncSession, loc_cod: int, ocp_nro: int) -> List[ItemOrdenCompra]:
+        result = await db.execute(
             text("""
                 SELECT Loc_cod, ocp_nro, ocp_lin, ocp_mat, mat_des,
                        Ocp_Odt, Ocp_De1, Ocp_De2, Ocp_De3, Ocp_est, Ocp_can, Ocp_pre
@@ -394,16 +387,18 @@ class OrdenCompraService:
             for row in rows
         ]
 
-    def aprobar_orden(self, db: Session, ocp_nro: int, loc_cod: int, user_id: str, tenant_id: int = 1) -> Optional[OrdenCompra]:
+    async def aprobar_orden(self, db: AsyncSession, ocp_nro: int, loc_cod: int, user_id: str, tenant_id: int = 1) -> Optional[OrdenCompra]:
         """
         Aprueba una orden de compra (nivel 2 - equivalente a pre_vbgg)
         """
-        orden = db.query(OrdenCompra).filter(
-            and_(
-                OrdenCompra.ocp_nro == ocp_nro,
-                OrdenCompra.Loc_cod == loc_cod
+        orden = (await db.execute(
+            select(OrdenCompra).where(
+                and_(
+                    OrdenCompra.ocp_nro == ocp_nro,
+                    OrdenCompra.Loc_cod == loc_cod
+                )
             )
-        ).first()
+        )).scalars().first()
 
         if not orden:
             return None
@@ -414,43 +409,47 @@ class OrdenCompraService:
         orden.ocp_A1_Dt = now_chile.date()
         orden.ocp_A1_Hr = now_chile.strftime("%H:%M:%S")
 
-        db.commit()
-        db.refresh(orden)
+        await db.commit()
+        await db.refresh(orden)
 
-        self._eliminar_pdf_reppdf(loc_cod, ocp_nro, tenant_id)
+        await pdf_replica.eliminar_pdf(tenant_id, TIPO_ORDEN_COMPRA, loc_cod, ocp_nro)
 
         return orden
 
-    def anular_orden(self, db: Session, ocp_nro: int, loc_cod: int) -> Optional[OrdenCompra]:
+    async def anular_orden(self, db: AsyncSession, ocp_nro: int, loc_cod: int) -> Optional[OrdenCompra]:
         """
         Anula una orden de compra seteando ocp_pdt = 'N'.
         """
-        orden = db.query(OrdenCompra).filter(
-            and_(
-                OrdenCompra.ocp_nro == ocp_nro,
-                OrdenCompra.Loc_cod == loc_cod,
-                OrdenCompra.ocp_pdt != 'N'
+        orden = (await db.execute(
+            select(OrdenCompra).where(
+                and_(
+                    OrdenCompra.ocp_nro == ocp_nro,
+                    OrdenCompra.Loc_cod == loc_cod,
+                    OrdenCompra.ocp_pdt != 'N'
+                )
             )
-        ).first()
+        )).scalars().first()
 
         if not orden:
             return None
 
         orden.ocp_pdt = 'N'
-        db.commit()
-        db.refresh(orden)
+        await db.commit()
+        await db.refresh(orden)
         return orden
 
-    def desaprobar_orden(self, db: Session, ocp_nro: int, loc_cod: int) -> Optional[OrdenCompra]:
+    async def desaprobar_orden(self, db: AsyncSession, ocp_nro: int, loc_cod: int) -> Optional[OrdenCompra]:
         """
         Deshace la aprobación de una orden (nivel 2)
         """
-        orden = db.query(OrdenCompra).filter(
-            and_(
-                OrdenCompra.ocp_nro == ocp_nro,
-                OrdenCompra.Loc_cod == loc_cod
+        orden = (await db.execute(
+            select(OrdenCompra).where(
+                and_(
+                    OrdenCompra.ocp_nro == ocp_nro,
+                    OrdenCompra.Loc_cod == loc_cod
+                )
             )
-        ).first()
+        )).scalars().first()
 
         if not orden:
             return None
@@ -460,6 +459,6 @@ class OrdenCompraService:
         orden.ocp_A1_Dt = date(1000, 1, 1)
         orden.ocp_A1_Hr = ''
 
-        db.commit()
-        db.refresh(orden)
+        await db.commit()
+        await db.refresh(orden)
         return orden
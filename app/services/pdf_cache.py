@@ -0,0 +1,272 @@
+"""
+Caché local en disco de PDFs de REPPDF, direccionada por contenido.
+
+- Cada PDF se guarda una sola vez como <directorio>/<sha[:2]>/<sha>.pdf.
+- La búsqueda usa el sha256 vigente de pdf001_meta: si el contenido cambia, cambia
+  la ruta, así que nunca se sirve una versión vieja aunque falte una invalidación.
+- Índice (tenant, tipo, loc, numero) -> sha256 para invalidar al aprobar (DELETE en
+  pdf001) o al recibir un /upsert del documento.
+- Desalojo LRU por tamaño. El directorio lo comparten todos los workers pero cada uno
+  lleva su propio LRU: PDF_CACHE_MAX_BYTES es el total y cada worker usa
+  PDF_CACHE_MAX_BYTES / WEB_CONCURRENCY.
+
+Los archivos se escriben en un temporal mientras el PDF se transmite al cliente y
+se publican con un rename atómico solo si el hash coincide. Toda operación de disco
+corre en un hilo (anyio.to_thread), nunca en el event loop.
+
+Un archivo desalojado o invalidado se borra recién PDF_CACHE_GRACIA segundos después
+de su última entrega: FileResponse y nginx (X-Accel-Redirect) lo abren justo después
+de recibir la ruta, y una vez abierto el unlink no les afecta (semántica POSIX).
+"""
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+import anyio
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+ClaveDocumento = Tuple[int, int, int, int]  # (tenant_id, tipo, loc_cod, numero)
+
+# Segundos que se conserva un archivo entregado (ruta a FileResponse/nginx) antes de borrarlo
+PDF_CACHE_GRACIA = 60.0
+# Un .tmp más viejo que esto quedó de un worker caído a mitad de transmisión
+TMP_HUERFANO_SEGUNDOS = 3600.0
+
+
+def _escanear(directorio: str) -> List[Tuple[float, str, int]]:
+    """(atime, sha256, bytes) de los PDFs del directorio; borra los .tmp huérfanos."""
+    os.makedirs(directorio, exist_ok=True)
+    existentes = []
+    limite_tmp = time.time() - TMP_HUERFANO_SEGUNDOS
+    for raiz, _, archivos in os.walk(directorio):
+        for nombre in archivos:
+            ruta = os.path.join(raiz, nombre)
+            try:
+                st = os.stat(ruta)
+                if nombre.endswith(".pdf"):
+                    existentes.append((st.st_atime, nombre[:-4], st.st_size))
+                elif nombre.endswith(".tmp") and st.st_mtime < limite_tmp:
+                    # Los recientes pueden ser de otro worker transmitiendo
+                    os.remove(ruta)
+            except OSError:
+                pass
+    return existentes
+
+
+def _crear_temporal(directorio: str, subdirectorio: str) -> Tuple[int, str]:
+    os.makedirs(subdirectorio, exist_ok=True)
+    return tempfile.mkstemp(dir=directorio, suffix=".tmp")
+
+
+def _publicar(temporal: str, ruta: str) -> None:
+    # mkstemp crea 0600; nginx (X-Accel-Redirect) lee con otro usuario
+    os.chmod(temporal, 0o644)
+    os.replace(temporal, ruta)
+
+
+def _borrar(ruta: str) -> None:
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+class PdfDiskCache:
+    """Caché LRU en disco; con directorio vacío queda deshabilitada."""
+
+    def __init__(self, directorio: str, max_bytes: int, tamano_chunk: int = 256 * 1024):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.tamano_chunk = tamano_chunk
+        # sha256 -> bytes, en orden de uso (el primero es el menos reciente)
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._por_documento: Dict[ClaveDocumento, str] = {}
+        self._documentos_por_sha: Dict[str, Set[ClaveDocumento]] = {}
+        # sha256 -> monotonic de la última vez que se entregó su ruta
+        self._entregados: Dict[str, float] = {}
+        self._borrados: Set[asyncio.Task] = set()
+        self._cargado = False
+        self._lock_carga: Optional[asyncio.Lock] = None
+
+    @property
+    def habilitada(self) -> bool:
+        return bool(self.directorio) and self.max_bytes > 0
+
+    @property
+    def bytes_usados(self) -> int:
+        return sum(self._lru.values())
+
+    def _ruta(self, sha256: str) -> str:
+        return os.path.join(self.directorio, sha256[:2], f"{sha256}.pdf")
+
+    async def _cargar(self) -> None:
+        """Indexa los archivos existentes (p.ej. tras un reinicio), del más viejo al más nuevo."""
+        if self._cargado:
+            return
+        if self._lock_carga is None:
+            self._lock_carga = asyncio.Lock()
+        async with self._lock_carga:
+            if self._cargado:
+                return
+            existentes = await anyio.to_thread.run_sync(_escanear, self.directorio)
+            for _, sha256, tamano in sorted(existentes):
+                self._lru[sha256] = tamano
+            self._cargado = True
+            self._desalojar()
+
+    async def obtener(self, clave: ClaveDocumento, sha256: Optional[str]) -> Optional[str]:
+        """Ruta del PDF en caché para ese contenido, o None (miss)."""
+        if not self.habilitada or not sha256:
+            return None
+        await self._cargar()
+        if sha256 not in self._lru:
+            return None
+        ruta = self._ruta(sha256)
+        if not await anyio.to_thread.run_sync(os.path.exists, ruta):
+            self._olvidar(sha256)
+            return None
+        self._lru.move_to_end(sha256)
+        self._asociar(clave, sha256)
+        self._entregados[sha256] = time.monotonic()
+        return ruta
+
+    async def guardar_mientras_transmite(
+        self, clave: ClaveDocumento, sha256: str, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        """
+        Reenvía los chunks al cliente y a la vez los escribe en un temporal. Si la
+        transmisión termina completa y el hash coincide, el archivo entra a la caché.
+        """
+        if not self.habilitada:
+            async for chunk in chunks:
+                yield chunk
+            return
+        await self._cargar()
+        fd, temporal = await anyio.to_thread.run_sync(
+            _crear_temporal, self.directorio, os.path.dirname(self._ruta(sha256))
+        )
+        digest = hashlib.sha256()
+        tamano = 0
+        publicado = False
+        try:
+            with os.fdopen(fd, "wb") as archivo:
+                async for chunk in chunks:
+                    await anyio.to_thread.run_sync(archivo.write, chunk)
+                    digest.update(chunk)
+                    tamano += len(chunk)
+                    yield chunk
+            if digest.hexdigest() == sha256:
+                await anyio.to_thread.run_sync(_publicar, temporal, self._ruta(sha256))
+                publicado = True
+                self._registrar(clave, sha256, tamano)
+            else:
+                logger.warning(f"Caché PDF: hash no coincide para {clave}, no se guarda")
+        finally:
+            if not publicado:
+                # Si esto no llega a correr (cancelación), _cargar lo limpia como huérfano
+                await anyio.to_thread.run_sync(_borrar, temporal)
+
+    async def materializar(
+        self, clave: ClaveDocumento, sha256: str, chunks: AsyncIterator[bytes]
+    ) -> Optional[str]:
+        """
+        Escribe el PDF completo en la caché sin transmitirlo a nadie (p.ej. para que lo
+        sirva nginx vía X-Accel-Redirect). Retorna su ruta, o None si no quedó guardado.
+        """
+        if not self.habilitada:
+            return None
+        async for _ in self.guardar_mientras_transmite(clave, sha256, chunks):
+            pass
+        return await self.obtener(clave, sha256)
+
+    def ruta_relativa(self, ruta: str) -> str:
+        """Ruta de un archivo dentro del directorio de la caché, separada por "/"."""
+        return os.path.relpath(ruta, self.directorio).replace(os.sep, "/")
+
+    async def iterar(self, ruta: str, inicio: int, largo: int) -> AsyncIterator[bytes]:
+        """Lee la ventana [inicio, inicio + largo) de un archivo de la caché."""
+        async with await anyio.open_file(ruta, "rb") as archivo:
+            await archivo.seek(inicio)
+            restante = largo
+            while restante > 0:
+                chunk = await archivo.read(min(self.tamano_chunk, restante))
+                if not chunk:
+                    break
+                restante -= len(chunk)
+                yield chunk
+
+    def invalidar(self, clave: ClaveDocumento) -> None:
+        """Descarta la entrada de un documento (tenant, tipo, loc, numero)."""
+        sha256 = self._por_documento.pop(clave, None)
+        if sha256 is None:
+            return
+        documentos = self._documentos_por_sha.get(sha256, set())
+        documentos.discard(clave)
+        # Otro documento con el mismo contenido puede seguir usando el archivo
+        if not documentos:
+            self._eliminar(sha256)
+
+    def invalidar_documento(self, tenant_id: int, tipo: int, numero: int) -> None:
+        """Descarta las entradas de un documento en todos los locales (p.ej. tras /upsert)."""
+        for clave in [c for c in self._por_documento if c[0] == tenant_id and c[1] == tipo and c[3] == numero]:
+            self.invalidar(clave)
+
+    def _asociar(self, clave: ClaveDocumento, sha256: str) -> None:
+        anterior = self._por_documento.get(clave)
+        if anterior == sha256:
+            return
+        if anterior is not None:
+            self.invalidar(clave)
+        self._por_documento[clave] = sha256
+        self._documentos_por_sha.setdefault(sha256, set()).add(clave)
+
+    def _registrar(self, clave: ClaveDocumento, sha256: str, tamano: int) -> None:
+        self._lru[sha256] = tamano
+        self._lru.move_to_end(sha256)
+        self._asociar(clave, sha256)
+        self._desalojar()
+
+    def _desalojar(self) -> None:
+        while self._lru and self.bytes_usados > self.max_bytes:
+            sha256 = next(iter(self._lru))
+            logger.info(f"Caché PDF llena: desalojando {sha256}")
+            self._eliminar(sha256)
+
+    def _olvidar(self, sha256: str) -> None:
+        self._lru.pop(sha256, None)
+        self._entregados.pop(sha256, None)
+        for clave in self._documentos_por_sha.pop(sha256, set()):
+            self._por_documento.pop(clave, None)
+
+    def _eliminar(self, sha256: str) -> None:
+        """Saca el archivo del índice y programa su borrado (tras la gracia de lectura)."""
+        entregado = self._entregados.get(sha256)
+        self._olvidar(sha256)
+        espera = 0.0 if entregado is None else max(0.0, entregado + PDF_CACHE_GRACIA - time.monotonic())
+        tarea = asyncio.get_running_loop().create_task(self._borrar_despues(sha256, espera))
+        self._borrados.add(tarea)
+        tarea.add_done_callback(self._borrados.discard)
+
+    async def _borrar_despues(self, sha256: str, espera: float) -> None:
+        if espera:
+            await anyio.sleep(espera)
+        # Si mientras tanto el mismo contenido volvió a la caché, el archivo es el nuevo
+        if sha256 not in self._lru:
+            await anyio.to_thread.run_sync(_borrar, self._ruta(sha256))
+
+
+pdf_cache = PdfDiskCache(
+    directorio=settings.PDF_CACHE_DIR,
+    max_bytes=settings.PDF_CACHE_MAX_BYTES // max(1, settings.WEB_CONCURRENCY),
+    tamano_chunk=settings.REPPDF_CHUNK_BYTES,
+)
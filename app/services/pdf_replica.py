@@ -0,0 +1,318 @@
+"""
+Réplica local (read-through) en PostgreSQL de los PDFs de REPPDF.
+
+- Estados (tienepdf) y metadatos se leen primero de pdf_replicas; solo las claves sin
+  réplica o verificadas hace más de PDF_REPLICA_TTL_SECONDS se consultan en REPPDF,
+  y el resultado se registra localmente. Las claves que ya no están en pdf001 se
+  borran de la réplica.
+- Al servir un PDF que aún no está copiado, se transmite desde REPPDF como antes y,
+  al terminar, una tarea en segundo plano lo copia a pdf_blobs (desde la caché en
+  disco si quedó ahí, así REPPDF se lee una sola vez).
+- Al aprobar, el borrado en pdf001 se replica localmente (eliminar_pdf).
+- Si REPPDF no responde, se usa la réplica aunque esté vencida antes que degradar.
+- Si la réplica no responde (error de SQL, conexión o timeout), se consulta REPPDF.
+- Un listado lanza un lote por cada tamano_lote filas en paralelo: las sesiones de
+  Postgres de la réplica se limitan con PDF_REPLICA_SESIONES_SIMULTANEAS para no
+  agotar su pool (5+10).
+"""
+from contextlib import ExitStack, asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import tempfile
+
+import anyio
+from sqlalchemy import case, delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session_postgres import SessionPostgresAsync
+from app.models.pdf_replica import PdfReplica as PdfReplicaModelo
+from app.services.documento_pdf_service import (
+    DocumentoPdfService, ItemCarga, conexion_asyncpg, hash_item, rebobinar,
+)
+from app.services.pdf_cache import ClaveDocumento, pdf_cache
+from app.services.reppdf_client import (
+    reppdf_client, PdfMeta, ReppdfNoDisponibleError,
+    PDF_CON_CONTENIDO, PDF_NO_EXISTE, PDF_SIN_CONTENIDO,
+)
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Fallas de la réplica ante las que se sigue con REPPDF
+_ERRORES_REPLICA = (SQLAlchemyError, OSError, asyncio.TimeoutError)
+
+
+@dataclass(frozen=True)
+class PdfResuelto:
+    """Metadatos vigentes de un PDF de REPPDF y, si está copiado y al día, su blob local."""
+    meta: PdfMeta
+    blob_sha256: Optional[str]
+
+
+def _estado(tamano: int) -> int:
+    return PDF_CON_CONTENIDO if tamano > 0 else PDF_SIN_CONTENIDO
+
+
+def _blob_vigente(sha256_nuevo):
+    """blob_sha256 se conserva solo si el sha256 de pdf001_meta no cambió."""
+    return case(
+        (PdfReplicaModelo.sha256.is_not_distinct_from(sha256_nuevo), PdfReplicaModelo.blob_sha256),
+        else_=None,
+    )
+
+
+class PdfReplica:
+    """Fachada local-first sobre ReppdfClient; con habilitada=False delega todo en REPPDF."""
+
+    def __init__(self, habilitada: bool, ttl: float, copias_simultaneas: int, sesiones_simultaneas: int = 4):
+        self.habilitada = habilitada
+        self.ttl = timedelta(seconds=ttl)
+        self.copias_simultaneas = copias_simultaneas
+        self.sesiones_simultaneas = sesiones_simultaneas
+        self._copias: Dict[ClaveDocumento, asyncio.Task] = {}
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._semaforo_sesiones: Optional[asyncio.Semaphore] = None
+
+    def _fresca(self, fila) -> bool:
+        return datetime.now(timezone.utc) - fila.verificado < self.ttl
+
+    @asynccontextmanager
+    async def _sesion(self) -> AsyncIterator[AsyncSession]:
+        """Sesión de Postgres para leer o registrar la réplica, con concurrencia acotada."""
+        if self._semaforo_sesiones is None:
+            self._semaforo_sesiones = asyncio.Semaphore(self.sesiones_simultaneas)
+        async with self._semaforo_sesiones:
+            async with SessionPostgresAsync() as pg:
+                yield pg
+
+    # --- Estados (listados) ---
+
+    async def estados_pdf_en_flujo(
+        self, tenant_id: int, tipo: int, filas: AsyncIterable[Any], clave: Callable[[Any], Tuple[int, int]]
+    ) -> Tuple[List[Any], Dict[Tuple[int, int], Optional[int]]]:
+        """Igual que ReppdfClient.estados_pdf_en_flujo, resolviendo cada lote primero en la réplica."""
+        if not self.habilitada:
+            return await reppdf_client.estados_pdf_en_flujo(tenant_id, tipo, filas, clave)
+        return await reppdf_client.estados_pdf_en_flujo(tenant_id, tipo, filas, clave, estados_lote=self._estados_lote)
+
+    async def _estados_lote(
+        self, tenant_id: int, tipo: int, lote: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], Optional[int]]:
+        try:
+            locales = await self._leer(tenant_id, tipo, lote)
+        except _ERRORES_REPLICA as e:
+            logger.warning(f"Réplica PDF no disponible, consultando REPPDF: {e!r}")
+            return await reppdf_client.estados_pdf(tenant_id, tipo, lote)
+
+        estados = {clave: _estado(fila.tamano) for clave, fila in locales.items() if self._fresca(fila)}
+        faltan = [clave for clave in lote if clave not in estados]
+        if not faltan:
+            return estados
+
+        try:
+            metas = await reppdf_client.metadatos_lote(tenant_id, tipo, faltan)
+        except ReppdfNoDisponibleError as e:
+            # Una réplica vencida es mejor que "desconocido"
+            logger.warning(f"Estados PDF desde réplica vencida (tenant={tenant_id}, tipo={tipo}, {len(faltan)} docs): {e}")
+            estados.update({c: _estado(locales[c].tamano) if c in locales else None for c in faltan})
+            return estados
+
+        estados.update({c: _estado(metas[c].tamano) if c in metas else PDF_NO_EXISTE for c in faltan})
+        try:
+            await self._registrar(tenant_id, tipo, metas, [c for c in faltan if c not in metas])
+        except _ERRORES_REPLICA as e:
+            logger.warning(f"No se pudo actualizar la réplica PDF (tenant={tenant_id}, tipo={tipo}): {e!r}")
+        return estados
+
+    async def _leer(self, tenant_id: int, tipo: int, lote: List[Tuple[int, int]]) -> Dict[Tuple[int, int], Any]:
+        async with self._sesion() as pg:
+            result = await pg.execute(
+                select(PdfReplicaModelo).where(
+                    PdfReplicaModelo.tenant_id == tenant_id,
+                    PdfReplicaModelo.tipo == tipo,
+                    tuple_(PdfReplicaModelo.loc_cod, PdfReplicaModelo.numero).in_(lote),
+                )
+            )
+            return {(fila.loc_cod, fila.numero): fila for fila in result.scalars()}
+
+    async def _registrar(
+        self, tenant_id: int, tipo: int, metas: Dict[Tuple[int, int], PdfMeta], ausentes: List[Tuple[int, int]]
+    ) -> None:
+        """Upsert de los metadatos leídos de REPPDF y borrado de las claves que ya no existen."""
+        async with self._sesion() as pg:
+            if metas:
+                sentencia = insert(PdfReplicaModelo).values([
+                    {"tenant_id": tenant_id, "tipo": tipo, "loc_cod": loc_cod, "numero": numero,
+                     "tamano": meta.tamano, "sha256": meta.sha256, "actualizado": meta.actualizado}
+                    for (loc_cod, numero), meta in metas.items()
+                ])
+                excluido = sentencia.excluded
+                await pg.execute(sentencia.on_conflict_do_update(
+                    index_elements=["tenant_id", "tipo", "loc_cod", "numero"],
+                    set_={
+                        "tamano": excluido.tamano,
+                        "sha256": excluido.sha256,
+                        "actualizado": excluido.actualizado,
+                        "verificado": datetime.now(timezone.utc),
+                        # Si cambió el contenido, la copia local deja de servir
+                        "blob_sha256": _blob_vigente(excluido.sha256),
+                    },
+                ))
+            if ausentes:
+                await pg.execute(delete(PdfReplicaModelo).where(
+                    PdfReplicaModelo.tenant_id == tenant_id,
+                    PdfReplicaModelo.tipo == tipo,
+                    tuple_(PdfReplicaModelo.loc_cod, PdfReplicaModelo.numero).in_(ausentes),
+                ))
+            await pg.commit()
+
+    # --- Descarga (get-cliente) ---
+
+    async def resolver(self, tenant_id: int, tipo: int, loc_cod: int, numero: int) -> Optional[PdfResuelto]:
+        """
+        Metadatos del PDF y su blob local si existe. None si no está en pdf001.
+
+        Raises:
+            ReppdfNoDisponibleError: si hay que ir a REPPDF, no responde y no hay réplica.
+        """
+        if not self.habilitada:
+            meta = await reppdf_client.obtener_metadatos(tenant_id, tipo, loc_cod, numero)
+            return PdfResuelto(meta, None) if meta is not None else None
+
+        clave = (loc_cod, numero)
+        try:
+            fila = (await self._leer(tenant_id, tipo, [clave])).get(clave)
+        except _ERRORES_REPLICA as e:
+            logger.warning(f"Réplica PDF no disponible, consultando REPPDF: {e!r}")
+            fila = None
+        if fila is not None and self._fresca(fila):
+            return self._resuelto(fila)
+
+        try:
+            meta = await reppdf_client.obtener_metadatos(tenant_id, tipo, loc_cod, numero)
+        except ReppdfNoDisponibleError:
+            if fila is not None:
+                return self._resuelto(fila)
+            raise
+
+        try:
+            await self._registrar(tenant_id, tipo, {clave: meta} if meta else {}, [] if meta else [clave])
+        except _ERRORES_REPLICA as e:
+            logger.warning(f"No se pudo actualizar la réplica PDF (tenant={tenant_id}, tipo={tipo}): {e!r}")
+        if meta is None:
+            return None
+        vigente = fila is not None and fila.blob_sha256 is not None and fila.blob_sha256 == meta.sha256
+        return PdfResuelto(meta, fila.blob_sha256 if vigente else None)
+
+    @staticmethod
+    def _resuelto(fila) -> PdfResuelto:
+        meta = PdfMeta(tamano=fila.tamano, sha256=fila.sha256, actualizado=fila.actualizado)
+        vigente = fila.blob_sha256 is not None and fila.blob_sha256 == fila.sha256
+        return PdfResuelto(meta, fila.blob_sha256 if vigente else None)
+
+    async def iterar_local(self, blob_sha256: str, inicio: int, largo: int) -> AsyncIterator[bytes]:
+        """Bytes [inicio, inicio + largo) de la copia local, con sesión propia."""
+        async with SessionPostgresAsync() as pg:
+            async for chunk in DocumentoPdfService.iterar_pdf(pg, blob_sha256, inicio, largo):
+                yield chunk
+
+    async def copiar_al_terminar(
+        self, cuerpo: AsyncIterator[bytes], tenant_id: int, tipo: int, loc_cod: int, numero: int, meta: PdfMeta
+    ) -> AsyncIterator[bytes]:
+        """Reenvía el cuerpo y, si se transmitió completo, programa la copia local."""
+        async for chunk in cuerpo:
+            yield chunk
+        self.programar_copia(tenant_id, tipo, loc_cod, numero, meta)
+
+    def programar_copia(self, tenant_id: int, tipo: int, loc_cod: int, numero: int, meta: PdfMeta) -> None:
+        """Copia el PDF a pdf_blobs en segundo plano (una sola tarea por documento)."""
+        if not self.habilitada or not meta.sha256 or meta.tamano <= 0:
+            return
+        clave = (tenant_id, tipo, loc_cod, numero)
+        if clave in self._copias:
+            return
+        tarea = asyncio.ensure_future(self._copiar(clave, meta))
+        self._copias[clave] = tarea
+        tarea.add_done_callback(lambda _: self._copias.pop(clave, None))
+
+    async def _copiar(self, clave: ClaveDocumento, meta: PdfMeta) -> None:
+        tenant_id, tipo, loc_cod, numero = clave
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.copias_simultaneas)
+        try:
+            async with self._semaforo:
+                with ExitStack() as pila:
+                    ruta = await pdf_cache.obtener(clave, meta.sha256)
+                    if ruta is not None:
+                        # Abierto, el archivo sobrevive aunque la caché lo desaloje
+                        fuente = pila.enter_context(open(ruta, "rb"))
+                    else:
+                        fuente = pila.enter_context(tempfile.TemporaryFile())
+                        async for chunk in reppdf_client.iterar_pdf(tenant_id, tipo, loc_cod, numero, 0, meta.tamano):
+                            await anyio.to_thread.run_sync(fuente.write, chunk)
+                    item = ItemCarga(
+                        f"{tipo}_{loc_cod}_{numero}.pdf", tipo, numero, meta.tamano,
+                        partial(rebobinar, fuente), cerrar=False,
+                    )
+                    sha256 = await anyio.to_thread.run_sync(hash_item, item)
+                    if sha256 != meta.sha256:
+                        logger.warning(f"Réplica PDF {clave}: el contenido cambió durante la copia, se omite")
+                        return
+                    await self._guardar_copia(clave, item, sha256, pila)
+        except Exception as e:
+            logger.warning(f"No se pudo copiar el PDF {clave} a la réplica local: {e}")
+
+    @staticmethod
+    async def _guardar_copia(clave: ClaveDocumento, item: ItemCarga, sha256: str, pila: ExitStack) -> None:
+        async with SessionPostgresAsync() as pg:
+            asyncpg_conn = await conexion_asyncpg(pg)
+            async with asyncpg_conn.transaction():
+                # Solo si la réplica sigue apuntando a este contenido (no se aprobó ni cambió)
+                vigente = await asyncpg_conn.fetchval(
+                    "SELECT 1 FROM pdf_replicas WHERE tenant_id = $1 AND tipo = $2 AND loc_cod = $3 "
+                    "AND numero = $4 AND sha256 = $5 FOR UPDATE",
+                    *clave, sha256,
+                )
+                if not vigente:
+                    return
+                await DocumentoPdfService.guardar_blobs(asyncpg_conn, [item], [sha256], pila)
+                await asyncpg_conn.execute(
+                    "UPDATE pdf_replicas SET blob_sha256 = $5 "
+                    "WHERE tenant_id = $1 AND tipo = $2 AND loc_cod = $3 AND numero = $4",
+                    *clave, sha256,
+                )
+
+    # --- Borrado (aprobaciones) ---
+
+    async def eliminar_pdf(self, tenant_id: int, tipo: int, loc_cod: int, numero: int) -> None:
+        """Elimina el PDF de pdf001 y replica el borrado localmente. Falla silenciosamente."""
+        await reppdf_client.eliminar_pdf(tenant_id, tipo, loc_cod, numero)
+        if not self.habilitada:
+            return
+        try:
+            await self._registrar(tenant_id, tipo, {}, [(loc_cod, numero)])
+        except _ERRORES_REPLICA as e:
+            logger.error(f"No se pudo eliminar el PDF de la réplica local (tenant={tenant_id}, tipo={tipo}, numero={numero}): {e!r}")
+
+    async def detener(self) -> None:
+        """Cancela las copias en curso (shutdown)."""
+        tareas: Set[asyncio.Task] = set(self._copias.values())
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+
+pdf_replica = PdfReplica(
+    habilitada=settings.PDF_REPLICA_HABILITADA,
+    ttl=settings.PDF_REPLICA_TTL_SECONDS,
+    copias_simultaneas=settings.PDF_REPLICA_COPIAS_SIMULTANEAS,
+    sesiones_simultaneas=settings.PDF_REPLICA_SESIONES_SIMULTANEAS,
+)
@@ -1,17 +1,28 @@
 """
 Servicio de lógica de negocio para presupuestos
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_, case, text, select
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import Select
 from datetime import datetime, date
 import pytz
-import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Union
 from app.models.presupuesto import Presupuesto
+from app.models.local import Local
 from app.models.usuario import Usuario
-from app.schemas.presupuesto import PresupuestoIndicadores
+from app.schemas.presupuesto import PresupuestoIndicadores, PresupuestoIndicadoresLocal
 from app.schemas.presupuesto_detalle import DetallePresupuesto, ItemPresupuesto, CostoItem, PresupuestoHistorico, AprobacionPresupuesto
-from app.db.tenant_session import create_tenant_session
+from app.db.tenant_session import get_tenant_async_session
+from app.services.indicadores_cache import INDICADORES_PRESUPUESTOS, indicadores_cache
+from app.services.locales_cache import locales_cache
+from app.services.pdf_replica import pdf_replica
+from app.services.proyecciones import listado_presupuestos
+from app.services.reppdf_client import TIPO_PRESUPUESTO
+from app.utils.keyset import decodificar_cursor, despues_de, siguiente_cursor
+
+CURSOR_PENDIENTES = "presupuestos_pendientes"
+CURSOR_APROBADOS = "presupuestos_aprobados"
 
 
 class PresupuestoService:
@@ -19,206 +30,261 @@ class PresupuestoService:
     Servicio para operaciones de negocio relacionadas con presupuestos.
     
     Maneja la lógica de conteo y filtrado de presupuestos según
-    sus estados de aprobación.
+    sus estados de aprobación. Todas las queries son asíncronas (AsyncSession).
     """
+
+    # Clave de orden (descendente) de los listados paginables por cursor
+    ORDEN_PENDIENTES = (Presupuesto.pre_fec, Presupuesto.Loc_cod, Presupuesto.pre_nro)
+    ORDEN_APROBADOS = (Presupuesto.pre_vbggDt, Presupuesto.Loc_cod, Presupuesto.pre_nro)
     
     @staticmethod
-    def obtener_indicadores(db: Session) -> PresupuestoIndicadores:
+    async def obtener_indicadores(db: AsyncSession, tenant_id: int = 1) -> PresupuestoIndicadores:
         """
-        Obtiene los indicadores de presupuestos pendientes y aprobados.
+        Obtiene los indicadores de presupuestos pendientes y aprobados, con montos
+        (suma de Pre_Neto) y desglose por local.
         
         Lógica de negocio:
         - Pendientes: Pre_vbLib = 1 AND pre_vbgg = 0 y pre_est <> 'N'
           (Liberados pero pendientes de aprobación de gerencia y vigentes)
         - Aprobados: pre_vbgg = 1
           (Aprobados por gerencia general)
+
+        Una sola query con agregación condicional (SUM(CASE ...)) agrupada por local;
+        los totales se suman en memoria. El resultado se cachea por tenant
+        (ver indicadores_cache).
         
         Args:
             db: Sesión de base de datos SQLAlchemy
+            tenant_id: Tenant dueño de la caché
             
         Returns:
-            PresupuestoIndicadores: Objeto con contadores de pendientes y aprobados
+            PresupuestoIndicadores: Contadores, montos y desglose por local
         """
-        
-        # Contar presupuestos pendientes (liberados pero no aprobados y vigentes)
-        pendientes = db.query(func.count(Presupuesto.pre_nro)).filter(
-            and_(
-                Presupuesto.Pre_vbLib == 1,
-                Presupuesto.pre_vbgg == 0,
-                Presupuesto.pre_est != 'N'
+        cacheados = indicadores_cache.obtener(tenant_id, INDICADORES_PRESUPUESTOS)
+        if cacheados is not None:
+            return cacheados
+        generacion = indicadores_cache.generacion(tenant_id)
+
+        pendiente = and_(
+            Presupuesto.Pre_vbLib == 1,
+            Presupuesto.pre_vbgg == 0,
+            Presupuesto.pre_est != 'N'
+        )
+        aprobado = Presupuesto.pre_vbgg == 1
+        result = await db.execute(
+            select(
+                Presupuesto.Loc_cod,
+                Local.Loc_des,
+                func.sum(case((pendiente, 1), else_=0)).label("pendientes"),
+                func.sum(case((aprobado, 1), else_=0)).label("aprobados"),
+                func.sum(case((pendiente, Presupuesto.Pre_Neto), else_=0)).label("monto_pendientes"),
+                func.sum(case((aprobado, Presupuesto.Pre_Neto), else_=0)).label("monto_aprobados"),
+            ).outerjoin(
+                Local, Presupuesto.Loc_cod == Local.Loc_cod
+            ).where(
+                or_(pendiente, aprobado)
+            ).group_by(Presupuesto.Loc_cod, Local.Loc_des).order_by(Presupuesto.Loc_cod)
+        )
+
+        # MySQL devuelve SUM como DECIMAL
+        por_local = [
+            PresupuestoIndicadoresLocal(
+                Loc_cod=row.Loc_cod,
+                loc_des=row.Loc_des,
+                pendientes=int(row.pendientes or 0),
+                aprobados=int(row.aprobados or 0),
+                monto_pendientes=int(row.monto_pendientes or 0),
+                monto_aprobados=int(row.monto_aprobados or 0),
             )
-        ).scalar()
-        
-        # Contar presupuestos aprobados
-        aprobados = db.query(func.count(Presupuesto.pre_nro)).filter(
-            Presupuesto.pre_vbgg == 1
-        ).scalar()
-        
-        return PresupuestoIndicadores(
-            pendientes=pendientes or 0,
-            aprobados=aprobados or 0
+            for row in result.all()
+        ]
+        indicadores = PresupuestoIndicadores(
+            pendientes=sum(local.pendientes for local in por_local),
+            aprobados=sum(local.aprobados for local in por_local),
+            monto_pendientes=sum(local.monto_pendientes for local in por_local),
+            monto_aprobados=sum(local.monto_aprobados for local in por_local),
+            por_local=por_local,
         )
+        indicadores_cache.guardar(tenant_id, INDICADORES_PRESUPUESTOS, indicadores, generacion)
+        return indicadores
     
     @staticmethod
-    def _get_reppdf_session():
-        """Crea sesión a lexascl_reppdf usando env vars. Retorna None si no hay credenciales."""
-        host = os.getenv("REPPDF_HOST", "179.27.210.204")
-        port = int(os.getenv("REPPDF_PORT", "3306"))
-        db_name = os.getenv("REPPDF_DB", "lexascl_reppdf")
-        user = os.getenv("REPPDF_USER")
-        password = os.getenv("REPPDF_PASSWORD")
-        if not user or not password:
-            return None
-        return create_tenant_session(
-            db_host=host, db_port=port, db_name=db_name,
-            db_user=user, db_password=password
-        )
+    async def obtener_nombres_locales(tenant) -> Dict[int, str]:
+        """
+        Retorna {Loc_cod: Loc_des} de loc001, desde la caché del tenant (ver
+        locales_cache) si está vigente. Usa su propia sesión para poder correr en
+        paralelo con la query principal del listado.
+        """
+        nombres = locales_cache.obtener(tenant.id)
+        if nombres is not None:
+            return nombres
+        async with get_tenant_async_session(tenant) as db:
+            result = await db.execute(select(Local.Loc_cod, Local.Loc_des))
+            nombres = {row[0]: row[1] for row in result.all()}
+        locales_cache.guardar(tenant.id, nombres)
+        return nombres
 
     @staticmethod
-    def _verificar_pdfs_batch(items: list, tenant_id: int, tipo: int) -> dict:
+    def consulta_pendientes(skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Select:
         """
-        Consulta en una sola query todos los PDFs para una lista de (loc_cod, numero).
-        Retorna dict {(loc_cod, numero): estado} donde estado: 0=no existe, 1=con PDF, 2=sin contenido.
+        SELECT del listado de pendientes (también lo usa el asesor de índices de /tenant/db-check).
+
+        Raises:
+            CursorInvalidoError: si el cursor no es de este listado
         """
-        if not items:
-            return {}
-        import logging
-        _log = logging.getLogger(__name__)
-        db_cliente = PresupuestoService._get_reppdf_session()
-        if not db_cliente:
-            _log.error("_verificar_pdfs_batch: no REPPDF session (env vars REPPDF_USER/REPPDF_PASSWORD no configuradas)")
-            return {}
-        try:
-            pairs = [(loc_cod, numero) for loc_cod, numero in items]
-            numeros = [p[1] for p in pairs]
-            _log.info(f"_verificar_pdfs_batch: tenant_id={tenant_id}, tipo={tipo}, numeros={numeros}")
-            in_clause = ",".join(str(n) for n in numeros)
-            result = db_cliente.execute(
-                text(f"""
-                    SELECT PdfLocCod, PdfNumero, LENGTH(PdfBlob) as blob_size
-                    FROM pdf001
-                    WHERE PdfEmpCd = :emp_cd
-                      AND PdfTipo   = :tipo
-                      AND PdfNumero IN ({in_clause})
-                """),
-                {"emp_cd": tenant_id, "tipo": tipo}
+        orden = PresupuestoService.ORDEN_PENDIENTES
+        consulta = listado_presupuestos().where(
+            and_(
+                Presupuesto.Pre_vbLib == 1,
+                Presupuesto.pre_vbgg == 0,
+                Presupuesto.pre_est != 'N'
             )
-            rows = result.fetchall()
-            _log.info(f"_verificar_pdfs_batch: {len(rows)} filas encontradas: {[(r[0], r[1], r[2]) for r in rows]}")
-            pdf_map = {}
-            for row in rows:
-                key = (row[0], row[1])
-                blob_size = row[2] or 0
-                pdf_map[key] = 1 if blob_size > 0 else 2
-            for loc_cod, numero in pairs:
-                if (loc_cod, numero) not in pdf_map:
-                    pdf_map[(loc_cod, numero)] = 0
-            return pdf_map
-        except Exception as e:
-            _log.error(f"_verificar_pdfs_batch error: {e}", exc_info=True)
-            return {}
-        finally:
-            db_cliente.close()
+        ).order_by(*(columna.desc() for columna in orden)).limit(limit)
+        if cursor:
+            return consulta.where(despues_de(orden, decodificar_cursor(cursor, CURSOR_PENDIENTES, len(orden))))
+        return consulta.offset(skip)
 
     @staticmethod
-    def _verificar_pdf_existe(loc_cod: int, numero: int, tenant_id: int) -> int:
-        """
-        Verifica si existe PDF en la tabla pdf001 del cliente (lexascl_reppdf).
-        Retorna: 0 = no existe, 1 = existe con PDF, 2 = existe sin PDF (blob vacío)
+    def consulta_aprobados(
+        usuario: str,
+        fecha_desde: Union[str, date],
+        fecha_hasta: Union[str, date],
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Select:
         """
-        result = PresupuestoService._verificar_pdfs_batch([(loc_cod, numero)], tenant_id, 1)
-        return result.get((loc_cod, numero), 0)
+        SELECT del listado de aprobados (también lo usa el asesor de índices de /tenant/db-check).
 
-    @staticmethod
-    def _eliminar_pdf_reppdf(loc_cod: int, pre_nro: int, tenant_id: int) -> None:
-        """Elimina el PDF de pdf001 en REPPDF al aprobar un presupuesto. Falla silenciosamente."""
-        import logging
-        _log = logging.getLogger(__name__)
-        db_cliente = PresupuestoService._get_reppdf_session()
-        if not db_cliente:
-            return
-        try:
-            result = db_cliente.execute(
-                text("""
-                    DELETE FROM pdf001
-                    WHERE PdfEmpCd = :emp_cd
-                      AND PdfTipo   = 1
-                      AND PdfLocCod = :loc_cod
-                      AND PdfNumero = :numero
-                """),
-                {"emp_cd": tenant_id, "loc_cod": loc_cod, "numero": pre_nro}
+        Raises:
+            CursorInvalidoError: si el cursor no es de este listado
+        """
+        orden = PresupuestoService.ORDEN_APROBADOS
+        consulta = listado_presupuestos().where(
+            and_(
+                Presupuesto.pre_vbgg == 1,
+                Presupuesto.pre_vbggUsu == usuario,
+                Presupuesto.pre_vbggDt >= fecha_desde,
+                Presupuesto.pre_vbggDt <= fecha_hasta
             )
-            db_cliente.commit()
-            _log.info(f"PDF eliminado de REPPDF: tenant={tenant_id}, loc_cod={loc_cod}, pre_nro={pre_nro}, filas={result.rowcount}")
-        except Exception as e:
-            _log.error(f"Error al eliminar PDF de REPPDF: {e}", exc_info=True)
-        finally:
-            db_cliente.close()
+        ).order_by(*(columna.desc() for columna in orden)).limit(limit)
+        if cursor:
+            return consulta.where(despues_de(orden, decodificar_cursor(cursor, CURSOR_APROBADOS, len(orden))))
+        return consulta.offset(skip)
 
     @staticmethod
-    def obtener_presupuestos_pendientes(
-        db: Session,
+    async def obtener_presupuestos_pendientes(
+        db: AsyncSession,
         skip: int = 0,
-        limit: int = 100
-    ):
+        limit: int = 100,
+        tenant_id: int = 1,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Row], Dict[Tuple[int, int], Optional[int]], Optional[str]]:
         """
         Obtiene listado de presupuestos pendientes de aprobación con indicador de PDF.
         
+        Las filas se leen en streaming y el estado de los PDFs se consulta en REPPDF
+        por lotes a medida que llegan (ver ReppdfClient.estados_pdf_en_flujo).
+        Orden: pre_fec, Loc_cod, pre_nro descendentes.
+        
         Args:
             db: Sesión de base de datos
-            skip: Registros a omitir (para paginación)
+            skip: Registros a omitir (paginación por OFFSET; se ignora si hay cursor)
             limit: Límite de registros a retornar
+            tenant_id: Empresa en REPPDF (PdfEmpCd)
+            cursor: next_cursor de la página anterior (paginación por keyset)
             
         Returns:
-            List[Presupuesto]: Lista de presupuestos pendientes (se agregará tienepdf en el endpoint)
+            Tupla (filas de listado_presupuestos pendientes, {(Loc_cod, pre_nro): tienepdf},
+            next_cursor o None)
+
+        Raises:
+            CursorInvalidoError: si el cursor no es de este listado
         """
-        return db.query(Presupuesto).filter(
-            and_(
-                Presupuesto.Pre_vbLib == 1,
-                Presupuesto.pre_vbgg == 0,
-                Presupuesto.pre_est != 'N'
-            )
-        ).order_by(
-            Presupuesto.pre_fec.desc()
-        ).offset(skip).limit(limit).all()
+        consulta = PresupuestoService.consulta_pendientes(skip=skip, limit=limit, cursor=cursor)
+        result = await db.stream(consulta)
+        presupuestos, pdf_map = await pdf_replica.estados_pdf_en_flujo(
+            tenant_id, TIPO_PRESUPUESTO, result, lambda p: (p.Loc_cod, p.pre_nro)
+        )
+        siguiente = siguiente_cursor(
+            CURSOR_PENDIENTES, presupuestos, limit, lambda p: (p.pre_fec, p.Loc_cod, p.pre_nro)
+        )
+        return presupuestos, pdf_map, siguiente
     
     @staticmethod
-    def obtener_presupuestos_aprobados(
-        db: Session,
+    async def obtener_presupuestos_aprobados(
+        db: AsyncSession,
         usuario: str,
         fecha_desde: str,
         fecha_hasta: str,
         skip: int = 0,
-        limit: int = 100
-    ):
+        limit: int = 100,
+        tenant_id: int = 1,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Row], Dict[Tuple[int, int], Optional[int]], Optional[str]]:
         """
         Obtiene listado de presupuestos aprobados filtrados por usuario y rango de fechas.
+        Igual que los pendientes, el estado de los PDFs se consulta mientras llegan las filas.
+        Orden: pre_vbggDt, Loc_cod, pre_nro descendentes.
         
         Args:
             db: Sesión de base de datos
             usuario: Código de usuario (pre_vbggUsu) que aprobó
             fecha_desde: Fecha inicial del rango (formato YYYY-MM-DD)
             fecha_hasta: Fecha final del rango (formato YYYY-MM-DD)
-            skip: Registros a omitir (para paginación)
+            skip: Registros a omitir (paginación por OFFSET; se ignora si hay cursor)
             limit: Límite de registros a retornar
+            tenant_id: Empresa en REPPDF (PdfEmpCd)
+            cursor: next_cursor de la página anterior (paginación por keyset)
             
         Returns:
-            List[Presupuesto]: Lista de presupuestos aprobados por el usuario en el rango de fechas
+            Tupla (filas de listado_presupuestos aprobadas por el usuario en el rango,
+            {(Loc_cod, pre_nro): tienepdf}, next_cursor o None)
+
+        Raises:
+            CursorInvalidoError: si el cursor no es de este listado
         """
-        return db.query(Presupuesto).filter(
-            and_(
-                Presupuesto.pre_vbgg == 1,
-                Presupuesto.pre_vbggUsu == usuario,
-                Presupuesto.pre_vbggDt >= fecha_desde,
-                Presupuesto.pre_vbggDt <= fecha_hasta
-            )
-        ).order_by(
-            Presupuesto.pre_vbggDt.desc()
-        ).offset(skip).limit(limit).all()
+        consulta = PresupuestoService.consulta_aprobados(
+            usuario, fecha_desde, fecha_hasta, skip=skip, limit=limit, cursor=cursor
+        )
+        result = await db.stream(consulta)
+        presupuestos, pdf_map = await pdf_replica.estados_pdf_en_flujo(
+            tenant_id, TIPO_PRESUPUESTO, result, lambda p: (p.Loc_cod, p.pre_nro)
+        )
+        siguiente = siguiente_cursor(
+            CURSOR_APROBADOS, presupuestos, limit, lambda p: (p.pre_vbggDt, p.Loc_cod, p.pre_nro)
+        )
+        return presupuestos, pdf_map, siguiente
     
     @staticmethod
-    def aprobar_presupuesto(
-        db: Session,
+    async def claves_aprobadas(
+        db: AsyncSession,
+        usuario: str,
+        fecha_desde: date,
+        fecha_hasta: date,
+        limite: int
+    ) -> List[Tuple[int, int]]:
+        """
+        (Loc_cod, pre_nro) de los presupuestos aprobados por un usuario en un rango de
+        fechas, p.ej. para descargar sus PDFs en un zip. Solo lee las columnas de la clave.
+        """
+        result = await db.execute(
+            select(Presupuesto.Loc_cod, Presupuesto.pre_nro).where(
+                and_(
+                    Presupuesto.pre_vbgg == 1,
+                    Presupuesto.pre_vbggUsu == usuario,
+                    Presupuesto.pre_vbggDt >= fecha_desde,
+                    Presupuesto.pre_vbggDt <= fecha_hasta
+                )
+            ).order_by(
+                Presupuesto.pre_vbggDt, Presupuesto.Loc_cod, Presupuesto.pre_nro
+            ).limit(limite)
+        )
+        return [(row[0], row[1]) for row in result.all()]
+
+    @staticmethod
+    async def aprobar_presupuesto(
+        db: AsyncSession,
         loc_cod: int,
         pre_nro: int,
         usuario: str,
@@ -240,17 +306,21 @@ class PresupuestoService:
             ValueError: Si el presupuesto no existe o si el usuario no existe
         """
         # Validar que el usuario existe
-        usuario_existe = db.query(Usuario).filter(Usuario.UserCd == usuario).first()
+        usuario_existe = (await db.execute(
+            select(Usuario).where(Usuario.UserCd == usuario)
+        )).scalars().first()
         if not usuario_existe:
             raise ValueError(f"Usuario no encontrado: {usuario}")
         
         # Buscar el presupuesto
-        presupuesto = db.query(Presupuesto).filter(
-            and_(
-                Presupuesto.Loc_cod == loc_cod,
-                Presupuesto.pre_nro == pre_nro
+        presupuesto = (await db.execute(
+            select(Presupuesto).where(
+                and_(
+                    Presupuesto.Loc_cod == loc_cod,
+                    Presupuesto.pre_nro == pre_nro
+                )
             )
-        ).first()
+        )).scalars().first()
         
         if not presupuesto:
             raise ValueError(f"Presupuesto no encontrado: Loc_cod={loc_cod}, pre_nro={pre_nro}")
@@ -268,11 +338,11 @@ class PresupuestoService:
         presupuesto.pre_vbggTime = hora_aprobacion
         
         # Guardar cambios
-        db.commit()
-        db.refresh(presupuesto)
+        await db.commit()
+        await db.refresh(presupuesto)
 
         # Eliminar PDF de REPPDF si existe
-        PresupuestoService._eliminar_pdf_reppdf(loc_cod, pre_nro, tenant_id)
+        await pdf_replica.eliminar_pdf(tenant_id, TIPO_PRESUPUESTO, loc_cod, pre_nro)
 
         return {
             "Loc_cod": presupuesto.Loc_cod,
@@ -283,7 +353,7 @@ class PresupuestoService:
         }
 
     @staticmethod
-    def buscar_historico(db: Session, q: str, skip: int = 0, limit: int = 50, tenant_id: int = 1) -> List[PresupuestoHistorico]:
+    async def buscar_historico(db: AsyncSession, q: str, skip: int = 0, limit: int = 50, tenant_id: int = 1) -> List[PresupuestoHistorico]:
         """
         Busca presupuestos históricos por referencia OR nombre de cliente.
         Requiere mínimo 3 caracteres.
@@ -301,7 +371,7 @@ class PresupuestoService:
         params["limit"] = limit
         params["skip"] = skip
 
-        result = db.execute(
+        result = await db.stream(
             text(f"""
                 SELECT c.Loc_cod, c.pre_nro, c.pre_fec, c.pre_rut, cl.cli_namel,
                        c.sol_nro, c.pre_ref, c.Pre_Neto, c.pre_est, c.pre_vbgg,
@@ -313,13 +383,12 @@ class PresupuestoService:
                 LIMIT :limit OFFSET :skip
             """),
             params
-        ).fetchall()
-
-        rows = result
+        )
 
-        # Batch PDF check
-        items = [(row[0], row[1]) for row in rows]
-        pdf_map = PresupuestoService._verificar_pdfs_batch(items, tenant_id, 1) if items else {}
+        # Estados de PDF consultados por lotes mientras llegan las filas
+        rows, pdf_map = await pdf_replica.estados_pdf_en_flujo(
+            tenant_id, TIPO_PRESUPUESTO, result, lambda row: (row[0], row[1])
+        )
 
         return [
             PresupuestoHistorico(
@@ -335,13 +404,13 @@ class PresupuestoService:
                 pre_vbgg=row[9] or 0,
                 pre_vbggUsu=row[10] or "",
                 pre_vbggDt=row[11],
-                tienepdf=pdf_map.get((row[0], row[1]), 0),
+                tienepdf=pdf_map.get((row[0], row[1])),
             )
             for row in rows
         ]
 
     @staticmethod
-    def obtener_detalle(db: Session, loc_cod: int, pre_nro: int) -> DetallePresupuesto:
+    async def obtener_detalle(db: AsyncSession, loc_cod: int, pre_nro: int) -> DetallePresupuesto:
         """
         Obtiene el detalle completo de un presupuesto: ítems (cot005) y costos por ítem (cot005l).
         Usa 2 queries batch para evitar N+1.
@@ -356,7 +425,7 @@ class PresupuestoService:
         }
 
         # Query 0: datos de aprobaciones del presupuesto (cabecera cot013)
-        aprobacion_row = db.execute(
+        aprobacion_row = (await db.execute(
             text("""
                 SELECT Pre_VbLibUsu, Pre_VBLibDt, Pre_VbLibTime,
                        pre_VbUsu, pre_VbFec, pre_VbTime,
@@ -365,7 +434,7 @@ class PresupuestoService:
                 WHERE Loc_cod = :loc_cod AND pre_nro = :pre_nro
             """),
             {"loc_cod": loc_cod, "pre_nro": pre_nro}
-        ).fetchone()
+        )).fetchone()
 
         from datetime import date as date_type
         def _fecha(val) -> date_type | None:
@@ -388,7 +457,7 @@ class PresupuestoService:
         ) if aprobacion_row else AprobacionPresupuesto()
 
         # Query 1: todos los ítems del presupuesto
-        items_result = db.execute(
+        items_result = (await db.execute(
             text("""
                 SELECT pre_lin, pre_des, pre_de1, pre_de2, pre_de3, pre_de4,
                        pre_cpr, pre_pre, pre_dct
@@ -397,10 +466,10 @@ class PresupuestoService:
                 ORDER BY pre_lin
             """),
             {"loc_cod": loc_cod, "pre_nro": pre_nro}
-        ).fetchall()
+        )).fetchall()
 
         # Query 2: todos los costos del presupuesto (batch)
-        costos_result = db.execute(
+        costos_result = (await db.execute(
             text("""
                 SELECT pre_lin, pre_dtlin, Pre_DtTip, Pre_DtCant, Pre_DtPre, Pre_DtDescrip
                 FROM cot005l
@@ -408,7 +477,7 @@ class PresupuestoService:
                 ORDER BY pre_lin, pre_dtlin
             """),
             {"loc_cod": loc_cod, "pre_nro": pre_nro}
-        ).fetchall()
+        )).fetchall()
 
         # Agrupar costos por pre_lin en memoria
         costos_por_item: Dict[int, List[CostoItem]] = {}
@@ -445,27 +514,29 @@ class PresupuestoService:
         return DetallePresupuesto(loc_cod=loc_cod, pre_nro=pre_nro, aprobaciones=aprobaciones, items=items)
 
     @staticmethod
-    def anular_presupuesto(
-        db: Session,
+    async def anular_presupuesto(
+        db: AsyncSession,
         loc_cod: int,
         pre_nro: int,
     ) -> dict:
         """
         Anula un presupuesto seteando pre_est = 'N'.
         """
-        presupuesto = db.query(Presupuesto).filter(
-            and_(
-                Presupuesto.Loc_cod == loc_cod,
-                Presupuesto.pre_nro == pre_nro,
-                Presupuesto.pre_est != 'N'
+        presupuesto = (await db.execute(
+            select(Presupuesto).where(
+                and_(
+                    Presupuesto.Loc_cod == loc_cod,
+                    Presupuesto.pre_nro == pre_nro,
+                    Presupuesto.pre_est != 'N'
+                )
             )
-        ).first()
+        )).scalars().first()
 
         if not presupuesto:
             raise ValueError(f"Presupuesto no encontrado o ya anulado: Loc_cod={loc_cod}, pre_nro={pre_nro}")
 
         presupuesto.pre_est = 'N'
-        db.commit()
+        await db.commit()
 
         return {
             "Loc_cod": presupuesto.Loc_cod,
@@ -473,8 +544,8 @@ class PresupuestoService:
         }
 
     @staticmethod
-    def desaprobar_presupuesto(
-        db: Session,
+    async def desaprobar_presupuesto(
+        db: AsyncSession,
         loc_cod: int,
         pre_nro: int,
         usuario: str
@@ -495,17 +566,21 @@ class PresupuestoService:
             ValueError: Si el presupuesto no existe o si el usuario no existe
         """
         # Validar que el usuario existe
-        usuario_existe = db.query(Usuario).filter(Usuario.UserCd == usuario).first()
+        usuario_existe = (await db.execute(
+            select(Usuario).where(Usuario.UserCd == usuario)
+        )).scalars().first()
         if not usuario_existe:
             raise ValueError(f"Usuario no encontrado: {usuario}")
         
         # Buscar el presupuesto
-        presupuesto = db.query(Presupuesto).filter(
-            and_(
-                Presupuesto.Loc_cod == loc_cod,
-                Presupuesto.pre_nro == pre_nro
+        presupuesto = (await db.execute(
+            select(Presupuesto).where(
+                and_(
+                    Presupuesto.Loc_cod == loc_cod,
+                    Presupuesto.pre_nro == pre_nro
+                )
             )
-        ).first()
+        )).scalars().first()
         
         if not presupuesto:
             raise ValueError(f"Presupuesto no encontrado: Loc_cod={loc_cod}, pre_nro={pre_nro}")
@@ -520,8 +595,8 @@ class PresupuestoService:
         presupuesto.pre_vbggDt = date(1000, 1, 1)
         
         # Guardar cambios
-        db.commit()
-        db.refresh(presupuesto)
+        await db.commit()
+        await db.refresh(presupuesto)
         
         return {
             "Loc_cod": presupuesto.Loc_cod,
@@ -0,0 +1,95 @@
+"""
+Proyecciones de los listados de presupuestos y órdenes de compra.
+
+cot013 tiene ~90 columnas (pre_ob1..pre_ob20 CHAR(70), pre_ref TEXT, datos de mail...)
+y los listados solo devuelven una docena. Estos select() de Core leen exactamente las
+columnas que responde cada endpoint, etiquetadas con el nombre del atributo del
+modelo: las filas (Row, una namedtuple) se usan igual que la entidad
+(fila.pre_nro, fila.cliente_nombre) sin hidratar objetos ORM.
+
+El nombre del cliente/proveedor sale de un LEFT JOIN en la misma query. Las relaciones
+Presupuesto.cliente y OrdenCompra.proveedor no se cargan por defecto: quien necesite
+la entidad completa las pide con options(joinedload(...)).
+"""
+from sqlalchemy import func, literal, select
+from sqlalchemy.sql import Select
+
+from app.models.cliente import Cliente
+from app.models.local import Local
+from app.models.orden_compra import OrdenCompra
+from app.models.presupuesto import Presupuesto
+from app.models.proveedor import Proveedor
+
+# Columnas de PresupuestoDetalle (loc_des se resuelve aparte, con loc001 en locales_cache)
+COLUMNAS_PRESUPUESTO = (
+    Presupuesto.Loc_cod,
+    Presupuesto.pre_nro,
+    Presupuesto.pre_est,
+    Presupuesto.pre_fec,
+    Presupuesto.pre_rut,
+    Presupuesto.pre_VenCod,
+    Presupuesto.Pre_Neto,
+    Presupuesto.Pre_vbLib,
+    Presupuesto.pre_vbgg,
+    Presupuesto.pre_gl1,
+    Presupuesto.pre_fecAdj,
+    Presupuesto.Pre_VbLibUsu,
+    Presupuesto.Pre_VBLibDt,
+    Presupuesto.pre_vb,
+    Presupuesto.pre_VbUsu,
+    Presupuesto.pre_VbFec,
+    Presupuesto.pre_vbggUsu,
+    Presupuesto.pre_vbggDt,
+    Presupuesto.pre_trnFec,
+    Presupuesto.pre_trnusu,
+)
+
+# Columnas de OrdenCompraDetalle; ocp_A1_Dt/ocp_A1_Hr también son la clave del cursor
+COLUMNAS_ORDEN_COMPRA = (
+    OrdenCompra.Loc_cod,
+    OrdenCompra.ocp_nro,
+    OrdenCompra.ocp_fec,
+    OrdenCompra.ocp_fee,
+    OrdenCompra.pro_rut,
+    OrdenCompra.ocp_pdt,
+    OrdenCompra.ocp_net,
+    OrdenCompra.ocp_iva,
+    OrdenCompra.ocp_ila,
+    OrdenCompra.ocp_A1_Ap,
+    OrdenCompra.ocp_A1_Usu,
+    OrdenCompra.ocp_A1_Dt,
+    OrdenCompra.ocp_A1_Hr,
+    OrdenCompra.ocp_A2_Ap,
+    OrdenCompra.ocp_A2_Usu,
+    OrdenCompra.ocp_A3_Anu,
+    OrdenCompra.ocp_A3_Usu,
+    OrdenCompra.ocp_A4_Ap,
+    OrdenCompra.ocp_A4_Usu,
+)
+
+
+def listado_presupuestos() -> Select:
+    """
+    SELECT de las columnas del listado de presupuestos + cliente_nombre
+    (mismo valor que la property Presupuesto.cliente_nombre).
+    """
+    cliente_nombre = func.coalesce(func.trim(Cliente.Cli_Name), literal("Cliente Desconocido"))
+    return select(*COLUMNAS_PRESUPUESTO, cliente_nombre.label("cliente_nombre")).outerjoin(
+        Cliente, Presupuesto.pre_rut == Cliente.Cli_Code
+    )
+
+
+def listado_ordenes_compra(con_sucursal: bool = False) -> Select:
+    """
+    SELECT de las columnas del listado de órdenes de compra + proveedor_nombre y
+    monto_total (como las properties de OrdenCompra) y, opcionalmente, loc_des.
+    """
+    proveedor_nombre = func.coalesce(Proveedor.pro_nom, literal("Desconocido"))
+    monto_total = OrdenCompra.ocp_net + OrdenCompra.ocp_iva + OrdenCompra.ocp_ila
+    columnas = [*COLUMNAS_ORDEN_COMPRA, proveedor_nombre.label("proveedor_nombre"), monto_total.label("monto_total")]
+    if con_sucursal:
+        columnas.append(Local.Loc_des.label("loc_des"))
+    consulta = select(*columnas).outerjoin(Proveedor, OrdenCompra.pro_rut == Proveedor.pro_rut)
+    if con_sucursal:
+        consulta = consulta.outerjoin(Local, OrdenCompra.Loc_cod == Local.Loc_cod)
+    return consulta
@@ -0,0 +1,386 @@
+"""
+Cliente de REPPDF (lexascl_reppdf, tabla pdf001).
+
+Punto único de acceso a la BD remota de PDFs, compartido por presupuestos,
+órdenes de compra y documentos PDF:
+- Engine aiomysql propio, con pool dimensionado (no compite con las BDs de tenants).
+- Deadline por llamada (asyncio.wait_for): un host lento no frena los listados.
+- Circuit breaker: tras N fallas seguidas deja de consultar durante un tiempo y
+  responde de inmediato como degradado.
+
+Los estados (tienepdf) se leen de pdf001_meta (tamaño, sha256 y fecha de cada
+PDF, mantenida por triggers; ver schema/reppdf.sql), nunca del blob de pdf001.
+Las consultas de estado nunca lanzan excepción: si REPPDF no está disponible,
+el estado de cada documento es None ("desconocido").
+"""
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.core.config import get_settings
+from app.services.pdf_cache import pdf_cache
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Valores de PdfTipo en pdf001
+TIPO_PRESUPUESTO = 1
+TIPO_ORDEN_COMPRA = 2
+
+# Estados de tienepdf
+PDF_NO_EXISTE = 0
+PDF_CON_CONTENIDO = 1
+PDF_SIN_CONTENIDO = 2
+
+
+class ReppdfNoDisponibleError(Exception):
+    """REPPDF sin credenciales, con el circuito abierto, o sin responder dentro del deadline."""
+
+
+@dataclass(frozen=True)
+class PdfMeta:
+    """Fila de pdf001_meta."""
+    tamano: int
+    sha256: Optional[str]
+    actualizado: Optional[datetime]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simple por conteo de fallas consecutivas.
+
+    - cerrado: las llamadas pasan; cada falla suma, cada éxito reinicia el conteo.
+    - abierto: al llegar al umbral, las llamadas se rechazan durante `tiempo_apertura` segundos.
+    - semiabierto: vencido ese tiempo se deja pasar una llamada de prueba; si falla, se reabre.
+      Si la prueba se cancela (sin éxito ni falla) se libera para que pase la siguiente.
+    """
+
+    def __init__(self, umbral_fallas: int, tiempo_apertura: float):
+        self.umbral_fallas = umbral_fallas
+        self.tiempo_apertura = tiempo_apertura
+        self._fallas = 0
+        self._abierto_en: Optional[float] = None
+        self._prueba_en_curso = False
+
+    @property
+    def estado(self) -> str:
+        if self._abierto_en is None:
+            return "cerrado"
+        if time.monotonic() - self._abierto_en >= self.tiempo_apertura:
+            return "semiabierto"
+        return "abierto"
+
+    def permitir(self) -> bool:
+        estado = self.estado
+        if estado == "cerrado":
+            return True
+        if estado == "semiabierto" and not self._prueba_en_curso:
+            self._prueba_en_curso = True
+            return True
+        return False
+
+    def liberar_prueba(self) -> None:
+        """La llamada terminó sin resultado (cancelada): no cuenta como éxito ni falla."""
+        self._prueba_en_curso = False
+
+    def registrar_exito(self) -> None:
+        self._fallas = 0
+        self._abierto_en = None
+        self._prueba_en_curso = False
+
+    def registrar_falla(self) -> None:
+        self._fallas += 1
+        self._prueba_en_curso = False
+        if self._abierto_en is not None or self._fallas >= self.umbral_fallas:
+            if self._abierto_en is None:
+                logger.warning(f"REPPDF: circuito abierto tras {self._fallas} fallas consecutivas")
+            self._abierto_en = time.monotonic()
+
+
+class ReppdfClient:
+    """
+    Cliente singleton de REPPDF. El engine se crea en el primer uso con las
+    credenciales de REPPDF_HOST/PORT/DB/USER/PASSWORD.
+    """
+
+    def __init__(
+        self,
+        pool_size: int,
+        max_overflow: int,
+        timeout: float,
+        umbral_fallas: int,
+        tiempo_apertura: float,
+        tamano_lote: int = 200,
+        tamano_chunk: int = 256 * 1024,
+    ):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.tamano_lote = tamano_lote
+        self.tamano_chunk = tamano_chunk
+        self.breaker = CircuitBreaker(umbral_fallas, tiempo_apertura)
+        self._engine: Optional[AsyncEngine] = None
+        self._session_factory: Optional[async_sessionmaker] = None
+
+    def _factory(self) -> async_sessionmaker:
+        if self._session_factory is None:
+            user = os.getenv("REPPDF_USER")
+            password = os.getenv("REPPDF_PASSWORD")
+            if not user or not password:
+                raise ReppdfNoDisponibleError("Credenciales de REPPDF no configuradas (REPPDF_USER/REPPDF_PASSWORD)")
+            host = os.getenv("REPPDF_HOST", "179.27.210.204")
+            port = int(os.getenv("REPPDF_PORT", "3306"))
+            db_name = os.getenv("REPPDF_DB", "lexascl_reppdf")
+            self._engine = create_async_engine(
+                f"mysql+aiomysql://{user}:{password}@{host}:{port}/{db_name}?charset=utf8mb4",
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                # Esperar un slot del pool también cuenta contra el deadline
+                pool_timeout=self.timeout,
+                connect_args={"connect_timeout": max(1, int(self.timeout))},
+            )
+            self._session_factory = async_sessionmaker(self._engine, autoflush=False, expire_on_commit=False)
+        return self._session_factory
+
+    async def _ejecutar(self, sql: str, params: dict, commit: bool = False):
+        """Ejecuta una sentencia con deadline y circuit breaker. Retorna el Result ya consumible."""
+        factory = self._factory()
+        if not self.breaker.permitir():
+            raise ReppdfNoDisponibleError("REPPDF no disponible (circuito abierto)")
+
+        async def _run():
+            async with factory() as db:
+                result = await db.execute(text(sql), params)
+                if commit:
+                    await db.commit()
+                    return result.rowcount
+                return result.fetchall()
+
+        try:
+            resultado = await asyncio.wait_for(_run(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.breaker.registrar_falla()
+            raise ReppdfNoDisponibleError(f"REPPDF no respondió en {self.timeout}s")
+        except Exception as e:
+            self.breaker.registrar_falla()
+            raise ReppdfNoDisponibleError(f"Error al consultar REPPDF: {e}") from e
+        except BaseException:
+            # CancelledError (lote cancelado, cliente desconectado): si era la prueba del
+            # semiabierto, sin esto el circuito quedaría cerrado a toda llamada
+            self.breaker.liberar_prueba()
+            raise
+        self.breaker.registrar_exito()
+        return resultado
+
+    async def estados_pdf(
+        self, tenant_id: int, tipo: int, items: Iterable[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], Optional[int]]:
+        """
+        Estado del PDF de cada (loc_cod, numero): 0=no existe, 1=con PDF, 2=sin contenido,
+        None=desconocido (REPPDF no disponible). Nunca lanza excepción.
+
+        Las claves se consultan en lotes de `tamano_lote` que corren en paralelo;
+        si un lote falla, solo sus documentos quedan como desconocidos.
+        """
+        items = list(dict.fromkeys(items))
+        if not items:
+            return {}
+        lotes = [items[i:i + self.tamano_lote] for i in range(0, len(items), self.tamano_lote)]
+        estados: Dict[Tuple[int, int], Optional[int]] = {}
+        for parcial in await asyncio.gather(*(self._estados_lote(tenant_id, tipo, lote) for lote in lotes)):
+            estados.update(parcial)
+        return estados
+
+    async def estados_pdf_en_flujo(
+        self,
+        tenant_id: int,
+        tipo: int,
+        filas: AsyncIterable[Any],
+        clave: Callable[[Any], Tuple[int, int]],
+        estados_lote: Optional[Callable[..., Awaitable[Dict[Tuple[int, int], Optional[int]]]]] = None,
+    ) -> Tuple[List[Any], Dict[Tuple[int, int], Optional[int]]]:
+        """
+        Consume un resultado en streaming (AsyncSession.stream) y lanza la consulta de
+        estados de cada lote apenas se completa, mientras siguen llegando filas; así
+        la latencia total se acerca a la de la llamada más lenta y no a la suma.
+
+        `estados_lote(tenant_id, tipo, lote)` permite resolver los lotes en otra fuente
+        (ver PdfReplica); por omisión se consulta pdf001_meta.
+
+        Retorna (filas, estados) con estados indexado por clave(fila).
+        """
+        estados_lote = estados_lote or self._estados_lote
+        leidas: List[Any] = []
+        lote: List[Tuple[int, int]] = []
+        tareas = []
+        try:
+            async for fila in filas:
+                leidas.append(fila)
+                lote.append(clave(fila))
+                if len(lote) >= self.tamano_lote:
+                    tareas.append(asyncio.ensure_future(estados_lote(tenant_id, tipo, lote)))
+                    lote = []
+        except BaseException:
+            for tarea in tareas:
+                tarea.cancel()
+            raise
+        if lote:
+            tareas.append(asyncio.ensure_future(estados_lote(tenant_id, tipo, lote)))
+        estados: Dict[Tuple[int, int], Optional[int]] = {}
+        for parcial in await asyncio.gather(*tareas):
+            estados.update(parcial)
+        return leidas, estados
+
+    async def _estados_lote(
+        self, tenant_id: int, tipo: int, lote: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], Optional[int]]:
+        # Lee solo pdf001_meta (mantenida por triggers, ver schema/reppdf.sql): no toca
+        # las páginas LOB de pdf001. Filtro por (PdfLocCod, PdfNumero) con parámetros
+        # bind, resuelto con seeks sobre la PK (PdfEmpCd, PdfTipo, PdfLocCod, PdfNumero).
+        try:
+            rows = await self._leer_meta_lote(tenant_id, tipo, lote, "PdfBytes")
+        except ReppdfNoDisponibleError as e:
+            logger.warning(f"Estados PDF degradados (tenant={tenant_id}, tipo={tipo}, {len(lote)} docs): {e}")
+            return {item: None for item in lote}
+
+        encontrados = {
+            (row[0], row[1]): PDF_CON_CONTENIDO if (row[2] or 0) > 0 else PDF_SIN_CONTENIDO
+            for row in rows
+        }
+        return {item: encontrados.get(item, PDF_NO_EXISTE) for item in lote}
+
+    async def _leer_meta_lote(self, tenant_id: int, tipo: int, lote: List[Tuple[int, int]], columnas: str):
+        """SELECT PdfLocCod, PdfNumero, <columnas> de pdf001_meta para un lote de (loc_cod, numero)."""
+        params = {"emp_cd": tenant_id, "tipo": tipo}
+        claves = []
+        for i, (loc_cod, numero) in enumerate(lote):
+            params[f"l{i}"] = loc_cod
+            params[f"n{i}"] = numero
+            claves.append(f"(:l{i}, :n{i})")
+        return await self._ejecutar(
+            f"""
+                SELECT PdfLocCod, PdfNumero, {columnas}
+                FROM pdf001_meta
+                WHERE PdfEmpCd = :emp_cd
+                  AND PdfTipo   = :tipo
+                  AND (PdfLocCod, PdfNumero) IN ({", ".join(claves)})
+            """,
+            params,
+        )
+
+    async def metadatos_lote(
+        self, tenant_id: int, tipo: int, lote: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], PdfMeta]:
+        """
+        Metadatos de un lote de (loc_cod, numero) en una sola consulta; los que no
+        existen no aparecen en el resultado.
+
+        Raises:
+            ReppdfNoDisponibleError: si REPPDF no está disponible.
+        """
+        if not lote:
+            return {}
+        rows = await self._leer_meta_lote(tenant_id, tipo, lote, "PdfBytes, PdfSha256, PdfActualizado")
+        return {
+            (row[0], row[1]): PdfMeta(tamano=int(row[2] or 0), sha256=row[3], actualizado=row[4])
+            for row in rows
+        }
+
+    async def obtener_metadatos(self, tenant_id: int, tipo: int, loc_cod: int, numero: int) -> Optional[PdfMeta]:
+        """
+        Retorna tamaño, hash y fecha del PDF desde pdf001_meta, o None si no existe.
+
+        Raises:
+            ReppdfNoDisponibleError: si REPPDF no está disponible.
+        """
+        rows = await self._ejecutar(
+            """
+                SELECT PdfBytes, PdfSha256, PdfActualizado
+                FROM pdf001_meta
+                WHERE PdfEmpCd = :emp_cd
+                  AND PdfTipo   = :tipo
+                  AND PdfLocCod = :loc_cod
+                  AND PdfNumero = :numero
+            """,
+            {"emp_cd": tenant_id, "tipo": tipo, "loc_cod": loc_cod, "numero": numero},
+        )
+        if not rows:
+            return None
+        return PdfMeta(tamano=int(rows[0][0] or 0), sha256=rows[0][1], actualizado=rows[0][2])
+
+    async def iterar_pdf(
+        self, tenant_id: int, tipo: int, loc_cod: int, numero: int, inicio: int, largo: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Entrega los bytes [inicio, inicio + largo) del PDF en ventanas SUBSTRING de
+        `tamano_chunk`: la memoria por request queda acotada a un chunk. Cada ventana
+        es una llamada independiente con su propio deadline.
+        """
+        fin = inicio + largo
+        posicion = inicio
+        while posicion < fin:
+            tamano = min(self.tamano_chunk, fin - posicion)
+            rows = await self._ejecutar(
+                """
+                    SELECT SUBSTRING(PdfBlob, :desde, :largo)
+                    FROM pdf001
+                    WHERE PdfEmpCd = :emp_cd
+                      AND PdfTipo   = :tipo
+                      AND PdfLocCod = :loc_cod
+                      AND PdfNumero = :numero
+                """,
+                # SUBSTRING es 1-based
+                {"desde": posicion + 1, "largo": tamano,
+                 "emp_cd": tenant_id, "tipo": tipo, "loc_cod": loc_cod, "numero": numero},
+            )
+            chunk = rows[0][0] if rows else None
+            if not chunk:
+                raise ReppdfNoDisponibleError(f"PDF truncado o eliminado durante la lectura (byte {posicion})")
+            yield chunk
+            posicion += len(chunk)
+
+    async def eliminar_pdf(self, tenant_id: int, tipo: int, loc_cod: int, numero: int) -> None:
+        """Elimina el PDF de pdf001 (al aprobar un documento). Falla silenciosamente."""
+        try:
+            filas = await self._ejecutar(
+                """
+                    DELETE FROM pdf001
+                    WHERE PdfEmpCd = :emp_cd
+                      AND PdfTipo   = :tipo
+                      AND PdfLocCod = :loc_cod
+                      AND PdfNumero = :numero
+                """,
+                {"emp_cd": tenant_id, "tipo": tipo, "loc_cod": loc_cod, "numero": numero},
+                commit=True,
+            )
+            logger.info(f"PDF eliminado de REPPDF: tenant={tenant_id}, tipo={tipo}, loc_cod={loc_cod}, numero={numero}, filas={filas}")
+            pdf_cache.invalidar((tenant_id, tipo, loc_cod, numero))
+        except ReppdfNoDisponibleError as e:
+            logger.error(f"No se pudo eliminar PDF de REPPDF (tenant={tenant_id}, tipo={tipo}, numero={numero}): {e}")
+
+    async def dispose(self) -> None:
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._session_factory = None
+
+
+reppdf_client = ReppdfClient(
+    pool_size=settings.REPPDF_POOL_SIZE,
+    max_overflow=settings.REPPDF_MAX_OVERFLOW,
+    timeout=settings.REPPDF_TIMEOUT_SECONDS,
+    umbral_fallas=settings.REPPDF_CIRCUIT_FAILURES,
+    tiempo_apertura=settings.REPPDF_CIRCUIT_RESET_SECONDS,
+    tamano_lote=settings.REPPDF_BATCH_SIZE,
+    tamano_chunk=settings.REPPDF_CHUNK_BYTES,
+)
@@ -1,7 +1,8 @@
 """
 Servicio de lógica de negocio para usuarios
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.models.usuario import Usuario
@@ -13,7 +14,7 @@ class UsuarioService:
     """
 
     @staticmethod
-    def obtener_todos_usuarios(db: Session, skip: int = 0, limit: int = 100) -> List[Usuario]:
+    async def obtener_todos_usuarios(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Usuario]:
         """
         Obtiene todos los usuarios del sistema con paginación
         
@@ -25,16 +26,16 @@ class UsuarioService:
         Returns:
             Lista de usuarios (sin contraseña)
         """
-        return (
-            db.query(Usuario)
+        result = await db.execute(
+            select(Usuario)
             .order_by(Usuario.UserDs)  # Ordenar por nombre
             .offset(skip)
             .limit(limit)
-            .all()
         )
+        return result.scalars().all()
     
     @staticmethod
-    def contar_usuarios(db: Session) -> int:
+    async def contar_usuarios(db: AsyncSession) -> int:
         """
         Cuenta el total de usuarios en el sistema
         
@@ -44,4 +45,4 @@ class UsuarioService:
         Returns:
             Número total de usuarios
         """
-        return db.query(Usuario).count()
+        return (await db.execute(select(func.count()).select_from(Usuario))).scalar()
@@ -0,0 +1,146 @@
+"""
+Validadores HTTP para descargas de PDF: ETag fuerte, GET condicional y rangos de bytes.
+
+- ETag: el sha256 del contenido entre comillas (fuerte: mismo ETag => mismos bytes).
+- If-None-Match tiene precedencia sobre If-Modified-Since (RFC 9110 §13.2.2).
+- Range: un solo rango "bytes=a-b", "bytes=a-" o "bytes=-n"; rangos múltiples se
+  ignoran y se responde el archivo completo. If-Range con otro ETag también.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+
+# Los PDFs son por tenant y requieren API key: caché solo en el cliente, revalidando siempre
+CACHE_CONTROL_PDF = "private, no-cache"
+
+
+class RangoNoSatisfacibleError(Exception):
+    """El header Range no se puede satisfacer para el tamaño del recurso (responder 416)."""
+
+
+def etag_fuerte(sha256: Optional[str]) -> Optional[str]:
+    return f'"{sha256}"' if sha256 else None
+
+
+def fecha_http(fecha: Optional[datetime]) -> Optional[str]:
+    if fecha is None:
+        return None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return format_datetime(fecha.astimezone(timezone.utc), usegmt=True)
+
+
+def _etags(valor: str):
+    for parte in valor.split(","):
+        parte = parte.strip()
+        if parte.startswith("W/"):
+            parte = parte[2:]
+        if parte:
+            yield parte
+
+
+def no_modificado(headers: Mapping[str, str], etag: Optional[str], ultima_modificacion: Optional[datetime]) -> bool:
+    """True si el cliente ya tiene la versión actual (responder 304)."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # Comparación débil, como exige RFC 9110 para If-None-Match
+        return etag is not None and any(e == "*" or e == etag for e in _etags(if_none_match))
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and ultima_modificacion is not None:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if desde.tzinfo is None:
+            desde = desde.replace(tzinfo=timezone.utc)
+        if ultima_modificacion.tzinfo is None:
+            ultima_modificacion = ultima_modificacion.replace(tzinfo=timezone.utc)
+        # Last-Modified tiene resolución de segundos
+        return ultima_modificacion.replace(microsecond=0) <= desde
+    return False
+
+
+def rango_solicitado(headers: Mapping[str, str], tamano: int, etag: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Retorna (inicio, fin) inclusivo del rango pedido, o None para responder el archivo completo.
+
+    Raises:
+        RangoNoSatisfacibleError: si el rango es sintácticamente válido pero queda fuera del archivo.
+    """
+    valor = headers.get("range")
+    if not valor or tamano <= 0:
+        return None
+
+    if_range = headers.get("if-range")
+    # If-Range con fecha o ETag débil no se considera coincidencia fuerte
+    if if_range is not None and (etag is None or if_range.strip() != etag):
+        return None
+
+    unidad, _, especificacion = valor.partition("=")
+    if unidad.strip().lower() != "bytes" or "," in especificacion:
+        return None
+    inicio_txt, guion, fin_txt = especificacion.strip().partition("-")
+    if not guion:
+        return None
+    try:
+        if inicio_txt == "":
+            sufijo = int(fin_txt)
+            if sufijo <= 0:
+                raise RangoNoSatisfacibleError(valor)
+            return max(0, tamano - sufijo), tamano - 1
+        inicio = int(inicio_txt)
+        fin = int(fin_txt) if fin_txt else None
+    except ValueError:
+        return None
+    if inicio < 0 or (fin is not None and fin < inicio):
+        return None
+    if inicio >= tamano:
+        raise RangoNoSatisfacibleError(valor)
+    return inicio, tamano - 1 if fin is None else min(fin, tamano - 1)
+
+
+def headers_validadores(etag: Optional[str], ultima_modificacion: Optional[datetime]) -> dict:
+    """Headers comunes a 200, 206 y 304."""
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": CACHE_CONTROL_PDF}
+    if etag:
+        headers["ETag"] = etag
+    if ultima_modificacion is not None:
+        headers["Last-Modified"] = fecha_http(ultima_modificacion)
+    return headers
+
+
+@dataclass(frozen=True)
+class Descarga:
+    """Qué responder a un GET de PDF: status, ventana de bytes [inicio, inicio + largo) y headers."""
+    status_code: int
+    inicio: int
+    largo: int
+    headers: dict
+
+    @property
+    def sin_cuerpo(self) -> bool:
+        return self.status_code in (304, 416)
+
+
+def preparar_descarga(
+    headers: Mapping[str, str], tamano: int, sha256: Optional[str], ultima_modificacion: Optional[datetime]
+) -> Descarga:
+    """Resuelve 304 / 416 / 206 / 200 a partir de los headers del request y los metadatos del PDF."""
+    etag = etag_fuerte(sha256)
+    respuesta = headers_validadores(etag, ultima_modificacion)
+    if no_modificado(headers, etag, ultima_modificacion):
+        return Descarga(304, 0, 0, respuesta)
+    try:
+        rango = rango_solicitado(headers, tamano, etag)
+    except RangoNoSatisfacibleError:
+        respuesta["Content-Range"] = f"bytes */{tamano}"
+        return Descarga(416, 0, 0, respuesta)
+    if rango is None:
+        respuesta["Content-Length"] = str(tamano)
+        return Descarga(200, 0, tamano, respuesta)
+    inicio, fin = rango
+    respuesta["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+    respuesta["Content-Length"] = str(fin - inicio + 1)
+    return Descarga(206, inicio, fin - inicio + 1, respuesta)
@@ -0,0 +1,79 @@
+"""
+Paginación por keyset (cursor) para listados en orden descendente.
+
+En vez de OFFSET (MySQL lee y descarta todas las filas saltadas), cada página pide
+las filas que siguen a la última entregada según la clave de orden, completada con
+la PK para que sea única: (pre_fec, Loc_cod, pre_nro), (ocp_fec, Loc_cod, ocp_nro)...
+Así todas las páginas cuestan lo mismo.
+
+El cursor es opaco para el cliente: base64url de un JSON con el nombre del listado
+y los valores de la clave de la última fila.
+"""
+from datetime import date
+from typing import Any, Callable, List, Optional, Sequence
+import base64
+import binascii
+import json
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class CursorInvalidoError(ValueError):
+    """El cursor no se pudo decodificar o es de otro listado (responder 400)."""
+
+
+def _a_json(valor: Any) -> Any:
+    return {"d": valor.isoformat()} if isinstance(valor, date) else valor
+
+
+def _desde_json(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        return date.fromisoformat(valor["d"])
+    if isinstance(valor, (int, str)) and not isinstance(valor, bool):
+        return valor
+    raise CursorInvalidoError("Cursor inválido")
+
+
+def codificar_cursor(listado: str, valores: Sequence[Any]) -> str:
+    crudo = json.dumps({"l": listado, "v": [_a_json(v) for v in valores]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decodificar_cursor(cursor: str, listado: str, largo: int) -> List[Any]:
+    """
+    Valores de la clave guardados en el cursor.
+
+    Raises:
+        CursorInvalidoError: si está corrupto, es de otro listado o no tiene `largo` valores
+    """
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        datos = json.loads(crudo)
+        valores = [_desde_json(v) for v in datos["v"]]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise CursorInvalidoError("Cursor inválido")
+    if datos.get("l") != listado or len(valores) != largo:
+        raise CursorInvalidoError("Cursor inválido para este listado")
+    return valores
+
+
+def despues_de(columnas: Sequence[ColumnElement], valores: Sequence[Any]) -> ColumnElement:
+    """
+    Filas que siguen a `valores` en ORDER BY columnas DESC (columnas NOT NULL).
+
+    Se expande a mano (a < x OR (a = x AND (b < y OR ...))) en lugar de usar una
+    comparación de tuplas: MySQL no usa índices para (a, b) < (x, y).
+    """
+    condicion = columnas[-1] < valores[-1]
+    for columna, valor in zip(reversed(columnas[:-1]), reversed(valores[:-1])):
+        condicion = or_(columna < valor, and_(columna == valor, condicion))
+    # Redundante, pero permite un range scan sobre la primera columna del índice
+    return and_(columnas[0] <= valores[0], condicion)
+
+
+def siguiente_cursor(listado: str, filas: Sequence[Any], limite: int, clave: Callable[[Any], Sequence[Any]]) -> Optional[str]:
+    """Cursor de la página siguiente, o None si esta página no vino completa."""
+    if not filas or len(filas) < limite:
+        return None
+    return codificar_cursor(listado, clave(filas[-1]))
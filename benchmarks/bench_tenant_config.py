@@ -0,0 +1,81 @@
+"""
+Benchmark del overhead de middlewares por request sobre /api/v1/tenant/config.
+
+Compara la app completa (CORS + tenant + API key) contra la misma ruta montada
+sin middlewares, usando un registro de tenants precargado en memoria (no requiere BD).
+
+Uso:
+    SECRET_KEY=x python benchmarks/bench_tenant_config.py [n_requests]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.v1.router import api_router
+from app.core.config import get_settings
+from app.core.tenant_registry import tenant_registry, TenantSnapshot, TemaSnapshot
+from app.main import app
+
+DOMINIO = "bench.localhost"
+HEADERS = {"origin": f"https://{DOMINIO}"}
+PATH = f"{get_settings().API_V1_PREFIX}/tenant/config"
+
+# httpx registra cada request en INFO; silenciarlo para no medir logging
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def _precargar_registro() -> TenantSnapshot:
+    tenant = TenantSnapshot(
+        id=1, slug="bench", nombre="Bench", dominio=DOMINIO, logo_url=None,
+        tema=TemaSnapshot("bench", "#000000", "#000000", "#000000", "#000000", "#000000"),
+        conexion=None,
+    )
+    tenant_registry._por_dominio = {DOMINIO: tenant}
+    tenant_registry._cargado_en = time.monotonic()
+    tenant_registry._ttl = 10 ** 9
+    return tenant
+
+
+def _app_sin_middlewares(tenant: TenantSnapshot):
+    bare = FastAPI()
+    bare.include_router(api_router, prefix=get_settings().API_V1_PREFIX)
+
+    async def asgi(scope, receive, send):
+        scope.setdefault("state", {})["tenant"] = tenant
+        await bare(scope, receive, send)
+
+    return asgi
+
+
+async def _medir(asgi_app, n: int) -> float:
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url=f"http://{DOMINIO}") as client:
+        for _ in range(200):  # calentamiento
+            r = await client.get(PATH, headers=HEADERS)
+            assert r.status_code == 200, r.text
+        inicio = time.perf_counter()
+        for _ in range(n):
+            await client.get(PATH, headers=HEADERS)
+        return (time.perf_counter() - inicio) / n * 1e6
+
+
+async def main(n: int) -> None:
+    tenant = _precargar_registro()
+    base = await _medir(_app_sin_middlewares(tenant), n)
+    completo = await _medir(app, n)
+    print(f"requests:            {n}")
+    print(f"sin middlewares:     {base:8.1f} us/request")
+    print(f"app completa:        {completo:8.1f} us/request")
+    print(f"overhead middlewares:{completo - base:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
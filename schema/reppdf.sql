@@ -0,0 +1,89 @@
+-- REPPDF (lexascl_reppdf): objetos usados por la API sobre pdf001.
+--
+-- Aplicar con el cliente mysql (usa DELIMITER):
+--   mysql -h $REPPDF_HOST -u $REPPDF_USER -p lexascl_reppdf < schema/reppdf.sql
+
+-- Lecturas puntuales de pdf001 (get-cliente, DELETE al aprobar): un seek por documento.
+CREATE INDEX `idx_pdf001_emp_tipo_loc_nro`
+  ON `pdf001` (`PdfEmpCd`, `PdfTipo`, `PdfLocCod`, `PdfNumero`);
+
+-- ---------------------------------------------------------------------------
+-- pdf001_meta: tamaño, hash y fecha de cada PDF, sin leer páginas LOB.
+-- La consulta de estados (tienepdf) de los listados lee solo esta tabla:
+--   WHERE PdfEmpCd = ? AND PdfTipo = ? AND (PdfLocCod, PdfNumero) IN ((?, ?), ...)
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `pdf001_meta` (
+  `PdfEmpCd` int NOT NULL,
+  `PdfTipo` smallint NOT NULL,
+  `PdfLocCod` smallint NOT NULL,
+  `PdfNumero` bigint NOT NULL,
+  `PdfBytes` bigint NOT NULL DEFAULT 0,
+  `PdfSha256` char(64) DEFAULT NULL,
+  `PdfActualizado` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (`PdfEmpCd`, `PdfTipo`, `PdfLocCod`, `PdfNumero`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Triggers: el hash y el tamaño se calculan una vez por escritura, no por lectura.
+DROP TRIGGER IF EXISTS `trg_pdf001_meta_ai`;
+DROP TRIGGER IF EXISTS `trg_pdf001_meta_au`;
+DROP TRIGGER IF EXISTS `trg_pdf001_meta_ad`;
+
+DELIMITER $$
+
+CREATE TRIGGER `trg_pdf001_meta_ai` AFTER INSERT ON `pdf001` FOR EACH ROW
+BEGIN
+  INSERT INTO `pdf001_meta` (`PdfEmpCd`, `PdfTipo`, `PdfLocCod`, `PdfNumero`, `PdfBytes`, `PdfSha256`, `PdfActualizado`)
+  VALUES (
+    NEW.`PdfEmpCd`, NEW.`PdfTipo`, NEW.`PdfLocCod`, NEW.`PdfNumero`,
+    COALESCE(LENGTH(NEW.`PdfBlob`), 0),
+    IF(COALESCE(LENGTH(NEW.`PdfBlob`), 0) > 0, SHA2(NEW.`PdfBlob`, 256), NULL),
+    NOW(6)
+  )
+  ON DUPLICATE KEY UPDATE
+    `PdfBytes` = VALUES(`PdfBytes`),
+    `PdfSha256` = VALUES(`PdfSha256`),
+    `PdfActualizado` = VALUES(`PdfActualizado`);
+END$$
+
+CREATE TRIGGER `trg_pdf001_meta_au` AFTER UPDATE ON `pdf001` FOR EACH ROW
+BEGIN
+  IF NOT (OLD.`PdfEmpCd` <=> NEW.`PdfEmpCd` AND OLD.`PdfTipo` <=> NEW.`PdfTipo`
+          AND OLD.`PdfLocCod` <=> NEW.`PdfLocCod` AND OLD.`PdfNumero` <=> NEW.`PdfNumero`) THEN
+    DELETE FROM `pdf001_meta`
+    WHERE `PdfEmpCd` = OLD.`PdfEmpCd` AND `PdfTipo` = OLD.`PdfTipo`
+      AND `PdfLocCod` = OLD.`PdfLocCod` AND `PdfNumero` = OLD.`PdfNumero`;
+  END IF;
+  INSERT INTO `pdf001_meta` (`PdfEmpCd`, `PdfTipo`, `PdfLocCod`, `PdfNumero`, `PdfBytes`, `PdfSha256`, `PdfActualizado`)
+  VALUES (
+    NEW.`PdfEmpCd`, NEW.`PdfTipo`, NEW.`PdfLocCod`, NEW.`PdfNumero`,
+    COALESCE(LENGTH(NEW.`PdfBlob`), 0),
+    IF(COALESCE(LENGTH(NEW.`PdfBlob`), 0) > 0, SHA2(NEW.`PdfBlob`, 256), NULL),
+    NOW(6)
+  )
+  ON DUPLICATE KEY UPDATE
+    `PdfBytes` = VALUES(`PdfBytes`),
+    `PdfSha256` = VALUES(`PdfSha256`),
+    `PdfActualizado` = VALUES(`PdfActualizado`);
+END$$
+
+CREATE TRIGGER `trg_pdf001_meta_ad` AFTER DELETE ON `pdf001` FOR EACH ROW
+BEGIN
+  DELETE FROM `pdf001_meta`
+  WHERE `PdfEmpCd` = OLD.`PdfEmpCd` AND `PdfTipo` = OLD.`PdfTipo`
+    AND `PdfLocCod` = OLD.`PdfLocCod` AND `PdfNumero` = OLD.`PdfNumero`;
+END$$
+
+DELIMITER ;
+
+-- Backfill de las filas existentes (una sola vez; idempotente).
+-- En tablas grandes puede ejecutarse por empresa agregando WHERE PdfEmpCd = N.
+INSERT INTO `pdf001_meta` (`PdfEmpCd`, `PdfTipo`, `PdfLocCod`, `PdfNumero`, `PdfBytes`, `PdfSha256`, `PdfActualizado`)
+SELECT
+  `PdfEmpCd`, `PdfTipo`, `PdfLocCod`, `PdfNumero`,
+  COALESCE(LENGTH(`PdfBlob`), 0),
+  IF(COALESCE(LENGTH(`PdfBlob`), 0) > 0, SHA2(`PdfBlob`, 256), NULL),
+  NOW(6)
+FROM `pdf001`
+ON DUPLICATE KEY UPDATE
+  `PdfBytes` = VALUES(`PdfBytes`),
+  `PdfSha256` = VALUES(`PdfSha256`);
@@ -0,0 +1,53 @@
+"""
+Tests para la caché de tokens verificados y filas de usuario de get_current_user.
+"""
+import time
+from app.core.auth_cache import AuthCache
+from app.models.usuario import Usuario
+
+
+def _usuario(user_cd: str, nombre: str) -> Usuario:
+    return Usuario(
+        UserCd=user_cd, UserDs=nombre, UserLlave="x", UserCta=0, UserParam=0, UserMaes=0,
+        UserMovi=0, UserUti=0, UserCon=0, UserPerf=1, UserFolDte="", UserDte=0,
+        UserChPass="N", UserNameMail=nombre, UserMail="a@b.cl",
+    )
+
+
+def test_tokens_por_tenant_hasta_exp_y_lru():
+    """Un token verificado vale solo en su tenant, hasta su exp, y el LRU descarta el más viejo"""
+    cache = AuthCache(max_tokens_por_tenant=2, ttl_usuario=60, max_usuarios=10)
+    cache.guardar_token(1, "t1", "ana", time.time() + 60)
+    assert cache.usuario_de_token(1, "t1") == "ana"
+    assert cache.usuario_de_token(2, "t1") is None
+
+    cache.guardar_token(1, "vencido", "ana", time.time() - 1)
+    assert cache.usuario_de_token(1, "vencido") is None
+
+    cache.guardar_token(1, "t2", "beto", time.time() + 60)
+    cache.usuario_de_token(1, "t1")
+    cache.guardar_token(1, "t3", "carla", time.time() + 60)
+    assert cache.usuario_de_token(1, "t2") is None
+    assert cache.usuario_de_token(1, "t1") == "ana"
+
+    cache.invalidar_usuario(1, "ana")
+    assert cache.usuario_de_token(1, "t1") is None
+    assert cache.usuario_de_token(1, "t3") == "carla"
+
+
+def test_fila_usuario_con_ttl_e_invalidacion(monkeypatch):
+    """Cada lectura entrega un Usuario nuevo; vence con el TTL y se invalida por tenant"""
+    cache = AuthCache(max_tokens_por_tenant=10, ttl_usuario=60, max_usuarios=10)
+    cache.guardar_usuario(1, _usuario("ana", "Ana"))
+    primero, segundo = cache.usuario(1, "ana"), cache.usuario(1, "ana")
+    assert primero.UserDs == "Ana" and primero is not segundo
+    assert cache.usuario(2, "ana") is None
+
+    ahora = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: ahora + 61)
+    assert cache.usuario(1, "ana") is None
+    monkeypatch.undo()
+
+    cache.guardar_usuario(1, _usuario("ana", "Ana"))
+    cache.invalidar_tenant(1)
+    assert cache.usuario(1, "ana") is None
@@ -0,0 +1,49 @@
+"""
+Tests para los validadores HTTP de descargas de PDF (ETag, 304, rangos).
+"""
+from datetime import datetime, timezone
+from app.utils.http_cache import preparar_descarga
+
+SHA = "a" * 64
+ETAG = f'"{SHA}"'
+FECHA = datetime(2026, 3, 1, 12, 30, 15, 500000, tzinfo=timezone.utc)
+
+
+def test_respuesta_completa_con_validadores():
+    """Sin headers condicionales se responde 200 con ETag, Last-Modified y Accept-Ranges"""
+    descarga = preparar_descarga({}, 1000, SHA, FECHA)
+    assert descarga.status_code == 200
+    assert (descarga.inicio, descarga.largo) == (0, 1000)
+    assert descarga.headers["ETag"] == ETAG
+    assert descarga.headers["Last-Modified"] == "Sun, 01 Mar 2026 12:30:15 GMT"
+    assert descarga.headers["Accept-Ranges"] == "bytes"
+
+
+def test_if_none_match_responde_304():
+    """If-None-Match con el ETag actual (aunque venga como débil) responde 304"""
+    assert preparar_descarga({"if-none-match": f'"otro", W/{ETAG}'}, 1000, SHA, FECHA).status_code == 304
+    assert preparar_descarga({"if-none-match": '"otro"'}, 1000, SHA, FECHA).status_code == 200
+
+
+def test_if_modified_since_responde_304():
+    """If-Modified-Since igual a Last-Modified (resolución de segundos) responde 304"""
+    headers = {"if-modified-since": "Sun, 01 Mar 2026 12:30:15 GMT"}
+    assert preparar_descarga(headers, 1000, SHA, FECHA).status_code == 304
+
+
+def test_rangos():
+    """Rangos a-b, a- y sufijo -n responden 206 con Content-Range; fuera del archivo 416"""
+    descarga = preparar_descarga({"range": "bytes=100-199"}, 1000, SHA, FECHA)
+    assert descarga.status_code == 206
+    assert (descarga.inicio, descarga.largo) == (100, 100)
+    assert descarga.headers["Content-Range"] == "bytes 100-199/1000"
+
+    assert preparar_descarga({"range": "bytes=900-"}, 1000, SHA, FECHA).headers["Content-Range"] == "bytes 900-999/1000"
+    assert preparar_descarga({"range": "bytes=-10"}, 1000, SHA, FECHA).headers["Content-Range"] == "bytes 990-999/1000"
+    assert preparar_descarga({"range": "bytes=1000-"}, 1000, SHA, FECHA).status_code == 416
+
+
+def test_if_range_con_otro_etag_responde_completo():
+    """If-Range que no coincide con el ETag ignora el rango"""
+    headers = {"range": "bytes=0-9", "if-range": '"viejo"'}
+    assert preparar_descarga(headers, 1000, SHA, FECHA).status_code == 200
@@ -0,0 +1,40 @@
+"""
+Tests para la paginación por keyset (cursores opacos).
+"""
+from datetime import date
+import pytest
+from sqlalchemy.dialects import mysql
+from app.models.presupuesto import Presupuesto
+from app.utils.keyset import (
+    CursorInvalidoError, codificar_cursor, decodificar_cursor, despues_de, siguiente_cursor,
+)
+
+
+def test_cursor_ida_y_vuelta_y_rechazos():
+    """El cursor conserva fechas y enteros, y no sirve para otro listado ni si está corrupto"""
+    cursor = codificar_cursor("presupuestos_pendientes", (date(2025, 3, 1), 2, 1500))
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor, "presupuestos_pendientes", 3) == [date(2025, 3, 1), 2, 1500]
+    with pytest.raises(CursorInvalidoError):
+        decodificar_cursor(cursor, "ordenes_pendientes", 3)
+    with pytest.raises(CursorInvalidoError):
+        decodificar_cursor(cursor, "presupuestos_pendientes", 4)
+    with pytest.raises(CursorInvalidoError):
+        decodificar_cursor("no-es-un-cursor!", "presupuestos_pendientes", 3)
+
+
+def test_despues_de_y_siguiente_cursor():
+    """La condición expande la tupla (con un prefijo indexable) y solo hay cursor si la página vino completa"""
+    columnas = (Presupuesto.pre_fec, Presupuesto.Loc_cod, Presupuesto.pre_nro)
+    sql = str(despues_de(columnas, (date(2025, 3, 1), 2, 1500)).compile(
+        dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+    assert sql == (
+        "cot013.pre_fec <= '2025-03-01' AND (cot013.pre_fec < '2025-03-01' OR "
+        "cot013.pre_fec = '2025-03-01' AND (cot013.`Loc_cod` < 2 OR "
+        "cot013.`Loc_cod` = 2 AND cot013.pre_nro < 1500))"
+    )
+
+    filas = [(date(2025, 3, 2), 1, 10), (date(2025, 3, 1), 2, 1500)]
+    assert siguiente_cursor("l", filas, 3, lambda f: f) is None
+    assert decodificar_cursor(siguiente_cursor("l", filas, 2, lambda f: f), "l", 3) == list(filas[-1])
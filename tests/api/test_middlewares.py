@@ -0,0 +1,53 @@
+"""
+Tests para la cadena de middlewares (API key -> tenant -> CORS).
+Usan un registro de tenants precargado en memoria: no requieren base de datos.
+"""
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.tenant_registry import tenant_registry, TenantSnapshot, TemaSnapshot
+
+client = TestClient(app)
+
+TENANT = TenantSnapshot(
+    id=1, slug="demo", nombre="Demo", dominio="demo.localhost", logo_url=None,
+    tema=TemaSnapshot("demo", "#5EC8F2", "#45A29A", "#0F172A", "#1E293B", "#F8FAFC"),
+    conexion=None,
+)
+
+
+@pytest.fixture(autouse=True)
+def registro_en_memoria(monkeypatch):
+    monkeypatch.setattr(tenant_registry, "_por_dominio", {TENANT.dominio: TENANT})
+    monkeypatch.setattr(tenant_registry, "_cargado_en", time.monotonic())
+
+
+def test_preflight_origen_registrado():
+    """El preflight responde 204 con Allow-Origin para un dominio de tenant"""
+    response = client.options("/api/v1/tenant/config", headers={"origin": "https://demo.localhost"})
+    assert response.status_code == 204
+    assert response.headers["access-control-allow-origin"] == "https://demo.localhost"
+
+
+def test_preflight_origen_desconocido():
+    """El preflight no habilita orígenes que no son tenants"""
+    response = client.options("/api/v1/tenant/config", headers={"origin": "https://otro.com"})
+    assert response.status_code == 204
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_config_resuelve_tenant_y_cors():
+    """Una sola resolución alimenta request.state.tenant y los headers CORS"""
+    response = client.get("/api/v1/tenant/config", headers={"origin": "https://demo.localhost"})
+    assert response.status_code == 200
+    assert response.json()["slug"] == "demo"
+    assert response.headers["access-control-allow-origin"] == "https://demo.localhost"
+    assert response.headers["access-control-allow-credentials"] == "true"
+
+
+def test_documentos_pdf_sin_api_key():
+    """Los endpoints de documentos PDF exigen X-API-Key"""
+    response = client.get("/api/v1/documentos-pdf/get?tipo=1&numero=1")
+    assert response.status_code == 401
+    assert "api key" in response.json()["detail"].lower()
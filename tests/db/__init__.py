@@ -0,0 +1 @@
+# DB Tests Package
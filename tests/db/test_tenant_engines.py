@@ -0,0 +1,69 @@
+"""
+Tests para TenantEngineManager (pool de engines MySQL por tenant).
+Los engines se crean sin conectarse, por lo que no requieren base de datos.
+"""
+import pytest
+from app.db.tenant_session import TenantEngineManager, PoolAgotadoError
+
+CONN = ("mysql.local", 3306, "empresa", "usuario", "secreto")
+
+
+def test_reutiliza_sessionmaker_por_tenant():
+    """El mismo tenant obtiene siempre el mismo sessionmaker"""
+    manager = TenantEngineManager(max_conexiones=100, idle_seconds=600)
+    assert manager.session_factory(1, *CONN) is manager.session_factory(1, *CONN)
+
+
+def test_rotacion_de_credenciales_descarta_engine():
+    """Si cambia la contraseña se crea un engine nuevo y el anterior se libera"""
+    manager = TenantEngineManager(max_conexiones=100, idle_seconds=600)
+    original = manager.session_factory(1, *CONN)
+    rotado = manager.session_factory(1, *CONN[:4], "nuevo-secreto")
+    assert rotado is not original
+    assert manager.conexiones_reservadas == 15
+
+
+def test_presupuesto_desaloja_lru():
+    """Al superar el presupuesto se desaloja el engine inactivo menos usado"""
+    manager = TenantEngineManager(max_conexiones=30, idle_seconds=600)
+    manager.session_factory(1, *CONN)
+    manager.session_factory(2, *CONN)
+    manager.session_factory(1, *CONN)  # tenant 1 pasa a ser el más reciente
+    manager.session_factory(3, *CONN)
+    assert set(manager._entries) == {(1, "sync"), (3, "sync")}
+    assert manager.conexiones_reservadas == 30
+
+
+def test_pool_mayor_al_presupuesto():
+    """Un pool que no cabe en el presupuesto global se rechaza"""
+    manager = TenantEngineManager(max_conexiones=10, idle_seconds=600)
+    with pytest.raises(PoolAgotadoError):
+        manager.session_factory(1, *CONN, pool_size=5, max_overflow=10)
+
+
+def test_engine_async_cuenta_en_presupuesto():
+    """Los engines async (aiomysql) comparten el presupuesto con los síncronos"""
+    manager = TenantEngineManager(max_conexiones=30, idle_seconds=600)
+    manager.session_factory(1, *CONN)
+    manager.async_session_factory(1, *CONN)
+    assert manager.conexiones_reservadas == 30
+
+
+async def test_desalojo_async_cierra_con_await(monkeypatch):
+    """Un engine aiomysql desalojado se cierra con await en el event loop, y dispose_all lo espera"""
+    from sqlalchemy.ext.asyncio import AsyncEngine
+    cerrados = []
+
+    async def dispose(self, close=True):
+        cerrados.append(self)
+
+    monkeypatch.setattr(AsyncEngine, "dispose", dispose)
+    manager = TenantEngineManager(max_conexiones=15, idle_seconds=600)
+    manager.async_session_factory(1, *CONN)
+    primero = manager._entries[(1, "async")].engine
+    manager.async_session_factory(2, *CONN)  # desaloja el tenant 1: cierre programado
+    assert cerrados == [] and len(manager._cierres) == 1
+
+    await manager.dispose_all()
+    assert primero in cerrados and len(cerrados) == 2
+    assert manager._cierres == set() and manager.conexiones_reservadas == 0
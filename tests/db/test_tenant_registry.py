@@ -0,0 +1,33 @@
+"""
+Tests para el registro de tenants. La sesión de Postgres se reemplaza por un objeto
+que cuenta las lecturas: no requieren base de datos.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from app.core import tenant_registry as modulo
+from app.core.tenant_registry import TenantRegistry
+
+
+async def test_arranque_en_frio_carga_una_sola_vez(monkeypatch):
+    """Las requests que llegan antes de la primera carga comparten una única lectura"""
+    lecturas = []
+
+    class Sesion:
+        async def execute(self, consulta):
+            lecturas.append(consulta)
+            await asyncio.sleep(0.01)
+            return SimpleNamespace(unique=lambda: SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: [])))
+
+    @asynccontextmanager
+    async def sesion():
+        yield Sesion()
+
+    monkeypatch.setattr(modulo, "SessionPostgresAsync", sesion)
+    registro = TenantRegistry(ttl_seconds=60)
+    assert await asyncio.gather(*(registro.obtener("demo.local") for _ in range(10))) == [None] * 10
+    assert len(lecturas) == 1
+
+    await registro.recargar()
+    assert len(lecturas) == 2
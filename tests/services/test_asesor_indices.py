@@ -0,0 +1,97 @@
+"""
+Tests para el asesor de índices de /tenant/db-check. La sesión MySQL se reemplaza por
+un objeto que responde VERSION(), SHOW INDEX y EXPLAIN fijos: no requieren base de datos.
+"""
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import mysql
+
+from app.services.asesor_indices import AsesorIndices, problemas_plan, tiene_prefijo, version_mysql
+
+
+class _Resultado:
+    def __init__(self, filas=None, escalar=None):
+        self.filas = filas or []
+        self.escalar = escalar
+
+    def scalar(self):
+        return self.escalar
+
+    def mappings(self):
+        return self.filas
+
+
+class _SesionFalsa:
+    def __init__(self, version, indices, planes):
+        self.version = version
+        self.indices = indices  # tabla -> filas de SHOW INDEX
+        self.planes = planes  # tabla principal -> filas de EXPLAIN
+        self.explicadas = []
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=mysql.dialect())
+
+    def execute(self, sentencia):
+        sql = str(sentencia)
+        if "VERSION()" in sql:
+            return _Resultado(escalar=self.version)
+        return _Resultado(self.indices.get(sql.split("`")[1], []))
+
+    def connection(self):
+        return SimpleNamespace(exec_driver_sql=self._explain)
+
+    def _explain(self, sql):
+        self.explicadas.append(sql)
+        tabla = "cot013" if "FROM cot013" in sql else "adq004"
+        return _Resultado(self.planes[tabla])
+
+
+def _plan(tabla, tipo, extra="", key=None):
+    return [{"table": tabla, "type": tipo, "key": key, "rows": 50000, "Extra": extra}]
+
+
+def test_problemas_y_prefijos():
+    """Full scan y filesort se marcan solo en la tabla principal; el prefijo ignora mayúsculas"""
+    filas = _plan("adq004", "ALL", "Using where; Using filesort") + _plan("proveea", "ALL")
+    assert problemas_plan(filas, "adq004") == ["Full table scan", "Using filesort"]
+    indices = {"PRIMARY": ["Loc_cod", "ocp_nro"], "mcn": ["ocp_a1_ap", "lower(`ocp_A1_Usu`)", "ocp_A1_Dt"]}
+    assert tiene_prefijo(indices, ["ocp_A1_Ap", "(lower(`ocp_A1_Usu`))"]) == "mcn"
+    assert tiene_prefijo(indices, ["ocp_A1_Ap", "ocp_A1_Dt"]) is None
+    assert version_mysql("10.6.12-MariaDB-log") == ((10, 6, 12), True)
+
+
+def test_diagnostico_sugiere_ddl_segun_version():
+    """Full scans con filesort generan CREATE INDEX; el funcional solo en MySQL 8.0.13+"""
+    planes = {
+        "cot013": _plan("cot013", "ALL", "Using where; Using filesort"),
+        "adq004": _plan("adq004", "ALL", "Using where; Using filesort"),
+    }
+    db = _SesionFalsa("8.0.35", {}, planes)
+    diagnosticos, ddl = AsesorIndices.diagnosticar(db, ["cot013", "adq004", "clientea", "proveea"])
+
+    assert len(db.explicadas) == 5 and all(sql.startswith("EXPLAIN SELECT") for sql in db.explicadas)
+    assert not any(d.ok for d in diagnosticos)
+    usuario = next(d for d in diagnosticos if d.consulta == "ordenes_aprobadas_usuario")
+    assert "lower(ocp_A1_Usu) impide usar un índice sobre ocp_A1_Usu" in usuario.problemas
+    assert usuario.indice_sugerido == (
+        "CREATE INDEX `mcn_adq004_aprobadas_usuario` ON `adq004` "
+        "(`ocp_A1_Ap`, (lower(`ocp_A1_Usu`)), `ocp_A1_Dt`, `ocp_A1_Hr`, `Loc_cod`, `ocp_nro`);"
+    )
+    assert len(ddl) == 5
+
+    # MySQL 5.7: la alternativa por fecha, una sola vez; un índice existente no se repite
+    indices = {"cot013": [{"Key_name": "mcn_cot013_pendientes", "Seq_in_index": i + 1, "Column_name": c}
+                          for i, c in enumerate(["Pre_vbLib", "pre_vbgg", "pre_fec", "Loc_cod", "pre_nro", "pre_est"])]}
+    _, ddl = AsesorIndices.diagnosticar(_SesionFalsa("5.7.44-log", indices, planes), ["cot013", "adq004"])
+    assert not any("lower" in sentencia or "mcn_cot013_pendientes" in sentencia for sentencia in ddl)
+    assert sum("mcn_adq004_aprobadas`" in sentencia for sentencia in ddl) == 1
+
+
+def test_planes_sanos_no_sugieren_nada():
+    planes = {
+        "cot013": _plan("cot013", "ref", "Using where", key="mcn_cot013_pendientes"),
+        "adq004": _plan("adq004", "range", "Using index condition", key="mcn_adq004_pendientes"),
+    }
+    diagnosticos, ddl = AsesorIndices.diagnosticar(_SesionFalsa("8.0.35", {}, planes), ["cot013"])
+    assert [d.consulta for d in diagnosticos] == ["presupuestos_pendientes", "presupuestos_aprobados"]
+    assert all(d.ok and d.problemas == [] for d in diagnosticos) and ddl == []
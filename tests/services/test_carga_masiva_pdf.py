@@ -0,0 +1,72 @@
+"""
+Tests para la carga masiva de PDFs (validación, duplicados y lotes).
+DocumentoPdfService.upsert_lote se reemplaza: no requieren base de datos.
+"""
+import io
+import zipfile
+from app.services import carga_masiva_pdf
+from app.services.carga_masiva_pdf import ArchivoRecibido, CargaMasivaPdfService, archivos_zip
+from app.services.documento_pdf_service import ResultadoUpsert
+
+PDF = b"%PDF-1.7 contenido"
+
+
+class SesionFalsa:
+    async def rollback(self):
+        pass
+
+
+def _zip(miembros: dict) -> zipfile.ZipFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nombre, contenido in miembros.items():
+            zf.writestr(nombre, contenido)
+    buffer.seek(0)
+    return zipfile.ZipFile(buffer)
+
+
+async def test_carga_zip_por_lotes_con_estados(monkeypatch):
+    """Valida nombres y firma, descarta duplicados y escribe en lotes del tamaño pedido"""
+    lotes = []
+
+    async def upsert_lote(db, tenant_id, items):
+        lotes.append([(i.tipo, i.numero) for i in items])
+        return {(i.tipo, i.numero): ResultadoUpsert(i.numero, i.numero % 2 == 0, "x", i.tamano) for i in items}
+
+    monkeypatch.setattr(carga_masiva_pdf.DocumentoPdfService, "upsert_lote", upsert_lote)
+    zf = _zip({
+        "lote/1_10.pdf": PDF,
+        "1_11.pdf": PDF,
+        "2_12.pdf": PDF,
+        "1_10.pdf": PDF + b"v2",
+        "3_1.pdf": PDF,
+        "notas.txt": b"hola",
+        "1_13.pdf": b"no es pdf",
+    })
+    resultado = await CargaMasivaPdfService.cargar(SesionFalsa(), 7, archivos_zip(zf), tamano_lote=2, max_bytes=1024)
+
+    estados = {r.nombre: r.estado for r in resultado.items}
+    assert estados == {
+        "lote/1_10.pdf": "omitido",
+        "1_11.pdf": "actualizado",
+        "2_12.pdf": "creado",
+        "1_10.pdf": "creado",
+        "3_1.pdf": "error",
+        "notas.txt": "error",
+        "1_13.pdf": "error",
+    }
+    assert lotes == [[(1, 11), (2, 12)], [(1, 10)]]
+    assert (resultado.creados, resultado.actualizados, resultado.omitidos, resultado.errores) == (2, 1, 1, 3)
+
+
+async def test_lote_fallido_se_reintenta_de_a_uno(monkeypatch):
+    """Un archivo que falla al escribirse no arrastra a los demás del lote"""
+    async def upsert_lote(db, tenant_id, items):
+        if any(i.numero == 2 for i in items):
+            raise ValueError("tamaño inesperado")
+        return {(i.tipo, i.numero): ResultadoUpsert(i.numero, True, "x", i.tamano) for i in items}
+
+    monkeypatch.setattr(carga_masiva_pdf.DocumentoPdfService, "upsert_lote", upsert_lote)
+    archivos = [ArchivoRecibido(f"1_{n}.pdf", len(PDF), lambda: io.BytesIO(PDF)) for n in (1, 2, 3)]
+    resultado = await CargaMasivaPdfService.cargar(SesionFalsa(), 7, archivos, tamano_lote=10, max_bytes=1024)
+    assert [r.estado for r in resultado.items] == ["creado", "error", "creado"]
@@ -0,0 +1,77 @@
+"""
+Tests para el zip de PDFs armado al vuelo.
+REPPDF y PostgreSQL se reemplazan por funciones locales: no requieren base de datos.
+"""
+import io
+import zipfile
+from types import SimpleNamespace
+from app.services import descarga_zip_pdf
+from app.services.descarga_zip_pdf import DescargaZipPdfService, EntradaZip, zip_en_flujo
+from app.services.reppdf_client import PdfMeta, ReppdfNoDisponibleError
+
+
+def _entrada(nombre: str, contenido: bytes, tamano_chunk: int = 100) -> EntradaZip:
+    async def chunks():
+        for i in range(0, len(contenido), tamano_chunk):
+            yield contenido[i:i + tamano_chunk]
+    return EntradaZip(nombre, len(contenido), None, chunks)
+
+
+class SesionFalsa:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def _leer_zip(stream) -> zipfile.ZipFile:
+    partes = [p async for p in stream]
+    return zipfile.ZipFile(io.BytesIO(b"".join(partes))), partes
+
+
+async def test_zip_en_flujo_valido_y_por_partes():
+    """El zip se entrega a medida que se escribe y es legible por zipfile"""
+    a, b = b"%PDF-a" * 100, b"%PDF-b" * 50
+    zip_file, partes = await _leer_zip(zip_en_flujo(_aiter([_entrada("a.pdf", a), _entrada("b.pdf", b)])))
+    assert len(partes) > 5
+    assert max(len(p) for p in partes) < len(a)
+    assert zip_file.testzip() is None
+    assert zip_file.read("a.pdf") == a
+    assert zip_file.read("b.pdf") == b
+
+
+async def test_zip_usa_reppdf_luego_documentos_pdf(monkeypatch):
+    """Lo que no está en pdf001 se busca en documentos_pdf; lo demás va a faltantes.txt"""
+    async def metadatos_reppdf(tenant_id, tipo, items):
+        if tipo == 2:
+            raise ReppdfNoDisponibleError("circuito abierto")
+        return {(1, 10): PdfMeta(tamano=4, sha256=None, actualizado=None)}
+
+    async def iterar_reppdf(tenant_id, tipo, loc_cod, numero, inicio, largo):
+        yield b"R" * largo
+
+    async def metadatos_locales(db, tenant_id, claves):
+        assert claves == [(1, 11), (2, 30)]
+        return {(1, 11): SimpleNamespace(id=5, sha256="abc", tamano=3, fecha_actualizacion=None)}
+
+    async def iterar_local(db, sha256, inicio, largo):
+        yield b"L" * largo
+
+    monkeypatch.setattr(descarga_zip_pdf, "SessionPostgresAsync", SesionFalsa)
+    monkeypatch.setattr(descarga_zip_pdf.reppdf_client, "metadatos_lote", metadatos_reppdf)
+    monkeypatch.setattr(descarga_zip_pdf.reppdf_client, "iterar_pdf", iterar_reppdf)
+    monkeypatch.setattr(descarga_zip_pdf.DocumentoPdfService, "metadatos_lote", metadatos_locales)
+    monkeypatch.setattr(descarga_zip_pdf.DocumentoPdfService, "iterar_pdf", iterar_local)
+
+    claves = [(1, 1, 10), (1, 1, 11), (2, 3, 30), (1, 1, 10)]
+    zip_file, _ = await _leer_zip(DescargaZipPdfService.generar_zip(7, claves, tamano_lote=10))
+    assert zip_file.namelist() == ["presupuesto_1_10.pdf", "presupuesto_1_11.pdf", "faltantes.txt"]
+    assert zip_file.read("presupuesto_1_10.pdf") == b"RRRR"
+    assert zip_file.read("presupuesto_1_11.pdf") == b"LLL"
+    assert zip_file.read("faltantes.txt") == b"orden_compra_3_30.pdf: REPPDF no disponible\n"
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
@@ -0,0 +1,76 @@
+"""
+Tests para el almacenamiento de PDFs en pdf_blobs (COPY BINARY, zstd y lectura por rangos).
+Sin base de datos: la lectura de ventanas se reemplaza por una función local.
+"""
+import io
+import os
+import struct
+from contextlib import ExitStack
+import zstandard
+from app.services import documento_pdf_service
+from app.services.documento_pdf_service import (
+    COMPRESION_NINGUNA, COMPRESION_ZSTD, BlobPreparado, DocumentoPdfService, ItemCarga,
+    copy_binario_blobs, hash_item, preparar_blob,
+)
+
+# Contenido compresible (texto repetido) y no compresible (aleatorio)
+PDF_TEXTO = b"%PDF-1.7 " + b"BT /F1 12 Tf (linea de presupuesto) Tj ET\n" * 2000
+PDF_BINARIO = b"%PDF-1.7 " + os.urandom(20000)
+
+
+def _item(contenido: bytes) -> ItemCarga:
+    return ItemCarga("1_10.pdf", 1, 10, len(contenido), lambda: io.BytesIO(contenido))
+
+
+async def test_copy_binario_blobs_filas():
+    """Cada blob es una fila (sha256, compresion, tamano, tamano_almacenado, contenido)"""
+    blob = BlobPreparado("ab" * 32, COMPRESION_NINGUNA, 3, 3, lambda: io.BytesIO(b"abc"))
+    stream = b"".join([c async for c in copy_binario_blobs([blob])])
+    cuerpo = stream[19:]
+    assert struct.unpack("!hi", cuerpo[:6]) == (5, 64)
+    assert cuerpo[6:70] == b"ab" * 32
+    assert cuerpo[70:78] == struct.pack("!i", 4) + b"none"
+    assert struct.unpack("!iqiqi", cuerpo[78:106]) == (8, 3, 8, 3, 3)
+    assert cuerpo[106:] == b"abc" + struct.pack("!h", -1)
+
+
+def test_preparar_blob_comprime_solo_si_conviene():
+    """zstd solo cuando ahorra espacio; un PDF ya comprimido se guarda tal cual"""
+    with ExitStack() as pila:
+        texto = preparar_blob(_item(PDF_TEXTO), hash_item(_item(PDF_TEXTO)), pila)
+        assert texto.compresion == COMPRESION_ZSTD
+        assert texto.tamano_almacenado < len(PDF_TEXTO) // 10
+        assert zstandard.ZstdDecompressor().decompress(texto.abrir().read()) == PDF_TEXTO
+
+        binario = preparar_blob(_item(PDF_BINARIO), hash_item(_item(PDF_BINARIO)), pila)
+        assert binario.compresion == COMPRESION_NINGUNA
+        assert binario.abrir().read() == PDF_BINARIO
+
+
+def test_preparar_blob_grande_no_se_comprime(monkeypatch):
+    """Sobre COMPRESION_MAX_BYTES se guarda el original, para leer rangos con substr"""
+    monkeypatch.setattr(documento_pdf_service, "COMPRESION_MAX_BYTES", len(PDF_TEXTO) - 1)
+    with ExitStack() as pila:
+        blob = preparar_blob(_item(PDF_TEXTO), hash_item(_item(PDF_TEXTO)), pila)
+        assert (blob.compresion, blob.tamano_almacenado) == (COMPRESION_NINGUNA, len(PDF_TEXTO))
+
+
+async def test_iterar_pdf_zstd_por_rango(monkeypatch):
+    """Un rango de un blob zstd se obtiene descomprimiendo en flujo"""
+    comprimido = zstandard.ZstdCompressor().compress(PDF_TEXTO)
+
+    class Resultado:
+        def one(self):
+            return COMPRESION_ZSTD, len(comprimido)
+
+    class Sesion:
+        async def execute(self, consulta):
+            return Resultado()
+
+    async def ventanas(db, sha256, inicio, largo):
+        for i in range(inicio, inicio + largo, 1000):
+            yield comprimido[i:min(i + 1000, inicio + largo)]
+
+    monkeypatch.setattr(documento_pdf_service.DocumentoPdfService, "_ventanas", staticmethod(ventanas))
+    chunks = [c async for c in DocumentoPdfService.iterar_pdf(Sesion(), "x", 5000, 30000)]
+    assert b"".join(chunks) == PDF_TEXTO[5000:35000]
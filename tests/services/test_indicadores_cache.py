@@ -0,0 +1,60 @@
+"""
+Tests para los indicadores agregados y su caché por tenant. La sesión se reemplaza
+por un objeto que devuelve filas fijas: no requieren base de datos.
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.services.indicadores_cache import INDICADORES_PRESUPUESTOS, IndicadoresCache
+from app.services import presupuesto_service as modulo
+from app.services.presupuesto_service import PresupuestoService
+
+
+class _SesionFalsa:
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = []
+
+    async def execute(self, consulta):
+        self.consultas.append(str(consulta))
+        return SimpleNamespace(all=lambda: self.filas)
+
+
+def _fila(loc_cod, pendientes, aprobados, monto_pendientes, monto_aprobados):
+    return SimpleNamespace(
+        Loc_cod=loc_cod, Loc_des=f"Local {loc_cod}", pendientes=Decimal(pendientes),
+        aprobados=Decimal(aprobados), monto_pendientes=Decimal(monto_pendientes),
+        monto_aprobados=Decimal(monto_aprobados),
+    )
+
+
+async def test_indicadores_una_query_con_totales_y_cache(monkeypatch):
+    """Una sola query agregada por local; la segunda llamada sale de la caché"""
+    monkeypatch.setattr(modulo, "indicadores_cache", IndicadoresCache(ttl=60))
+    db = _SesionFalsa([_fila(1, 2, 5, 300, 900), _fila(2, 1, 0, 50, 0)])
+
+    indicadores = await PresupuestoService.obtener_indicadores(db, tenant_id=7)
+    assert (indicadores.pendientes, indicadores.aprobados) == (3, 5)
+    assert (indicadores.monto_pendientes, indicadores.monto_aprobados) == (350, 900)
+    assert [local.Loc_cod for local in indicadores.por_local] == [1, 2]
+    assert len(db.consultas) == 1 and "CASE WHEN" in db.consultas[0]
+
+    assert await PresupuestoService.obtener_indicadores(db, tenant_id=7) is indicadores
+    assert len(db.consultas) == 1
+
+
+def test_invalidar_descarta_y_no_guarda_calculos_previos():
+    """Un cálculo que empezó antes de invalidar no queda en la caché"""
+    cache = IndicadoresCache(ttl=60)
+    cache.guardar(1, INDICADORES_PRESUPUESTOS, "viejo", cache.generacion(1))
+    cache.guardar(2, INDICADORES_PRESUPUESTOS, "otro tenant", cache.generacion(2))
+
+    generacion = cache.generacion(1)
+    cache.invalidar(1)
+    assert cache.obtener(1, INDICADORES_PRESUPUESTOS) is None
+    assert cache.obtener(2, INDICADORES_PRESUPUESTOS) == "otro tenant"
+
+    cache.guardar(1, INDICADORES_PRESUPUESTOS, "en curso", generacion)
+    assert cache.obtener(1, INDICADORES_PRESUPUESTOS) is None
+    cache.guardar(1, INDICADORES_PRESUPUESTOS, "nuevo", cache.generacion(1))
+    assert cache.obtener(1, INDICADORES_PRESUPUESTOS) == "nuevo"
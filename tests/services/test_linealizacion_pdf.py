@@ -0,0 +1,78 @@
+"""
+Tests para la linealización de PDFs en segundo plano.
+"""
+import shutil
+from contextlib import ExitStack, asynccontextmanager
+import pytest
+from app.services import linealizacion_pdf as modulo
+from app.services.linealizacion_pdf import (
+    ESTADO_LINEALIZADO, ESTADO_YA_LINEALIZADO, LinealizadorPdf, es_linealizado,
+)
+
+PDF_MINIMO = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 10 10]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+def test_detecta_linealizado_por_cabecera():
+    """El diccionario /Linearized solo cuenta si está al inicio del archivo"""
+    assert es_linealizado(b"%PDF-1.7\n1 0 obj <</Linearized 1/L 1234>>")
+    assert not es_linealizado(PDF_MINIMO)
+    assert not es_linealizado(b"%PDF-1.7\n" + b" " * 2000 + b"/Linearized")
+
+
+@pytest.mark.skipif(shutil.which("qpdf") is None, reason="qpdf no instalado")
+async def test_qpdf_linealiza_y_no_repite(tmp_path):
+    """qpdf genera un PDF linealizado; uno ya linealizado no se vuelve a procesar"""
+    linealizador = LinealizadorPdf(habilitado=True, qpdf="qpdf", procesos=1, min_bytes=0, timeout=30)
+    assert linealizador._disponible()
+    original = tmp_path / "original.pdf"
+    original.write_bytes(PDF_MINIMO)
+
+    estado, item, _ = await linealizador._ejecutar_qpdf("abc", str(original), str(tmp_path))
+    assert estado == ESTADO_LINEALIZADO
+    with item.abrir() as archivo:
+        contenido = archivo.read()
+    assert es_linealizado(contenido)
+
+    original.write_bytes(contenido)
+    estado, item, _ = await linealizador._ejecutar_qpdf("def", str(original), str(tmp_path / "otro"))
+    assert (estado, item) == (ESTADO_YA_LINEALIZADO, None)
+
+
+async def test_registro_ya_hecho_por_otro_worker_no_guarda_blob(monkeypatch):
+    """Si el original ya tiene fila en pdf_blobs_linealizados no se guarda un blob huérfano"""
+    sentencias = []
+
+    class Conexion:
+        @asynccontextmanager
+        async def transaction(self):
+            yield
+
+        async def execute(self, sql, *args):
+            sentencias.append(sql)
+
+        async def fetchval(self, sql, *args):
+            sentencias.append(sql)
+            return 1
+
+    @asynccontextmanager
+    async def sesion():
+        yield None
+
+    async def conexion(pg):
+        return Conexion()
+
+    async def guardar_blobs(*args):
+        raise AssertionError("no debe guardar el blob")
+
+    monkeypatch.setattr(modulo, "SessionPostgresAsync", sesion)
+    monkeypatch.setattr(modulo, "conexion_asyncpg", conexion)
+    monkeypatch.setattr(modulo.DocumentoPdfService, "guardar_blobs", guardar_blobs)
+    with ExitStack() as pila:
+        await LinealizadorPdf._registrar("abc", ESTADO_LINEALIZADO, object(), "def", None, pila)
+    assert "pg_advisory_xact_lock" in sentencias[1]
+    assert not any(s.startswith("INSERT") for s in sentencias)
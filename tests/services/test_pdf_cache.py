@@ -0,0 +1,101 @@
+"""
+Tests para la caché de PDFs en disco (direccionada por contenido, LRU por tamaño).
+"""
+import asyncio
+import hashlib
+import os
+import time
+import pytest
+from app.services import pdf_cache as modulo
+from app.services.pdf_cache import PdfDiskCache
+
+DOC = (1, 1, 10, 500)
+
+
+def _sha(contenido: bytes) -> str:
+    return hashlib.sha256(contenido).hexdigest()
+
+
+async def _chunks(contenido: bytes, tamano: int = 4):
+    for i in range(0, len(contenido), tamano):
+        yield contenido[i:i + tamano]
+
+
+async def _guardar(cache, clave, contenido):
+    return b"".join([c async for c in cache.guardar_mientras_transmite(clave, _sha(contenido), _chunks(contenido))])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PdfDiskCache(str(tmp_path), max_bytes=20, tamano_chunk=4)
+
+
+async def test_miss_se_guarda_y_luego_es_hit(cache):
+    """La primera transmisión llena la caché; la siguiente lectura es local"""
+    contenido = b"%PDF-1.7 hola"
+    assert await cache.obtener(DOC, _sha(contenido)) is None
+    assert await _guardar(cache, DOC, contenido) == contenido
+    ruta = await cache.obtener(DOC, _sha(contenido))
+    assert ruta is not None
+    assert b"".join([c async for c in cache.iterar(ruta, 5, 3)]) == contenido[5:8]
+
+
+async def test_contenido_nuevo_no_usa_version_vieja(cache):
+    """Si cambia el hash en pdf001_meta la entrada anterior no se sirve"""
+    await _guardar(cache, DOC, b"version 1")
+    assert await cache.obtener(DOC, _sha(b"version 2")) is None
+
+
+async def test_hash_distinto_no_se_publica(cache):
+    """Una transmisión que no coincide con el hash esperado no entra a la caché"""
+    sha = _sha(b"esperado")
+    assert b"".join([c async for c in cache.guardar_mientras_transmite(DOC, sha, _chunks(b"otro"))]) == b"otro"
+    assert await cache.obtener(DOC, sha) is None
+    assert not [f for f in os.listdir(cache.directorio) if f.endswith(".tmp")]
+
+
+async def test_invalidar_y_lru(cache):
+    """invalidar_documento borra el archivo; al superar el presupuesto se desaloja el menos usado"""
+    await _guardar(cache, DOC, b"a" * 8)
+    cache.invalidar_documento(1, 1, 500)
+    assert await cache.obtener(DOC, _sha(b"a" * 8)) is None
+
+    otro = (1, 1, 10, 501)
+    await _guardar(cache, DOC, b"b" * 12)
+    await _guardar(cache, otro, b"c" * 12)
+    assert cache.bytes_usados == 12
+    assert await cache.obtener(DOC, _sha(b"b" * 12)) is None
+    assert await cache.obtener(otro, _sha(b"c" * 12)) is not None
+
+
+async def test_materializar_para_x_accel_redirect(cache):
+    """El PDF queda completo en la caché, legible por otro usuario, con ruta relativa estable"""
+    contenido = b"%PDF-1.7 nginx"
+    sha = _sha(contenido)
+    ruta = await cache.materializar(DOC, sha, _chunks(contenido))
+    assert ruta == await cache.obtener(DOC, sha)
+    assert cache.ruta_relativa(ruta) == f"{sha[:2]}/{sha}.pdf"
+    assert os.stat(ruta).st_mode & 0o777 == 0o644
+    assert await cache.materializar(DOC, _sha(b"otro"), _chunks(contenido)) is None
+
+
+async def test_borrado_diferido_y_temporales_huerfanos(cache, monkeypatch):
+    """Un archivo recién entregado sobrevive a la invalidación durante la gracia; _cargar limpia .tmp viejos"""
+    monkeypatch.setattr(modulo, "PDF_CACHE_GRACIA", 0.05)
+    contenido = b"%PDF-1.7 en uso"
+    await _guardar(cache, DOC, contenido)
+    ruta = await cache.obtener(DOC, _sha(contenido))
+    cache.invalidar_documento(1, 1, 500)
+    await asyncio.sleep(0)
+    assert os.path.exists(ruta)
+    await asyncio.gather(*cache._borrados)
+    assert not os.path.exists(ruta)
+
+    viejo, reciente = (os.path.join(cache.directorio, n) for n in ("viejo.tmp", "reciente.tmp"))
+    for temporal in (viejo, reciente):
+        open(temporal, "wb").close()
+    hace_dos_horas = time.time() - 7200
+    os.utime(viejo, (hace_dos_horas, hace_dos_horas))
+    otra = PdfDiskCache(cache.directorio, max_bytes=20)
+    await otra.obtener(DOC, _sha(contenido))
+    assert not os.path.exists(viejo) and os.path.exists(reciente)
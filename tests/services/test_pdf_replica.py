@@ -0,0 +1,77 @@
+"""
+Tests para la réplica local de PDFs de REPPDF.
+pdf_replicas y REPPDF se reemplazan por funciones locales: no requieren base de datos.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from app.services.pdf_replica import PdfReplica
+from app.services import pdf_replica as modulo
+from app.services.reppdf_client import PdfMeta, ReppdfNoDisponibleError
+
+
+def _fila(tamano: int, antiguedad: int, blob_sha256=None, sha256="abc"):
+    return SimpleNamespace(
+        tamano=tamano, sha256=sha256, actualizado=None, blob_sha256=blob_sha256,
+        verificado=datetime.now(timezone.utc) - timedelta(seconds=antiguedad),
+    )
+
+
+async def test_estados_desde_replica_y_reppdf(monkeypatch):
+    """Las filas frescas no van a REPPDF; las vencidas y faltantes sí, y se registran"""
+    replica = PdfReplica(habilitada=True, ttl=60, copias_simultaneas=1)
+    registrados = {}
+
+    async def leer(tenant_id, tipo, lote):
+        return {(1, 10): _fila(5, antiguedad=10), (1, 11): _fila(5, antiguedad=600)}
+
+    async def metadatos_lote(tenant_id, tipo, lote):
+        assert lote == [(1, 11), (1, 12), (1, 13)]
+        return {(1, 11): PdfMeta(tamano=0, sha256=None, actualizado=None),
+                (1, 12): PdfMeta(tamano=7, sha256="def", actualizado=None)}
+
+    async def registrar(tenant_id, tipo, metas, ausentes):
+        registrados.update(metas=metas, ausentes=ausentes)
+
+    monkeypatch.setattr(replica, "_leer", leer)
+    monkeypatch.setattr(replica, "_registrar", registrar)
+    monkeypatch.setattr(modulo.reppdf_client, "metadatos_lote", metadatos_lote)
+
+    estados = await replica._estados_lote(7, 1, [(1, 10), (1, 11), (1, 12), (1, 13)])
+    assert estados == {(1, 10): 1, (1, 11): 2, (1, 12): 1, (1, 13): 0}
+    assert set(registrados["metas"]) == {(1, 11), (1, 12)}
+    assert registrados["ausentes"] == [(1, 13)]
+
+
+async def test_sin_reppdf_usa_replica_vencida(monkeypatch):
+    """Con REPPDF caído se sirve la réplica aunque esté vencida, y el blob solo si está al día"""
+    replica = PdfReplica(habilitada=True, ttl=60, copias_simultaneas=1)
+
+    async def leer(tenant_id, tipo, lote):
+        return {(1, 10): _fila(5, antiguedad=600, blob_sha256="abc")}
+
+    async def caido(*args):
+        raise ReppdfNoDisponibleError("circuito abierto")
+
+    monkeypatch.setattr(replica, "_leer", leer)
+    monkeypatch.setattr(modulo.reppdf_client, "metadatos_lote", caido)
+    monkeypatch.setattr(modulo.reppdf_client, "obtener_metadatos", caido)
+
+    assert await replica._estados_lote(7, 1, [(1, 10), (1, 11)]) == {(1, 10): 1, (1, 11): None}
+    resuelto = await replica.resolver(7, 1, 1, 10)
+    assert resuelto.meta.tamano == 5
+    assert resuelto.blob_sha256 == "abc"
+
+
+async def test_replica_caida_consulta_reppdf(monkeypatch):
+    """Un error de conexión o timeout de la réplica no rompe el listado: se consulta REPPDF"""
+    replica = PdfReplica(habilitada=True, ttl=60, copias_simultaneas=1)
+
+    async def sin_conexion(tenant_id, tipo, lote):
+        raise ConnectionRefusedError("postgres caído")
+
+    async def estados_pdf(tenant_id, tipo, lote):
+        return {clave: 1 for clave in lote}
+
+    monkeypatch.setattr(replica, "_leer", sin_conexion)
+    monkeypatch.setattr(modulo.reppdf_client, "estados_pdf", estados_pdf)
+    assert await replica._estados_lote(7, 1, [(1, 10)]) == {(1, 10): 1}
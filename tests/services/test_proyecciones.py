@@ -0,0 +1,65 @@
+"""
+Tests para las proyecciones de los listados: se compila el SQL, no requieren base de datos.
+"""
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql
+
+from app.models.orden_compra import OrdenCompra
+from app.models.presupuesto import Presupuesto
+from app.schemas.orden_compra import OrdenCompraDetalle
+from app.services import presupuesto_service as modulo
+from app.services.locales_cache import LocalesCache
+from app.services.presupuesto_service import PresupuestoService
+from app.services.proyecciones import listado_ordenes_compra, listado_presupuestos
+
+
+def _sql(consulta) -> str:
+    return str(consulta.compile(dialect=mysql.dialect()))
+
+
+def test_listado_presupuestos_solo_columnas_del_listado():
+    """Sin pre_obN, pre_ref ni mails; el cliente llega por LEFT JOIN como cliente_nombre"""
+    sql = _sql(listado_presupuestos())
+    for columna in ("pre_ob1", "pre_o20", "pre_ref", "Pre_MailPara", "Cli_Obs"):
+        assert columna not in sql
+    assert "LEFT OUTER JOIN clientea" in sql
+    assert listado_presupuestos().selected_columns.keys()[-1] == "cliente_nombre"
+
+
+def test_listado_ordenes_compra_cubre_el_schema():
+    """Las filas traen todos los campos de OrdenCompraDetalle salvo tienepdf"""
+    columnas = set(listado_ordenes_compra(con_sucursal=True).selected_columns.keys())
+    assert set(OrdenCompraDetalle.model_fields) - columnas <= {"tienepdf", "ocp_A2_Dt", "ocp_A2_Hr"}
+    assert "loc_des" not in listado_ordenes_compra().selected_columns.keys()
+
+
+def test_relaciones_no_se_cargan_por_defecto():
+    """select(Entidad) ya no arrastra el JOIN eager a clientea/proveea"""
+    assert "clientea" not in _sql(select(Presupuesto))
+    assert "proveea" not in _sql(select(OrdenCompra))
+
+
+async def test_nombres_locales_se_cachean_por_tenant(monkeypatch):
+    """loc001 se lee una vez por tenant mientras dure el TTL"""
+    monkeypatch.setattr(modulo, "locales_cache", LocalesCache(ttl=60))
+    lecturas = []
+
+    class Sesion:
+        async def execute(self, consulta):
+            lecturas.append(str(consulta))
+            return SimpleNamespace(all=lambda: [(1, "Casa Matriz")])
+
+    @asynccontextmanager
+    async def sesion(tenant):
+        yield Sesion()
+
+    monkeypatch.setattr(modulo, "get_tenant_async_session", sesion)
+    tenant = SimpleNamespace(id=7)
+    assert await PresupuestoService.obtener_nombres_locales(tenant) == {1: "Casa Matriz"}
+    assert await PresupuestoService.obtener_nombres_locales(tenant) == {1: "Casa Matriz"}
+    assert len(lecturas) == 1
+    await PresupuestoService.obtener_nombres_locales(SimpleNamespace(id=8))
+    assert len(lecturas) == 2
@@ -0,0 +1,144 @@
+"""
+Tests para el cliente REPPDF (deadline y circuit breaker).
+_ejecutar se reemplaza por una corrutina local: no requieren base de datos.
+"""
+import asyncio
+import pytest
+from app.services.reppdf_client import CircuitBreaker, ReppdfClient, TIPO_PRESUPUESTO
+
+ITEMS = [(1, 100), (1, 101), (2, 100)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("REPPDF_USER", "usuario")
+    monkeypatch.setenv("REPPDF_PASSWORD", "secreto")
+    return ReppdfClient(pool_size=1, max_overflow=0, timeout=0.05, umbral_fallas=2, tiempo_apertura=60, tamano_lote=2)
+
+
+def test_breaker_abre_tras_umbral():
+    """Tras N fallas consecutivas el circuito rechaza llamadas"""
+    breaker = CircuitBreaker(umbral_fallas=2, tiempo_apertura=60)
+    breaker.registrar_falla()
+    assert breaker.permitir()
+    breaker.registrar_falla()
+    assert breaker.estado == "abierto"
+    assert not breaker.permitir()
+
+
+def test_breaker_semiabierto_deja_una_prueba():
+    """Vencido el tiempo de apertura pasa una sola llamada de prueba"""
+    breaker = CircuitBreaker(umbral_fallas=1, tiempo_apertura=0)
+    breaker.registrar_falla()
+    assert breaker.permitir()
+    assert not breaker.permitir()
+    breaker.registrar_exito()
+    assert breaker.estado == "cerrado"
+
+
+async def test_prueba_cancelada_libera_el_semiabierto(client, monkeypatch):
+    """Una prueba del semiabierto cancelada no deja el circuito rechazando para siempre"""
+    class Sesion:
+        async def __aenter__(self):
+            await asyncio.sleep(1)
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(client, "_factory", lambda: Sesion)
+    client.breaker.tiempo_apertura = 0
+    for _ in range(2):
+        client.breaker.registrar_falla()
+    assert client.breaker.estado == "semiabierto"
+
+    prueba = asyncio.ensure_future(client._ejecutar("SELECT 1", {}))
+    await asyncio.sleep(0)
+    prueba.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await prueba
+    assert client.breaker.permitir()
+
+
+async def test_estados_mapea_filas(client, monkeypatch):
+    """Filas con blob -> 1, blob vacío -> 2, ausentes -> 0 (distinguiendo el local)"""
+    async def ejecutar(sql, params, commit=False):
+        return [(1, 100, 2048), (1, 101, 0)]
+
+    monkeypatch.setattr(client, "_ejecutar", ejecutar)
+    estados = await client.estados_pdf(7, TIPO_PRESUPUESTO, ITEMS)
+    assert estados == {(1, 100): 1, (1, 101): 2, (2, 100): 0}
+
+
+async def test_estados_por_lotes_con_tuplas(client, monkeypatch):
+    """Las claves se dividen en lotes con parámetros bind (loc, número), sin duplicados"""
+    llamadas = []
+
+    async def ejecutar(sql, params, commit=False):
+        llamadas.append(params)
+        assert "(PdfLocCod, PdfNumero) IN" in sql
+        return []
+
+    monkeypatch.setattr(client, "_ejecutar", ejecutar)
+    estados = await client.estados_pdf(7, TIPO_PRESUPUESTO, ITEMS + [ITEMS[0]])
+    assert estados == {item: 0 for item in ITEMS}
+    assert [{k: v for k, v in p.items() if k[0] in "ln"} for p in llamadas] == [
+        {"l0": 1, "n0": 100, "l1": 1, "n1": 101},
+        {"l0": 2, "n0": 100},
+    ]
+
+
+async def test_deadline_degrada_a_desconocido(client, monkeypatch):
+    """Si REPPDF no responde a tiempo, tienepdf es None y el circuito termina abriéndose"""
+    async def lento():
+        await asyncio.sleep(1)
+
+    class Sesion:
+        async def __aenter__(self):
+            await lento()
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(client, "_factory", lambda: Sesion)
+    for _ in range(2):
+        estados = await client.estados_pdf(7, TIPO_PRESUPUESTO, ITEMS)
+        assert estados == {item: None for item in ITEMS}
+    assert client.breaker.estado == "abierto"
+
+
+async def test_flujo_consulta_lotes_mientras_llegan_filas(client, monkeypatch):
+    """El primer lote se consulta antes de que termine el streaming de filas"""
+    primer_lote = asyncio.Event()
+
+    async def estados_lote(tenant_id, tipo, lote):
+        primer_lote.set()
+        return {item: 1 for item in lote}
+
+    async def filas():
+        yield ITEMS[0]
+        yield ITEMS[1]
+        # La fila siguiente solo llega después de que arrancó la consulta del primer lote
+        await asyncio.wait_for(primer_lote.wait(), timeout=1)
+        yield ITEMS[2]
+
+    monkeypatch.setattr(client, "_estados_lote", estados_lote)
+    leidas, estados = await client.estados_pdf_en_flujo(7, TIPO_PRESUPUESTO, filas(), lambda f: f)
+    assert leidas == ITEMS
+    assert estados == {item: 1 for item in ITEMS}
+
+
+async def test_iterar_pdf_por_ventanas(client, monkeypatch):
+    """El blob se lee en ventanas SUBSTRING (1-based) del tamaño configurado"""
+    blob = bytes(range(256)) * 4
+    ventanas = []
+
+    async def ejecutar(sql, params, commit=False):
+        ventanas.append((params["desde"], params["largo"]))
+        desde = params["desde"] - 1
+        return [(blob[desde:desde + params["largo"]],)]
+
+    monkeypatch.setattr(client, "_ejecutar", ejecutar)
+    client.tamano_chunk = 400
+    chunks = [c async for c in client.iterar_pdf(7, TIPO_PRESUPUESTO, 1, 100, 0, len(blob))]
+    assert b"".join(chunks) == blob
+    assert ventanas == [(1, 400), (401, 400), (801, 224)]